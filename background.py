@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Background Task Module
+
+Runs long operations (reading, decoding and processing channel files) on a
+worker thread. The worker never touches Tk: it posts progress and its final
+result to a thread-safe queue, which the Tk thread drains with root.after.
+"""
+
+import queue
+import threading
+
+
+class TaskCancelled(Exception):
+    """Raised inside the worker when the task has been cancelled."""
+
+
+class BackgroundTask:
+    """
+    A function running on a worker thread with progress reporting.
+
+    The function is called as func(task, *args) and should call
+    task.report() regularly; report() raises TaskCancelled once cancel() has
+    been requested, which unwinds the worker without publishing a result.
+    """
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+        self.messages = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._thread = None
+        self.finished = False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            result = self.func(self, *self.args)
+        except TaskCancelled:
+            self.messages.put(("cancelled",))
+        except Exception as e:
+            import traceback
+            self.messages.put(("error", e, traceback.format_exc()))
+        else:
+            if self.cancelled:
+                self.messages.put(("cancelled",))
+            else:
+                self.messages.put(("done", result))
+
+    @property
+    def started(self):
+        return self._thread is not None
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """Request cancellation; the worker stops at its next report()."""
+        self._cancel_event.set()
+
+    def report(self, text, fraction=None):
+        """
+        Publish progress from the worker thread.
+
+        Args:
+            text (str): Human-readable progress description
+            fraction (float): Completed fraction between 0 and 1, or None
+
+        Raises:
+            TaskCancelled: If cancellation has been requested
+        """
+        if self._cancel_event.is_set():
+            raise TaskCancelled()
+        self.messages.put(("progress", text, fraction))
+
+    def publish(self, item):
+        """
+        Hand a partial result to the Tk thread.
+
+        Unlike progress, published items are never collapsed: every item
+        reaches on_data, in order, before the final result.
+
+        Raises:
+            TaskCancelled: If cancellation has been requested
+        """
+        if self._cancel_event.is_set():
+            raise TaskCancelled()
+        self.messages.put(("data", item))
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def poll(self):
+        """
+        Drain the pending messages without blocking.
+
+        Consecutive progress messages are collapsed into the latest one.
+
+        Returns:
+            list: Message tuples in arrival order
+        """
+        pending = []
+        while True:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "progress" and pending and pending[-1][0] == "progress":
+                pending[-1] = message
+            else:
+                pending.append(message)
+            if message[0] not in ("progress", "data"):
+                self.finished = True
+        return pending
+
+    def attach(self, root, on_progress=None, on_done=None, on_error=None,
+               on_cancelled=None, on_data=None, interval=50):
+        """
+        Poll the task from the Tk event loop and dispatch its messages.
+
+        Args:
+            root: Any Tk widget, used for after()
+            on_progress (callable): on_progress(text, fraction)
+            on_done (callable): on_done(result)
+            on_error (callable): on_error(exception, traceback_text)
+            on_cancelled (callable): on_cancelled()
+            on_data (callable): on_data(item) for every published item
+            interval (int): Polling interval in milliseconds
+        """
+        def tick():
+            for message in self.poll():
+                kind = message[0]
+                if kind == "progress" and on_progress:
+                    on_progress(message[1], message[2])
+                elif kind == "done" and on_done:
+                    on_done(message[1])
+                elif kind == "error" and on_error:
+                    on_error(message[1], message[2])
+                elif kind == "cancelled" and on_cancelled:
+                    on_cancelled()
+                elif kind == "data" and on_data:
+                    on_data(message[1])
+            if not self.finished:
+                root.after(interval, tick)
+
+        root.after(interval, tick)
+        return self
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the CHL -> SDX and SDX -> CHL converters.
+
+    python3 benchmarks/bench_convert.py [--sizes N ...] [--repeat 5] [--output FILE] [--baseline FILE]
+"""
+
+import sys
+
+import harness
+from channel_processor import ChannelDataProcessor
+
+
+def cases(size):
+    chl_data = harness.lineup(size).chl()
+    sdx_objects = ChannelDataProcessor.convert_chl_to_sdx(chl_data)
+    yield "convert_chl_to_sdx", lambda: ChannelDataProcessor.convert_chl_to_sdx(chl_data)
+    yield "convert_sdx_to_chl", lambda: ChannelDataProcessor.convert_sdx_to_chl(sdx_objects)
+
+
+if __name__ == "__main__":
+    sys.exit(harness.main(__doc__, [cases]))
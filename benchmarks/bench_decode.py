@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Benchmark of decoding SDX text, whole and streamed.
+
+    python3 benchmarks/bench_decode.py [--sizes N ...] [--repeat 5] [--output FILE] [--baseline FILE]
+"""
+
+import io
+import sys
+
+import harness
+from channel_processor import ChannelDataProcessor
+
+
+def cases(size):
+    text = harness.lineup(size).sdx_text()
+    yield "decode_objects", lambda: ChannelDataProcessor.decode_objects(text)
+    yield "iter_objects", lambda: sum(1 for _ in ChannelDataProcessor.iter_objects(io.StringIO(text)))
+
+
+if __name__ == "__main__":
+    sys.exit(harness.main(__doc__, [cases]))
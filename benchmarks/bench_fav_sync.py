@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Benchmark of writing favourite lists back to the SDX objects.
+
+Every edit of a list writes its entries into its fav_list_object_N and
+recomputes the FavBit of every program, as the editor's _sync does.
+
+    python3 benchmarks/bench_fav_sync.py [--sizes N ...] [--repeat 5] [--output FILE] [--baseline FILE]
+"""
+
+import sys
+
+import harness
+from channel_processor import ChannelDataProcessor
+
+
+def cases(size):
+    data = ChannelDataProcessor.load_channel_data(harness.lineup(size).sdx())
+    # A list with every tenth channel, like a long "all favourites" list
+    tab_id, model = next(iter(data.fav_models.items()))
+    model.replace([(info['stProgNo'], ChannelDataProcessor.fav_row_values(info))
+                   for info in list(data.programs_dict.values())[::10]])
+    fav_key = f"fav_list_object_{tab_id}"
+
+    def sync():
+        entries = model.entries()
+        fav_obj = data.all_data_objects[data.fav_lists_indices[tab_id]][fav_key]
+        fav_obj["stProgNo"] = entries
+        fav_obj["sNoOfTVFavor"] = len(entries)
+        ChannelDataProcessor.update_fav_bits(data.all_data_objects)
+
+    yield "fav_sync", sync
+
+
+if __name__ == "__main__":
+    sys.exit(harness.main(__doc__, [cases]))
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Benchmark of parsing a KingOfSat package page.
+
+    python3 benchmarks/bench_kingofsat.py [--sizes N ...] [--repeat 5] [--output FILE] [--baseline FILE]
+"""
+
+import sys
+
+import harness
+from kingofsat import parse_kingofsat_html
+
+
+def cases(size):
+    html = harness.lineup(size).kingofsat_html()
+    yield "parse_kingofsat_html", lambda: parse_kingofsat_html(html)
+
+
+if __name__ == "__main__":
+    sys.exit(harness.main(__doc__, [cases]))
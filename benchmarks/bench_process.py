@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Benchmark of processing decoded SDX data into the editor's models.
+
+    python3 benchmarks/bench_process.py [--sizes N ...] [--repeat 5] [--output FILE] [--baseline FILE]
+"""
+
+import sys
+
+import harness
+from channel_processor import ChannelDataProcessor
+
+
+def cases(size):
+    objects = harness.lineup(size).sdx()
+    yield "process_sdx_data", lambda: ChannelDataProcessor.process_sdx_data(objects)
+    yield "load_channel_data", lambda: ChannelDataProcessor.load_channel_data(objects)
+
+
+if __name__ == "__main__":
+    sys.exit(harness.main(__doc__, [cases]))
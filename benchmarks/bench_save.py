@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Benchmark of saving SDX and CHL files.
+
+    python3 benchmarks/bench_save.py [--sizes N ...] [--repeat 5] [--output FILE] [--baseline FILE]
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import harness
+from channel_processor import ChannelDataProcessor
+from sdx_cli import save_sdx
+
+
+def cases(size):
+    objects = harness.lineup(size).sdx()
+    directory = tempfile.mkdtemp(prefix="bench_save_")
+
+    def save_chl():
+        with open(os.path.join(directory, "out.chl"), 'w', encoding='utf-8') as f:
+            for obj in ChannelDataProcessor.convert_sdx_to_chl(objects):
+                f.write(json.dumps(obj, indent=2))
+                f.write('\n')
+
+    yield "save_sdx", lambda: save_sdx(os.path.join(directory, "out.sdx"), objects)
+    yield "save_chl", save_chl
+
+
+if __name__ == "__main__":
+    sys.exit(harness.main(__doc__, [cases]))
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Benchmark of filtering and sorting the general channel list.
+
+    python3 benchmarks/bench_search.py [--sizes N ...] [--repeat 5] [--output FILE] [--baseline FILE]
+"""
+
+import sys
+
+import harness
+from channel_models import ChannelListModel
+from channel_processor import ChannelDataProcessor
+
+# What the view computes while "canal 12" is typed into the search box
+TYPED = ["c", "ca", "can", "cana", "canal", "canal ", "canal 1", "canal 12"]
+
+
+def cases(size):
+    data = ChannelDataProcessor.load_channel_data(harness.lineup(size).sdx())
+
+    def typing():
+        model = data.channel_model
+        for query in TYPED:
+            model.view(query)
+
+    def sorting():
+        model = ChannelListModel(data.programs_dict, data.program_list)
+        for column in ("nombre", "freq", "sid", "calidad"):
+            model.view("", column, descending=True)
+
+    yield "search_typing", typing
+    yield "sort_columns", sorting
+
+
+if __name__ == "__main__":
+    sys.exit(harness.main(__doc__, [cases]))
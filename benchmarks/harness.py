@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Shared code of the benchmark scripts.
+
+Every bench_*.py script defines cases(size), a generator of (name, func)
+pairs for a list of that many channels (built with lineup(), see
+tests/fixtures/synthetic.py), and calls main(). Each case is run
+once under tracemalloc to take the peak memory it allocates, then --repeat
+times to take the median wall time. Results can be saved as JSON and
+compared against a stored baseline:
+
+    python3 benchmarks/bench_decode.py --output base.json
+    ... change the code ...
+    python3 benchmarks/bench_decode.py --baseline base.json
+
+The comparison exits with status 1 when a case got slower (or used more
+memory) than the baseline by more than --threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from tests.fixtures.synthetic import SyntheticList  # noqa: E402
+
+SIZES = (1000, 10000, 100000)
+SEED = 1
+REPEAT = 5
+THRESHOLD = 0.2
+# Differences below this many seconds are noise, whatever the ratio
+MIN_SLOWDOWN = 0.002
+
+
+def lineup(size):
+    """The synthetic lineup every script uses for size channels."""
+    return SyntheticList(seed=SEED, channels=size)
+
+
+def measure(func, repeat):
+    """
+    Measure the peak allocation of func() once, then time it repeat times.
+
+    The traced run doubles as a warm-up, so the timed runs do not pay for
+    first-call costs such as imports and cold caches.
+
+    Returns:
+        dict: median_s, min_s and peak_bytes
+    """
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'median_s': statistics.median(times), 'min_s': min(times), 'peak_bytes': peak}
+
+
+def run(case_factories, sizes=SIZES, repeat=REPEAT, out=sys.stdout):
+    """
+    Run every case of every factory at every size.
+
+    Args:
+        case_factories (list): cases(size) generators of (name, func)
+        sizes (iterable): Channel counts
+        repeat (int): Timed runs per case
+
+    Returns:
+        list: One result dict per (case, size)
+    """
+    results = []
+    for size in sizes:
+        for cases in case_factories:
+            for name, func in cases(size):
+                result = {'name': name, 'channels': size, 'repeat': repeat}
+                result.update(measure(func, repeat))
+                results.append(result)
+                print(f"{name:28s} {size:>7d}  {result['median_s'] * 1000:9.1f} ms  "
+                      f"{result['peak_bytes'] / 1e6:8.1f} MB", file=out)
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Compare results against baseline results of the same cases.
+
+    A case regresses when its median time grows by more than threshold
+    (and by more than MIN_SLOWDOWN seconds), or its peak memory grows by
+    more than threshold. Cases missing from either side are ignored.
+
+    Returns:
+        list: (name, channels, metric, old, new) for every regression
+    """
+    old = {(r['name'], r['channels']): r for r in baseline}
+    regressions = []
+    for result in results:
+        base = old.get((result['name'], result['channels']))
+        if base is None:
+            continue
+        if (result['median_s'] > base['median_s'] * (1 + threshold)
+                and result['median_s'] - base['median_s'] > MIN_SLOWDOWN):
+            regressions.append((result['name'], result['channels'], 'median_s',
+                                base['median_s'], result['median_s']))
+        if result['peak_bytes'] > base['peak_bytes'] * (1 + threshold):
+            regressions.append((result['name'], result['channels'], 'peak_bytes',
+                                base['peak_bytes'], result['peak_bytes']))
+    return regressions
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def save_results(path, results):
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+
+
+def main(description, case_factories, argv=None):
+    """Command line of a benchmark script; returns the exit status."""
+    parser = argparse.ArgumentParser(description=description.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), metavar="N",
+                        help="channel counts to run (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=REPEAT,
+                        help="timed runs per case (default: %(default)s)")
+    parser.add_argument("--output", metavar="FILE", help="save the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="compare against results saved with --output")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed relative growth before flagging (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results = run(case_factories, args.sizes, args.repeat)
+    if args.output:
+        save_results(args.output, results)
+    if not args.baseline:
+        return 0
+
+    regressions = compare(results, load_results(args.baseline), args.threshold)
+    for name, channels, metric, old, new in regressions:
+        growth = f" (+{(new / old - 1) * 100:.0f}%)" if old else ""
+        print(f"REGRESSION {name} ({channels} channels): {metric} {old:.4g} -> {new:.4g}{growth}")
+    if not regressions:
+        print(f"No regressions against {args.baseline}")
+    return 1 if regressions else 0
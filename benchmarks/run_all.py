@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Run every benchmark script as one suite.
+
+    python3 benchmarks/run_all.py [--sizes N ...] [--repeat 5] [--output FILE] [--baseline FILE]
+
+Takes the same options as the individual bench_*.py scripts; the results
+of all of them go into one JSON file and one comparison.
+"""
+
+import sys
+
+import bench_convert
+import bench_decode
+import bench_fav_sync
+import bench_kingofsat
+import bench_process
+import bench_save
+import bench_search
+import harness
+
+SUITE = [bench_decode.cases, bench_process.cases, bench_convert.cases, bench_kingofsat.cases,
+         bench_search.cases, bench_fav_sync.cases, bench_save.cases]
+
+
+if __name__ == "__main__":
+    sys.exit(harness.main(__doc__, SUITE))
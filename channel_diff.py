@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Channel Diff Module
+
+Compares two SDX files and carries favourite lists over to a rescanned one.
+
+A receiver rescan renumbers transponders, so packed (transponder, SID) keys
+cannot be compared directly across files. Programs are paired with
+ProgramMatcher instead: each program of the old file is looked up in the new
+one as a channel on its physical transponder (frequency, polarisation,
+satellite), by SID near its frequency and finally by normalised name. Every
+step is a dictionary lookup, so comparing or merging is linear in the size
+of the files:
+
+    diff = diff_sdx(old_objects, new_objects)
+    print(diff.summary())
+    merged, report = merge_sdx(our_objects, rescanned_objects, base_objects)
+"""
+
+from collections import deque
+
+from channel_matching import AMBIGUOUS, RESOLVED, ProgramMatcher
+from channel_models import POLARISATIONS, FavListDiff, TransponderIndex, fav_entry_key, make_fav_entry
+from channel_processor import ChannelDataProcessor, paused_gc
+
+# Matches through the SID are trusted on the first pairing pass; name-only
+# matches wait until every SID match has taken its program
+_SID_METHODS = frozenset(("sid_tp", "sid_freq", "sid_freq_name"))
+
+
+class SdxIndex:
+    """
+    Programs, transponders and favourite lists of SDX data, indexed in one pass.
+
+    Attributes:
+        objects (list): The SDX objects
+        programs (dict): Program key (position of its object) -> name, sid,
+            freq and stProgNo, as ProgramMatcher expects
+        by_packed (dict): Packed key -> program key of the first program
+        transponders (dict): Transponder index -> (freq, pol, angle, symbol rate)
+        fav_lists (dict): List index -> position of its object
+        fav_names_obj_index (int): Position of the list names object, -1 if none
+        matcher (ProgramMatcher): Lookup of channels among the programs
+    """
+
+    def __init__(self, all_data_objects):
+        self.objects = all_data_objects
+        self.programs = {}
+        self.by_packed = {}
+        self.fav_lists = {}
+        self.fav_names_obj_index = -1
+        angles = {}
+        transponders = {}
+        for i, obj in enumerate(all_data_objects):
+            if not isinstance(obj, dict):
+                continue
+            key = next(iter(obj), "")
+            if "program_tv_object" in key:
+                data = obj[key]
+                st_prog_no = data.get("stProgNo", {})
+                packed = fav_entry_key(st_prog_no)
+                self.programs[i] = {'name': str(data.get("ServiceName", "")).strip(), 'sid': packed & 0xFFFF,
+                                    'stProgNo': st_prog_no, 'freq': 0}
+                self.by_packed.setdefault(packed, i)
+                continue
+            if key == "fav_list_info_in_box_object":
+                self.fav_names_obj_index = i
+                continue
+            idx = key.rsplit("_", 1)[-1]
+            if not idx.isdigit():
+                continue
+            if key.startswith("fav_list_object_"):
+                self.fav_lists[int(idx)] = i
+            elif key.startswith("transponder_object_"):
+                data = obj[key]
+                st_flag = data.get("stFlag", {})
+                pol = st_flag.get("POL", 0)
+                transponders[int(idx)] = (data.get("Freq", 0),
+                                          POLARISATIONS[pol] if 0 <= pol < len(POLARISATIONS) else "",
+                                          st_flag.get("SatIndex", 0), data.get("SR", 0))
+            elif key.startswith("satellite_object_"):
+                angles[int(idx)] = obj[key].get("SatAngle")
+
+        self.transponders = {}
+        index = TransponderIndex()
+        for idx, (freq, pol, sat_idx, rate) in transponders.items():
+            self.transponders[idx] = (freq, pol, angles.get(sat_idx), rate)
+            index.add(idx, freq, pol, angles.get(sat_idx))
+        for key, info in self.programs.items():
+            info['freq'] = self.transponders.get(self.tp_index(key), (0,))[0]
+        self.matcher = ProgramMatcher(self.programs.items(), index)
+
+    def tp_index(self, key):
+        """Transponder index (sHi16) of a program."""
+        return self.programs[key]['stProgNo'].get('unShort', {}).get('sHi16', 0)
+
+    def channel(self, key):
+        """Describe a program as a channel for ProgramMatcher.match."""
+        info = self.programs[key]
+        freq, pol, angle, _ = self.transponders.get(self.tp_index(key), (info['freq'], "", None, 0))
+        return {'name': info['name'], 'sid': info['sid'], 'freq': freq, 'pol': pol, 'position': angle}
+
+    def fav_keys(self, fav_idx):
+        """Packed keys of a favourite list, in list order."""
+        fav_obj = self.objects[self.fav_lists[fav_idx]][f"fav_list_object_{fav_idx}"]
+        return [fav_entry_key(entry) for entry in fav_obj.get("stProgNo", [])]
+
+    def fav_names(self):
+        """The list names object (aucFavReName, ucFavNameChangeMask), or None."""
+        if self.fav_names_obj_index == -1:
+            return None
+        return self.objects[self.fav_names_obj_index]["fav_list_info_in_box_object"]
+
+    def describe(self, key):
+        """One-line description of a program: name, SID and transponder."""
+        info = self.programs[key]
+        channel = self.channel(key)
+        return f"{info['name']} (SID {info['sid']}, TP {self.tp_index(key)}: {channel['freq']} {channel['pol']})"
+
+
+def pair_programs(old, new):
+    """
+    Pair the programs of two files.
+
+    Returns:
+        dict: Old program key -> new program key; every new program is
+            paired at most once
+    """
+    pairs = {}
+    used = set()
+    deferred = []
+    for key in old.programs:
+        status, keys, method = new.matcher.match(old.channel(key))
+        if status == RESOLVED and method in _SID_METHODS and keys[0] not in used:
+            pairs[key] = keys[0]
+            used.add(keys[0])
+        elif status in (RESOLVED, AMBIGUOUS):
+            deferred.append((key, keys, method))
+
+    # Several programs of the same name pair up in file order: one queue of
+    # not yet paired candidates per name, each candidate taken at most once
+    unpaired = {}
+    for key, keys, method in deferred:
+        name = old.matcher.name_of(key)
+        if method in _SID_METHODS:
+            # Programs sharing a SID near the frequency; only a few
+            candidate = next((c for c in keys if c not in used and new.matcher.name_of(c) == name), None)
+        else:
+            queue = unpaired.get(name)
+            if queue is None:
+                queue = unpaired[name] = deque(keys)
+            while queue and queue[0] in used:
+                queue.popleft()
+            candidate = queue.popleft() if queue else None
+        if candidate is not None:
+            pairs[key] = candidate
+            used.add(candidate)
+    return pairs
+
+
+def _map_keys(old, new, pairs, keys):
+    """Translate packed keys of old into packed keys of new; None where the program is gone."""
+    mapped = []
+    for packed in keys:
+        new_key = pairs.get(old.by_packed.get(packed))
+        mapped.append(fav_entry_key(new.programs[new_key]['stProgNo']) if new_key is not None else None)
+    return mapped
+
+
+class SdxDiff:
+    """
+    Differences between an old and a new SDX file.
+
+    Attributes:
+        pairs (dict): Old program key -> new program key
+        added (list): New program keys without an old program
+        removed (list): Old program keys without a new program
+        renamed (list): (old key, new key) pairs whose name changed
+        moved (list): (old key, new key) pairs whose packed key changed, so
+            favourite entries must be rewritten to follow them
+        transponders_added (list): New transponder indices on a (freq, pol,
+            satellite) the old file does not have
+        transponders_removed (list): Old transponder indices missing from the new file
+        transponders_changed (list): (old index, new index) of the same
+            transponder renumbered or with another symbol rate
+        favourites (dict): List index -> FavListDiff from the old list, in
+            new keys, to the new list
+    """
+
+    def __init__(self, old, new, pairs):
+        self.old = old
+        self.new = new
+        self.pairs = pairs
+        paired_new = set(pairs.values())
+        self.added = [key for key in new.programs if key not in paired_new]
+        self.removed = [key for key in old.programs if key not in pairs]
+        self.renamed = [(o, n) for o, n in pairs.items()
+                        if old.programs[o]['name'] != new.programs[n]['name']]
+        self.moved = [(o, n) for o, n in pairs.items()
+                      if fav_entry_key(old.programs[o]['stProgNo']) != fav_entry_key(new.programs[n]['stProgNo'])]
+
+        old_tps = {(freq, pol, angle): (idx, rate) for idx, (freq, pol, angle, rate) in old.transponders.items()}
+        new_tps = {(freq, pol, angle): (idx, rate) for idx, (freq, pol, angle, rate) in new.transponders.items()}
+        self.transponders_added = sorted(idx for key, (idx, _) in new_tps.items() if key not in old_tps)
+        self.transponders_removed = sorted(idx for key, (idx, _) in old_tps.items() if key not in new_tps)
+        self.transponders_changed = sorted((old_tps[key][0], idx) for key, (idx, rate) in new_tps.items()
+                                           if key in old_tps and old_tps[key] != (idx, rate))
+
+        self.favourites = {}
+        for fav_idx in sorted(set(old.fav_lists) | set(new.fav_lists)):
+            old_keys = old.fav_keys(fav_idx) if fav_idx in old.fav_lists else []
+            mapped = [("gone", packed) if key is None else key
+                      for packed, key in zip(old_keys, _map_keys(old, new, pairs, old_keys))]
+            change = FavListDiff(mapped, new.fav_keys(fav_idx) if fav_idx in new.fav_lists else [])
+            if change:
+                self.favourites[fav_idx] = change
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.renamed or self.moved or self.transponders_added
+                    or self.transponders_removed or self.transponders_changed or self.favourites)
+
+    def summary(self):
+        parts = [f"{len(self.added)} added", f"{len(self.removed)} removed", f"{len(self.renamed)} renamed",
+                 f"{len(self.moved)} moved",
+                 f"transponders +{len(self.transponders_added)} -{len(self.transponders_removed)} "
+                 f"~{len(self.transponders_changed)}",
+                 f"{len(self.favourites)} favourite lists differ"]
+        return ", ".join(parts)
+
+    def lines(self, limit=None):
+        """
+        Describe every difference, one line each, grouped by kind.
+
+        Args:
+            limit (int): Lines listed per kind, all if None
+        """
+        old, new = self.old, self.new
+
+        def section(items, describe):
+            shown = items if limit is None else items[:limit]
+            for item in shown:
+                yield describe(item)
+            if len(shown) < len(items):
+                yield f"  ... {len(items) - len(shown)} more"
+
+        yield from section(self.added, lambda n: f"+ {new.describe(n)}")
+        yield from section(self.removed, lambda o: f"- {old.describe(o)}")
+        yield from section(self.renamed, lambda p: f"~ {old.programs[p[0]]['name']} -> {new.describe(p[1])}")
+        yield from section(self.moved, lambda p: f"> {old.describe(p[0])} -> {new.describe(p[1])}")
+        yield from section(self.transponders_added,
+                           lambda idx: f"+ transponder {idx}: {_describe_tp(new.transponders[idx])}")
+        yield from section(self.transponders_removed,
+                           lambda idx: f"- transponder {idx}: {_describe_tp(old.transponders[idx])}")
+        yield from section(self.transponders_changed,
+                           lambda p: f"~ transponder {p[0]} -> {p[1]}: {_describe_tp(new.transponders[p[1]])}")
+        for fav_idx, change in self.favourites.items():
+            yield (f"list {fav_idx}: +{len(change.added)} -{len(change.removed)} "
+                   f"~{len(change.moved)} ={change.unchanged}")
+
+
+def _describe_tp(details):
+    freq, pol, angle, rate = details
+    text = f"{freq} {pol} SR {rate}"
+    return text if angle is None else f"{text} at {angle / 10:g}°"
+
+
+def diff_sdx(old_objects, new_objects):
+    """
+    Compare two SDX files.
+
+    Args:
+        old_objects (list): SDX objects of the old file
+        new_objects (list): SDX objects of the new file
+
+    Returns:
+        SdxDiff: Program, transponder and favourite list differences
+    """
+    with paused_gc():
+        old, new = SdxIndex(old_objects), SdxIndex(new_objects)
+        return SdxDiff(old, new, pair_programs(old, new))
+
+
+class MergeReport:
+    """
+    What merge_sdx did to each favourite list.
+
+    Attributes:
+        diff (SdxDiff): Our file against the rescanned one
+        kept (dict): List index -> entries carried over from our list
+        dropped (dict): List index -> names of our entries whose program
+            is gone from the rescanned file
+        added (dict): List index -> entries the rescan added to the list
+    """
+
+    def __init__(self, diff):
+        self.diff = diff
+        self.kept = {}
+        self.dropped = {}
+        self.added = {}
+
+    def summary(self):
+        return ", ".join(f"list {idx}: {kept} kept, {len(self.dropped[idx])} dropped, "
+                         f"{self.added[idx]} added by the rescan" for idx, kept in self.kept.items())
+
+
+def merge_sdx(ours, theirs, base=None):
+    """
+    Three-way merge of favourite lists into a rescanned file.
+
+    The rescanned file (theirs) provides the programs, transponders and
+    satellites. Each of our favourite lists is rebuilt against its
+    programs, in our order; entries whose program the rescan removed are
+    dropped. With the base file both started from, entries the rescan
+    added to a list (present in theirs but not in base) are appended unless
+    we already have them. Entries the rescan removed from a list while the
+    program still exists are kept, as a rescan that resets the lists must
+    not lose them. Our list names win, and FavBit is recomputed.
+
+    Args:
+        ours (list): SDX objects with our favourite lists
+        theirs (list): SDX objects of the rescanned file, updated in place
+        base (list): SDX objects both files started from, or None
+
+    Returns:
+        tuple: (theirs, MergeReport)
+    """
+    with paused_gc():
+        return _merge(ours, theirs, base)
+
+
+def _merge(ours, theirs, base):
+    ours_index, theirs_index = SdxIndex(ours), SdxIndex(theirs)
+    diff = SdxDiff(ours_index, theirs_index, pair_programs(ours_index, theirs_index))
+    report = MergeReport(diff)
+    base_index = base_pairs = None
+    if base is not None:
+        base_index = SdxIndex(base)
+        base_pairs = pair_programs(base_index, theirs_index)
+
+    new_fav_objects = []
+    for fav_idx in sorted(ours_index.fav_lists):
+        our_keys = ours_index.fav_keys(fav_idx)
+        merged = {}
+        dropped = []
+        for packed, key in zip(our_keys, _map_keys(ours_index, theirs_index, diff.pairs, our_keys)):
+            if key is not None:
+                merged.setdefault(key, None)
+            else:
+                program = ours_index.by_packed.get(packed)
+                dropped.append(ours_index.programs[program]['name'] if program is not None
+                               else f"SID {packed & 0xFFFF} TP {packed >> 16}")
+        report.kept[fav_idx] = len(merged)
+        report.dropped[fav_idx] = dropped
+
+        added = 0
+        if base_index is not None and fav_idx in theirs_index.fav_lists:
+            base_keys = base_index.fav_keys(fav_idx) if fav_idx in base_index.fav_lists else []
+            in_base = set(_map_keys(base_index, theirs_index, base_pairs, base_keys))
+            for key in theirs_index.fav_keys(fav_idx):
+                if key not in in_base and key not in merged and key in theirs_index.by_packed:
+                    merged[key] = None
+                    added += 1
+        report.added[fav_idx] = added
+
+        entries = [make_fav_entry(key & 0xFFFF, key >> 16) for key in merged]
+        if fav_idx in theirs_index.fav_lists:
+            fav_obj = theirs[theirs_index.fav_lists[fav_idx]][f"fav_list_object_{fav_idx}"]
+            fav_obj["stProgNo"] = entries
+            fav_obj["sNoOfTVFavor"] = len(entries)
+        else:
+            new_fav_objects.append({f"fav_list_object_{fav_idx}": {
+                "sNoOfTVFavor": len(entries), "sNoOfRadioFavor": 0, "stProgNo": entries}})
+
+    if new_fav_objects:
+        # New lists go after the rescanned file's own lists, or before its names
+        positions = list(theirs_index.fav_lists.values())
+        at = max(positions) + 1 if positions else (
+            theirs_index.fav_names_obj_index if theirs_index.fav_names_obj_index != -1 else len(theirs))
+        theirs[at:at] = new_fav_objects
+    _merge_names(ours_index.fav_names(), theirs)
+    ChannelDataProcessor.update_fav_bits(theirs)
+    return theirs, report
+
+
+def _merge_names(names_obj, theirs):
+    """Write our list names into the names objects of theirs, adding one if missing."""
+    if not names_obj or not names_obj.get("aucFavReName"):
+        return
+    names = names_obj["aucFavReName"]
+    mask = names_obj.get("ucFavNameChangeMask", 0)
+    found = False
+    for obj in theirs:
+        if not isinstance(obj, dict):
+            continue
+        target = obj.get("fav_list_info_in_box_object")
+        if target is not None:
+            found = True
+        else:
+            # box_object keeps a copy of the names (see the editor's rename)
+            target = obj.get("box_object")
+            if not isinstance(target, dict) or "aucFavReName" not in target:
+                continue
+        merged = list(target.get("aucFavReName", []))
+        merged[:len(names)] = names
+        target["aucFavReName"] = merged
+        target["ucFavNameChangeMask"] = target.get("ucFavNameChangeMask", 0) | mask
+    if not found:
+        theirs.append({"fav_list_info_in_box_object": {"aucFavReName": list(names),
+                                                        "ucFavNameChangeMask": mask}})
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Channel Matching Module
+
+Resolves channels scraped from KingOfSat against the programs of the loaded
+file. Every lookup is a dictionary access, so matching a whole page is
+linear in its number of channels.
+"""
+
+import re
+import unicodedata
+
+RESOLVED = "resolved"
+AMBIGUOUS = "ambiguous"
+MISSING = "missing"
+
+# Words that only describe the picture quality and often differ between the
+# receiver's service name and KingOfSat's ("La 1 HD" vs "La 1")
+_QUALITY_WORDS = frozenset(("sd", "hd", "fhd", "uhd", "4k"))
+_WORDS = re.compile(r'[^\W_]+')
+
+
+def normalize_name(name):
+    """
+    Reduce a channel name to a key for loose comparison.
+
+    Case, accents, punctuation, spacing and quality suffixes are ignored.
+    """
+    text = str(name).casefold()
+    if not text.isascii():
+        # Only non-ASCII text can carry accents to strip
+        text = unicodedata.normalize("NFKD", text)
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+    words = _WORDS.findall(text)
+    significant = [word for word in words if word not in _QUALITY_WORDS]
+    return ''.join(significant or words)
+
+
+def pack_key(sid, tp_idx):
+    """Return the 32-bit program key (uiWord32) for a SID and transponder."""
+    return (tp_idx << 16) | sid
+
+
+class MatchResult:
+    """
+    Channels of a page split by how they matched.
+
+    Attributes:
+        resolved (list): (channel, program_key, method) tuples, where method
+            is "sid_tp", "sid_freq", "sid_freq_name" or "name"
+        ambiguous (list): (channel, [program_key, ...]) tuples
+        missing (list): Channels with no matching program
+    """
+
+    def __init__(self):
+        self.resolved = []
+        self.ambiguous = []
+        self.missing = []
+
+    def __len__(self):
+        return len(self.resolved) + len(self.ambiguous) + len(self.missing)
+
+
+class ProgramMatcher:
+    """
+    Indexes the programs of a file for matching imported channels.
+
+    A channel is tried, in order, against:
+        1. the packed (SID, transponder) key, with the transponder resolved
+           exactly through a TransponderIndex (needs the polarisation)
+        2. its SID on any transponder within tolerance MHz of its frequency,
+           using the name to pick between several candidates
+        3. its normalised name
+    Candidates that are the same service (same packed key) count once.
+    """
+
+    def __init__(self, programs, transponder_index=None, tolerance=3):
+        """
+        Args:
+            programs (iterable): (program_key, info) pairs as in the editor's
+                programs_dict; info needs name, sid, freq and stProgNo
+            transponder_index (TransponderIndex): Used to resolve the
+                transponder of a channel; step 1 is skipped without it
+            tolerance (int): Frequency tolerance in MHz for step 2
+        """
+        self.transponder_index = transponder_index
+        self.tolerance = tolerance
+        self._by_packed = {}
+        self._by_sid = {}
+        self._by_name = {}
+        self._names = {}
+        for key, info in programs:
+            tp_idx = info['stProgNo'].get('unShort', {}).get('sHi16', 0)
+            packed = pack_key(info['sid'], tp_idx)
+            name = normalize_name(info['name'])
+            self._names[key] = name
+            if packed not in self._by_packed:
+                self._by_packed[packed] = key
+                self._by_sid.setdefault(info['sid'], []).append((info['freq'], key))
+                self._by_name.setdefault(name, []).append(key)
+
+    def match(self, channel):
+        """
+        Match one channel.
+
+        Args:
+            channel (dict): Parsed KingOfSat channel (name, sid, freq and,
+                when available, pol, position and freq_exact)
+
+        Returns:
+            tuple: (status, program_keys, method); program_keys has one key
+                when resolved, the candidates when ambiguous, none if missing.
+                Name matches return the matcher's own group of programs with
+                that name, in file order; it must not be modified.
+        """
+        sid = channel['sid']
+        # Step 1 needs an exact transponder: without a polarisation the index
+        # could only guess by frequency, which is what step 2 does better
+        if self.transponder_index is not None and channel.get('pol'):
+            tp_idx = self.transponder_index.find(channel['freq'], channel.get('pol', ''),
+                                                 channel.get('position'), channel.get('freq_exact'))
+            if tp_idx is not None:
+                key = self._by_packed.get(pack_key(sid, tp_idx))
+                if key is not None:
+                    return RESOLVED, [key], "sid_tp"
+
+        name = normalize_name(channel['name'])
+        freq = channel['freq']
+        near = [key for tp_freq, key in self._by_sid.get(sid, ())
+                if abs(tp_freq - freq) <= self.tolerance]
+        if len(near) == 1:
+            return RESOLVED, near, "sid_freq"
+        if near:
+            named = [key for key in near if self._names[key] == name]
+            if len(named) == 1:
+                return RESOLVED, named, "sid_freq_name"
+            return AMBIGUOUS, near, "sid_freq"
+
+        # The group is shared by every channel of that name; not copied
+        by_name = self._by_name.get(name)
+        if by_name is None:
+            return MISSING, [], None
+        return RESOLVED if len(by_name) == 1 else AMBIGUOUS, by_name, "name"
+
+    def name_of(self, key):
+        """Normalised name of an indexed program."""
+        return self._names[key]
+
+    def match_all(self, channels):
+        """
+        Match every channel of a page.
+
+        Returns:
+            MatchResult: The channels split into resolved, ambiguous and missing
+        """
+        result = MatchResult()
+        for channel in channels:
+            status, keys, method = self.match(channel)
+            if status == RESOLVED:
+                result.resolved.append((channel, keys[0], method))
+            elif status == AMBIGUOUS:
+                result.ambiguous.append((channel, keys))
+            else:
+                result.missing.append(channel)
+        return result
@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+"""
+Channel Models Module
+
+In-memory models backing the editor views. They hold the rows shown in the
+Treeviews so that sorting, filtering and reordering can be computed in plain
+Python and only the minimal set of Tk calls has to be issued afterwards.
+"""
+
+import bisect
+
+from channel_matching import ProgramMatcher
+
+
+def _generic_sort_key(value):
+    """Sort numbers before text and compare text case-insensitively."""
+    if isinstance(value, (int, float)):
+        return (0, value, "")
+    return (1, 0, str(value).lower())
+
+
+def _quality_sort_key(value):
+    """Sort signal quality values such as "85%" numerically."""
+    text = str(value).rstrip("%")
+    try:
+        return (0, int(text), "")
+    except ValueError:
+        return _generic_sort_key(value)
+
+
+class ChannelListModel:
+    """
+    Rows of the general channel list with cached sort permutations.
+
+    Each column gets at most one sort permutation (a list of row positions in
+    ascending order). It is computed on the first sort by that column and
+    reused for the life of the model; the editor builds a new model when it
+    loads a file. Descending order is the reversed permutation.
+    """
+
+    COLUMNS = ("#", "nombre", "freq", "sid", "lcn", "hd", "ca", "tipo", "calidad")
+    SORT_KEYS = {"calidad": _quality_sort_key}
+
+    def __init__(self, programs_dict=None, program_list=None):
+        """
+        Build the model from the editor's program structures.
+
+        Args:
+            programs_dict (dict): unique_key -> channel data
+            program_list (list): (unique_key, name) tuples in file order
+        """
+        self.keys = []
+        self.rows = []
+        self._names_lower = []
+        self._sort_cache = {}
+        self._match_cache = (None, None)
+
+        programs_dict = programs_dict or {}
+        for unique_key, _ in program_list or []:
+            info = programs_dict[unique_key]
+            self.keys.append(unique_key)
+            self.rows.append([
+                info['order'], info['name'], info['freq'], info['sid'],
+                info['lcn'], info['hd'], info['ca'], info['tipo'], info['calidad']
+            ])
+            self._names_lower.append(info['name'].lower())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def sort_permutation(self, column):
+        """
+        Return the cached ascending permutation for a column.
+
+        Args:
+            column (str): Column name from COLUMNS
+
+        Returns:
+            list: Row positions sorted by the column value
+        """
+        perm = self._sort_cache.get(column)
+        if perm is None:
+            col = self.COLUMNS.index(column)
+            key_func = self.SORT_KEYS.get(column, _generic_sort_key)
+            if column == "nombre":
+                values = self._names_lower
+            else:
+                values = [key_func(row[col]) for row in self.rows]
+            perm = sorted(range(len(self.rows)), key=values.__getitem__)
+            self._sort_cache[column] = perm
+        return perm
+
+    def _match_mask(self, query):
+        """Return a bytearray flagging the rows whose name contains query."""
+        cached_query, mask = self._match_cache
+        if cached_query != query:
+            mask = bytearray(query in name for name in self._names_lower)
+            self._match_cache = (query, mask)
+        return mask
+
+    def view(self, query="", column="nombre", descending=False):
+        """
+        Return the row positions to display, filtered and sorted.
+
+        Args:
+            query (str): Lower-cased search text matched against the name
+            column (str): Column to sort by
+            descending (bool): Reverse the sort order
+
+        Returns:
+            list: Row positions in display order
+        """
+        perm = self.sort_permutation(column)
+        ordered = reversed(perm) if descending else perm
+        if not query:
+            return list(ordered)
+        mask = self._match_mask(query)
+        return [pos for pos in ordered if mask[pos]]
+
+
+class FavListModel:
+    """
+    Ordered entries of one favourite list, addressed by stable row ids.
+
+    Row ids double as Treeview item ids. Every reordering operation returns
+    the inclusive (lo, hi) index range whose rows changed position, so the
+    view only has to move and renumber that range.
+    """
+
+    def __init__(self, rows=()):
+        """
+        Args:
+            rows (iterable): (fav_entry, values) pairs in list order, where
+                values are the display columns after "#"
+        """
+        self._ids = []
+        self._entries = {}
+        self._values = {}
+        self._index = {}
+        self._next_id = 0
+        for entry, values in rows:
+            self.append(entry, values)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, row_id):
+        return row_id in self._index
+
+    @property
+    def ids(self):
+        """Row ids in list order (do not modify)."""
+        return self._ids
+
+    def index(self, row_id):
+        return self._index[row_id]
+
+    def entry(self, row_id):
+        return self._entries[row_id]
+
+    def values(self, row_id):
+        return self._values[row_id]
+
+    def entries(self):
+        """Return the favourite entries in list order, ready for stProgNo."""
+        entries = self._entries
+        return [entries[row_id] for row_id in self._ids]
+
+    def append(self, entry, values):
+        """
+        Add an entry at the end of the list.
+
+        Returns:
+            str: The new row id
+        """
+        row_id = f"r{self._next_id}"
+        self._next_id += 1
+        self._index[row_id] = len(self._ids)
+        self._ids.append(row_id)
+        self._entries[row_id] = entry
+        self._values[row_id] = tuple(values)
+        return row_id
+
+    def clear(self):
+        self._ids = []
+        self._entries = {}
+        self._values = {}
+        self._index = {}
+
+    def snapshot(self):
+        """Return an opaque copy of the list for restore()."""
+        return list(self._ids), dict(self._entries), dict(self._values), self._next_id
+
+    def restore(self, snapshot):
+        """Put the list back as it was when snapshot() was taken."""
+        ids, entries, values, next_id = snapshot
+        self._ids = list(ids)
+        self._entries = dict(entries)
+        self._values = dict(values)
+        self._next_id = next_id
+        self._index = {row_id: i for i, row_id in enumerate(self._ids)}
+
+    def replace(self, rows):
+        """
+        Rebuild the list in one pass.
+
+        Args:
+            rows (iterable): Existing row ids, which keep their id, entry and
+                values, or (fav_entry, values) pairs for new rows. Existing
+                rows left out are removed.
+        """
+        entries, values = self._entries, self._values
+        self.clear()
+        for row in rows:
+            if isinstance(row, str):
+                self._index[row] = len(self._ids)
+                self._ids.append(row)
+                self._entries[row] = entries[row]
+                self._values[row] = values[row]
+            else:
+                self.append(*row)
+
+    def remove(self, row_ids):
+        """
+        Remove rows from the list.
+
+        Returns:
+            int or None: First index whose row changed, None if nothing was removed
+        """
+        doomed = {row_id for row_id in row_ids if row_id in self._index}
+        if not doomed:
+            return None
+        lo = min(self._index[row_id] for row_id in doomed)
+        for row_id in doomed:
+            del self._index[row_id]
+            del self._entries[row_id]
+            del self._values[row_id]
+        self._ids[lo:] = [row_id for row_id in self._ids[lo:] if row_id not in doomed]
+        self._reindex(lo, len(self._ids) - 1)
+        return lo
+
+    def _positions(self, row_ids):
+        return sorted({self._index[row_id] for row_id in row_ids if row_id in self._index})
+
+    def _reindex(self, lo, hi):
+        ids = self._ids
+        index = self._index
+        for i in range(lo, hi + 1):
+            index[ids[i]] = i
+
+    def move(self, row_ids, direction):
+        """
+        Move rows one step up (-1) or down (1).
+
+        Rows that hit the edge of the list, or a selected row that could not
+        move, stay in place so the selection keeps its shape.
+
+        Returns:
+            tuple or None: Affected (lo, hi) range, None if nothing moved
+        """
+        positions = self._positions(row_ids)
+        if direction < 0:
+            limit = 0
+        else:
+            positions.reverse()
+            limit = len(self._ids) - 1
+        ids = self._ids
+        lo = hi = None
+        for pos in positions:
+            new_pos = pos + direction
+            if (direction < 0 and new_pos < limit) or (direction > 0 and new_pos > limit):
+                limit = pos - direction
+                continue
+            ids[pos], ids[new_pos] = ids[new_pos], ids[pos]
+            lo = min(pos, new_pos) if lo is None else min(lo, pos, new_pos)
+            hi = max(pos, new_pos) if hi is None else max(hi, pos, new_pos)
+        if lo is None:
+            return None
+        self._reindex(lo, hi)
+        return lo, hi
+
+    def move_to(self, row_ids, position):
+        """
+        Move rows as one block so the first of them lands at position.
+
+        The block keeps the rows' relative order; position is clamped to the
+        valid range.
+
+        Returns:
+            tuple or None: Affected (lo, hi) range, None if nothing moved
+        """
+        positions = self._positions(row_ids)
+        if not positions:
+            return None
+        count = len(positions)
+        position = max(0, min(position, len(self._ids) - count))
+        lo = min(positions[0], position)
+        hi = max(positions[-1], position + count - 1)
+        window = self._ids[lo:hi + 1]
+        selected = {self._ids[pos] for pos in positions}
+        block = [row_id for row_id in window if row_id in selected]
+        others = [row_id for row_id in window if row_id not in selected]
+        split = position - lo
+        new_window = others[:split] + block + others[split:]
+        if new_window == window:
+            return None
+        self._ids[lo:hi + 1] = new_window
+        self._reindex(lo, hi)
+        return lo, hi
+
+    def move_before(self, row_ids, gap):
+        """
+        Move rows as one block into the gap before index gap (len for the end).
+
+        Returns:
+            tuple or None: Affected (lo, hi) range, None if nothing moved
+        """
+        positions = self._positions(row_ids)
+        shift = sum(1 for pos in positions if pos < gap)
+        return self.move_to(row_ids, gap - shift)
+
+
+def make_fav_entry(sid, tp_idx):
+    """Build a favourite list entry for the program with this SID and transponder."""
+    # Key order matters to the receiver
+    return {
+        "uiWord32": (tp_idx << 16) | sid,
+        "unShort": {
+            "sLo16": sid,
+            "sHi16": tp_idx
+        }
+    }
+
+
+def fav_entry_key(entry):
+    """Return the packed (transponder << 16 | SID) key of a favourite entry."""
+    un_short = entry.get("unShort", {})
+    return (un_short.get("sHi16", 0) << 16) | un_short.get("sLo16", 0)
+
+
+def _longest_increasing(seq):
+    """Return the indices of one longest strictly increasing subsequence."""
+    tails = []        # tails[k]: last value of the best subsequence of length k + 1
+    tail_idx = []
+    prev = [-1] * len(seq)
+    for i, value in enumerate(seq):
+        k = bisect.bisect_left(tails, value)
+        if k == len(tails):
+            tails.append(value)
+            tail_idx.append(i)
+        else:
+            tails[k] = value
+            tail_idx[k] = i
+        prev[i] = tail_idx[k - 1] if k else -1
+    result = []
+    i = tail_idx[-1] if tail_idx else -1
+    while i != -1:
+        result.append(i)
+        i = prev[i]
+    result.reverse()
+    return result
+
+
+class FavListDiff:
+    """
+    Changes that turn a favourite list into the channel list of a package.
+
+    Both lists are indexed by packed key once, so the comparison is linear;
+    only telling moved entries apart (a longest increasing subsequence over
+    the shared entries) costs O(k log k) for k shared entries.
+
+    Attributes:
+        added (list): Package keys missing from the list, in package order
+        removed (list): Positions of list entries not in the package, and of
+            repeated entries after the first, in list order
+        moved (list): Positions of shared entries that are out of the
+            package's order, in list order
+        unchanged (int): Shared entries that stay where they are
+    """
+
+    def __init__(self, current, target):
+        """
+        Args:
+            current (list): Packed keys of the favourite list, in list order
+            target (list): Packed keys of the package, in package order
+        """
+        self.current = list(current)
+        self.target = list(dict.fromkeys(target))
+        rank = {key: i for i, key in enumerate(self.target)}
+        first = {}
+        for pos, key in enumerate(self.current):
+            first.setdefault(key, pos)
+        self._rank = rank
+        self._first = first
+
+        shared = [pos for pos, key in enumerate(self.current)
+                  if key in rank and first[key] == pos]
+        stable = {shared[i] for i in _longest_increasing([rank[self.current[pos]] for pos in shared])}
+        self.added = [key for key in self.target if key not in first]
+        self.removed = [pos for pos, key in enumerate(self.current)
+                        if key not in rank or first[key] != pos]
+        self.moved = [pos for pos in shared if pos not in stable]
+        self.unchanged = len(stable)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.moved)
+
+    def plan(self, remove=True, reorder=True):
+        """
+        Merge the changes into the list, leaving untouched entries in place.
+
+        New and moved entries go right after the nearest entry that precedes
+        them in the package and keeps its place (at the top if none does).
+
+        Args:
+            remove (bool): Drop the entries in removed
+            reorder (bool): Move the entries in moved; otherwise they stay
+
+        Returns:
+            list: (position, key) pairs in the new order, where position is
+                the entry's index in the current list or None if it is new
+        """
+        skip = set(self.removed) if remove else set()
+        if reorder:
+            skip.update(self.moved)
+        kept = [pos for pos in range(len(self.current)) if pos not in skip]
+        kept_set = set(kept)
+
+        first = self._first
+        followers = {}
+        anchor = None
+        for key in self.target:
+            pos = first.get(key)
+            if pos in kept_set:
+                anchor = pos
+            else:
+                followers.setdefault(anchor, []).append((pos, key))
+
+        current = self.current
+        result = list(followers.get(None, ()))
+        for pos in kept:
+            result.append((pos, current[pos]))
+            result.extend(followers.get(pos, ()))
+        return result
+
+
+POLARISATIONS = ("H", "V", "L", "R")
+
+
+class TransponderIndex:
+    """
+    Exact lookup of SDX transponders by frequency, polarisation and satellite.
+
+    Keys are (freq, pol, angle) with freq in MHz, pol one of POLARISATIONS
+    and angle the satellite position in tenths of a degree, normalised to
+    0..3599 so that east-positive/west-negative positions and 0..3600 angles
+    compare equal. Lookups with less information fall back to coarser keys
+    and only succeed when they are unambiguous.
+    """
+
+    TOLERANCE = 3
+
+    def __init__(self):
+        self._exact = {}
+        self._by_pol = {}
+        self._by_freq = {}
+
+    def __len__(self):
+        return len(self._by_freq)
+
+    @staticmethod
+    def _angle(angle):
+        return None if angle is None else angle % 3600
+
+    def add(self, tp_idx, freq, pol="", angle=None):
+        """
+        Register a transponder.
+
+        Args:
+            tp_idx (int): Transponder index (sHi16 of the program key)
+            freq (int): Frequency in MHz
+            pol (str): Polarisation letter, '' if unknown
+            angle (int): Satellite position in tenths of a degree, or None
+        """
+        self._exact.setdefault((freq, pol, self._angle(angle)), tp_idx)
+        self._by_pol.setdefault((freq, pol), []).append((tp_idx, self._angle(angle)))
+        self._by_freq.setdefault(freq, []).append(tp_idx)
+
+    def find(self, freq, pol="", position=None, freq_exact=None):
+        """
+        Return the transponder index for a KingOfSat transponder.
+
+        The exact (freq, pol, position) key is tried first, with both the
+        truncated and rounded frequency. Otherwise the nearest frequency
+        within TOLERANCE MHz is used; with a polarisation it must match a
+        single transponder of that polarisation on the same satellite (or on
+        any satellite when the position is unknown), without one the first
+        transponder found wins, as the old frequency-only lookup did.
+
+        Returns:
+            int or None: Transponder index, None if there is no match
+        """
+        freqs = [freq]
+        if freq_exact is not None and round(freq_exact) != freq:
+            freqs.append(round(freq_exact))
+        angle = self._angle(position)
+        if pol:
+            for f in freqs:
+                tp_idx = self._exact.get((f, pol, angle))
+                if tp_idx is not None:
+                    return tp_idx
+        for delta in range(self.TOLERANCE + 1):
+            for f in ((freq,) if delta == 0 else (freq - delta, freq + delta)):
+                if pol:
+                    matches = [tp_idx for tp_idx, tp_angle in self._by_pol.get((f, pol), ())
+                               if angle is None or tp_angle is None or tp_angle == angle]
+                    if matches:
+                        return matches[0] if len(matches) == 1 else None
+                else:
+                    candidates = self._by_freq.get(f)
+                    if candidates:
+                        return candidates[0]
+        return None
+
+
+class ChannelData:
+    """
+    Everything the editor shows of one loaded SDX file.
+
+    Built by ChannelDataProcessor.load_channel_data; a new instance is the
+    empty state of an editor with no file loaded.
+
+    Attributes:
+        all_data_objects (list): The file's objects, edited in place
+        programs_dict (dict): unique_key -> channel data
+        programs_by_sid_tp (dict): "SID_TP" -> channel data of the first
+            program with that key
+        program_list (list): (unique_key, name) tuples in file order
+        transponders (dict): Transponder index -> frequency
+        transponder_index (TransponderIndex): Exact transponder lookup
+        fav_lists_indices (dict): List index -> position of its object
+        fav_names_obj_index (int): Position of the list names object, -1 if none
+        fav_models (dict): List index -> FavListModel
+        channel_model (ChannelListModel): Rows of the general channel list
+        program_matcher (ProgramMatcher): Matcher for imported channels
+        validation (ValidationReport): Integrity report of the objects,
+            None until validated (see channel_validation)
+    """
+
+    def __init__(self, all_data_objects=None):
+        self.all_data_objects = all_data_objects if all_data_objects is not None else []
+        self.programs_dict = {}
+        self.programs_by_sid_tp = {}
+        self.program_list = []
+        self.transponders = {}
+        self.transponder_index = TransponderIndex()
+        self.fav_lists_indices = {}
+        self.fav_names_obj_index = -1
+        self.fav_models = {}
+        self.channel_model = ChannelListModel()
+        self.program_matcher = ProgramMatcher((), self.transponder_index)
+        self.validation = None
+
+    def add_fav_list(self, name):
+        """
+        Add an empty favourite list with the first free index.
+
+        The fav_list_object goes at the end of the objects; when the file has
+        a names object the name is stored there and in box_object.
+
+        Returns:
+            int: Index of the new list
+        """
+        fav_idx = 0
+        while fav_idx in self.fav_lists_indices:
+            fav_idx += 1
+        self.all_data_objects.append({f"fav_list_object_{fav_idx}": {
+            "sNoOfTVFavor": 0, "sNoOfRadioFavor": 0, "stProgNo": []}})
+        self.fav_lists_indices[fav_idx] = len(self.all_data_objects) - 1
+        self.fav_models[fav_idx] = FavListModel()
+
+        if self.fav_names_obj_index != -1:
+            fav_info = self.all_data_objects[self.fav_names_obj_index]["fav_list_info_in_box_object"]
+            names = fav_info.get("aucFavReName", [])
+            while len(names) <= fav_idx:
+                names.append(f"Lista {len(names)}")
+            names[fav_idx] = name
+            fav_info["aucFavReName"] = names
+            fav_info["ucFavNameChangeMask"] = fav_info.get("ucFavNameChangeMask", 0) | (1 << fav_idx)
+            self.sync_fav_names()
+        return fav_idx
+
+    def sync_fav_names(self):
+        """Copy the list names and mask of fav_list_info_in_box_object to box_object."""
+        if self.fav_names_obj_index == -1:
+            return
+        fav_info = self.all_data_objects[self.fav_names_obj_index]["fav_list_info_in_box_object"]
+        names = fav_info.get("aucFavReName", [])
+        mask = fav_info.get("ucFavNameChangeMask", 0)
+        for obj in self.all_data_objects:
+            if isinstance(obj, dict) and "box_object" in obj:
+                box = obj["box_object"]
+                if "aucFavReName" in box:
+                    box["aucFavReName"] = names.copy()
+                    box["ucFavNameChangeMask"] = mask
+                break
@@ -4,12 +4,165 @@ Channel Data Processor Module
 
 This module contains the business logic for parsing, converting, and processing
 satellite TV channel data in SDX and CHL formats. It is separated from the GUI
-to enable unit testing.
+to enable unit testing, and it is the only implementation: the editor loads,
+converts and saves files through ChannelDataProcessor, so tests and benchmarks
+exercise exactly the code users run.
 """
 
+import contextlib
+import gc
 import json
+import os
 import re
 
+from channel_matching import ProgramMatcher
+from channel_models import (
+    POLARISATIONS, ChannelData, ChannelListModel, FavListModel, TransponderIndex, fav_entry_key,
+    make_fav_entry
+)
+from kingofsat import parse_kingofsat_html as _parse_kingofsat_html
+
+_WHITESPACE = re.compile(r'\s*')
+
+# Characters read at a time by iter_objects, and the largest object it waits
+# for before giving up on a position as garbage
+STREAM_CHUNK = 1024 * 1024
+MAX_OBJECT = 16 * 1024 * 1024
+
+
+def favourite_channel_indices(fav):
+    """
+    Return the channel indices of a CHL "fav" record, in list order.
+
+    Files written by this package list them under "Channels"; files written
+    by the editor split them into "TVChs" and "RadioChs". All are accepted.
+    """
+    indices = fav.get('Channels', [])
+    if 'TVChs' in fav or 'RadioChs' in fav:
+        indices = indices + fav.get('TVChs', []) + fav.get('RadioChs', [])
+    return indices
+
+
+def _favourite_masks(favorites):
+    """
+    Return channel index -> FavBit mask for CHL "fav" records.
+
+    Bit N is set for the channels listed by the favourite with Index N,
+    as update_fav_bits sets it for the programs of fav_list_object_N.
+    """
+    masks = {}
+    for fav in favorites:
+        bit = 1 << fav.get('Index', 0)
+        for ch_idx in favourite_channel_indices(fav):
+            masks[ch_idx] = masks.get(ch_idx, 0) | bit
+    return masks
+
+
+def _favourite_objects(favorites, packed_keys):
+    """
+    Build the fav_list_object_N objects and the list names boxes.
+
+    Args:
+        favorites (list): CHL "fav" records
+        packed_keys (dict): Channel index -> packed (transponder << 16 | SID)
+            key; channels missing from it are left out of the lists
+    """
+    objects = []
+    for fav in favorites:
+        entries = []
+        for ch_idx in favourite_channel_indices(fav):
+            key = packed_keys.get(ch_idx)
+            if key is not None:
+                entries.append(make_fav_entry(key & 0xFFFF, key >> 16))
+        objects.append({
+            f"fav_list_object_{fav.get('Index', 0)}": {
+                "sNoOfTVFavor": len(entries),
+                "sNoOfRadioFavor": 0,
+                "stProgNo": entries
+            }
+        })
+    if favorites:
+        # The receiver expects at least 8 names, one per list index
+        max_idx = max([fav.get('Index', 0) for fav in favorites] + [7])
+        names = [f"Lista {i}" for i in range(max_idx + 1)]
+        for fav in favorites:
+            idx = fav.get('Index', 0)
+            names[idx] = fav.get('Name', f'Lista {idx}')
+        mask = (1 << len(names)) - 1
+        objects.append({"fav_list_info_in_box_object": {"aucFavReName": names, "ucFavNameChangeMask": mask}})
+        objects.append({"box_object": {"aucFavReName": list(names), "ucFavNameChangeMask": mask}})
+    return objects
+
+
+@contextlib.contextmanager
+def paused_gc():
+    """
+    Pause the cyclic garbage collector for the duration of the block.
+
+    Building hundreds of thousands of nested dicts triggers a collection
+    every few hundred allocations, each scanning the whole growing tree;
+    converted objects never form cycles, so the collections are wasted.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+# Conversion tables and object templates for the CHL <-> SDX converters. Templates
+# list every field in output order; None marks a per-row slot. Objects are
+# built with template.copy(), which keeps the key order and is much cheaper
+# than evaluating the nested literal for every row. Nested dicts are copied
+# as well, so no two converted objects share state.
+_POLARISATION_CODES = {'H': 0, 'V': 1, 'L': 2, 'R': 3}
+_VIDEO_CODECS = {'MPEG2': 1, 'H264': 2, 'HEVC': 3, 'H265': 3}
+_VIDEO_TYPES = {1: 'MPEG2', 2: 'H264', 3: 'HEVC'}
+_HD_VIDEO_CODECS = frozenset(('HEVC', 'H265'))
+_AUDIO_LANGUAGE_CODES = {'spa': 83, 'eng': 69, 'por': 80, 'fre': 70, 'ger': 71, 'ita': 73}
+_AUDIO_LANGUAGES = {code: lang for lang, code in _AUDIO_LANGUAGE_CODES.items()}
+_AUDIO_CODECS = {'MPEG': 0, 'AAC': 1, 'AC3': 2}
+_AUDIO_TYPES = {code: name for name, code in _AUDIO_CODECS.items()}
+
+_SAT_BITS = {
+    "22Hz": 2, "V12": 0, "DiSEqC": 0, "DiSEqC11": 0, "IsUnicable": 0, "UnicableType": 0,
+    "FTAOnly": 0, "Motor": 0, "SatDir": 0, "LNBPower": 0, "SelectedTP": 0,
+    "NetWorkSearch": 0, "Hide": 0,
+}
+_SAT_TUNER2_BITS = {
+    "22Hz": 2, "DiSEqC": 0, "DiSEqC11": 0, "UnicableType": 0, "Motor": 0, "LNBPower": 0,
+    "SelectedTP": 0,
+}
+_SAT_TUNER2_TEMPLATE = {
+    "LowLnbFreq": 9750, "HighLnbFreq": 10600, "iSatMotoPosition": None, "UnicableCH": 0,
+    "UnicableFreq": 1210, "uiSet": None,
+}
+_SAT_TEMPLATE = {
+    "SatName": None, "LowLnbFreq": 9750, "HighLnbFreq": 10600, "SatAngle": None,
+    "iSatMotoPosition": None, "usUnicableIndex_old": 0, "TunerMask": 1, "UnicableFreq": 1210,
+    "DLNBMask": 0, "DLNBUserBand": 0, "DLNBType": 0, "UnicableCH": 0, "uiSet": None,
+    "tuner2_antena": None,
+}
+_TP_FLAG_TEMPLATE = {"POL": None, "FEC": 4, "IQ": 0, "SatIndex": None, "NetNameNo": 0, "TPIndex": None}
+_TP_TEMPLATE = {
+    "usStartCode": 43690, "usNetworkLen": 0, "Freq": None, "SR": None, "t2_plp_index": 0,
+    "t2_signal": 0, "uiFlag": 0, "ucMUX": 0, "ucQam": 0, "stFlag": None,
+}
+_PROGRAM_BITS = {
+    "Lock": None, "TV": 0, "Skip": None, "CA": None, "VideoCodec": None, "HD": None,
+    "Hide": None, "NetNameSelected": 0,
+}
+_PROGRAM_TEMPLATE = {
+    "uiStartCode": 21845, "ucNameLen": None, "ucAudioPID": None, "ucSubPID": 0,
+    "VideoPID": None, "PCRPID": None, "PMTPID": None, "TTXPID": None, "stProgNo": None,
+    "uiSet": None, "TSID": 0, "ONID": 0, "SDTServiceType": None, "t2mi_pg": None,
+    "t2mi_plp_id": None, "t2mi_payload_pid": None, "FavBit": 0, "iLCN": 0,
+    "uiOriginalLCN": 0, "country_code": 0, "channel_list_id": 0, "visible": 0,
+    "signal_quality": 75, "t2_signal": 0, "t2_plp_index": 0, "t2_plp_id": 0,
+    "t2_lite_or_base": 0, "ServiceName": None, "AudioSelected": 0, "AudioArray": None,
+    "SubtSelected": 0, "SubtArray": None,
+}
 
 class ChannelDataProcessor:
     """
@@ -17,12 +170,13 @@ class ChannelDataProcessor:
     """
 
     @staticmethod
-    def parse_chl_file(path):
+    def parse_chl_file(path, progress=None):
         """
         Parse a CHL file and extract all data.
         
         Args:
             path (str): Path to the CHL file
+            progress (callable): Optional decoding progress, as in decode_objects
             
         Returns:
             dict: Parsed data containing index, favorites, satellites, 
@@ -38,38 +192,196 @@ class ChannelDataProcessor:
             'transponders': [],
             'channels': []
         }
+        groups = {
+            'fav': data['favorites'],
+            'sat': data['satellites'],
+            'tp': data['transponders'],
+            'ch': data['channels']
+        }
 
-        decoder = json.JSONDecoder()
+        for obj in ChannelDataProcessor.decode_objects(content, progress):
+            if not isinstance(obj, dict):
+                continue
+            obj_type = obj.get('Type', '')
+            if obj_type == 'index':
+                data['index'] = obj
+            elif obj_type in groups:
+                groups[obj_type].append(obj)
+
+        return data
+
+    @staticmethod
+    def decode_objects(content, progress=None, progress_every=1000):
+        """
+        Decode a sequence of concatenated JSON objects (SDX/CHL content).
+
+        Runs in linear time over the content. Characters that do not start a
+        valid JSON value are skipped one at a time.
+
+        Args:
+            content (str): File content
+            progress (callable): Optional progress(position, total, count),
+                called every progress_every decoded objects
+            progress_every (int): Objects between progress calls
+
+        Returns:
+            list: Decoded objects in file order
+        """
+        objects = []
+        raw_decode = json.JSONDecoder().raw_decode
+        skip_ws = _WHITESPACE.match
+        total = len(content)
         pos = 0
-        while pos < len(content):
-            chunk = content[pos:].lstrip()
-            if not chunk:
+        while pos < total:
+            start = skip_ws(content, pos).end()
+            if start >= total:
                 break
             try:
-                obj, index = decoder.raw_decode(chunk)
-                obj_type = obj.get('Type', '')
-
-                if obj_type == 'index':
-                    data['index'] = obj
-                elif obj_type == 'fav':
-                    data['favorites'].append(obj)
-                elif obj_type == 'sat':
-                    data['satellites'].append(obj)
-                elif obj_type == 'tp':
-                    data['transponders'].append(obj)
-                elif obj_type == 'ch':
-                    data['channels'].append(obj)
-
-                pos += (len(content[pos:]) - len(chunk)) + index
+                obj, pos = raw_decode(content, start)
             except json.JSONDecodeError:
                 pos += 1
+                continue
+            objects.append(obj)
+            if progress is not None and len(objects) % progress_every == 0:
+                progress(pos, total, len(objects))
 
-        return data
+        if progress is not None:
+            progress(total, total, len(objects))
+        return objects
+
+    @staticmethod
+    def iter_objects(stream, chunk_size=STREAM_CHUNK, max_object=MAX_OBJECT):
+        """
+        Decode concatenated JSON objects from a text stream, one at a time.
+
+        Streaming counterpart of decode_objects: only the current chunk and
+        the object being decoded are held in memory. As there, characters
+        that do not start a valid JSON value are skipped one at a time.
+
+        Args:
+            stream: Text file object
+            chunk_size (int): Characters read at a time
+            max_object (int): Longest object waited for; a position that
+                still does not decode after this many characters is skipped
+
+        Yields:
+            Decoded objects in file order
+        """
+        raw_decode = json.JSONDecoder().raw_decode
+        skip_ws = _WHITESPACE.match
+        buf = ''
+        pos = 0
+        eof = False
+        while True:
+            start = skip_ws(buf, pos).end()
+            if start >= len(buf):
+                if eof:
+                    return
+                buf = stream.read(chunk_size)
+                pos = 0
+                eof = not buf
+                continue
+            try:
+                obj, end = raw_decode(buf, start)
+                truncated = end == len(buf)
+            except json.JSONDecodeError as e:
+                end = None
+                # A value cut by the end of the buffer fails at its very end
+                # (or inside a literal or escape just before it), or as an
+                # unterminated string; anything else is garbage
+                truncated = e.pos >= len(buf) - 8 or e.msg.startswith("Unterminated string")
+            if end is None or truncated:
+                if truncated and not eof and len(buf) - start < max_object:
+                    more = stream.read(chunk_size)
+                    buf = buf[start:] + more
+                    pos = 0
+                    eof = not more
+                    continue
+                if end is None:
+                    pos = start + 1
+                    continue
+            yield obj
+            pos = end
+
+    @staticmethod
+    def convert_chl_file(chl_path, sdx_path, chunk_size=STREAM_CHUNK):
+        """
+        Convert a CHL file to an SDX file in bounded memory.
+
+        Two streaming passes over the input: the first keeps only the
+        satellites, transponders and favourites; the second converts and
+        writes every channel as it is decoded, remembering the (SID,
+        transponder) of the channels that favourites refer to. FavBit is set
+        from the favourites read in the first pass, by channel index and for
+        later programs with the same (SID, transponder). The output is
+        written to a temporary file and moved into place at the end.
+
+        Args:
+            chl_path (str): CHL file to read
+            sdx_path (str): SDX file to write
+            chunk_size (int): Characters read at a time
+
+        Returns:
+            dict: Number of satellites, transponders, channels and
+                favourites written
+        """
+        def chl_objects():
+            with open(chl_path, 'r', encoding='utf-8', errors='replace') as f:
+                for obj in ChannelDataProcessor.iter_objects(f, chunk_size):
+                    if isinstance(obj, dict):
+                        yield obj.get('Type', ''), obj
+
+        groups = {'sat': [], 'tp': [], 'fav': []}
+        for obj_type, obj in chl_objects():
+            if obj_type in groups:
+                groups[obj_type].append(obj)
+        index_masks = _favourite_masks(groups['fav'])
+
+        encode = json.JSONEncoder(separators=(',', ':')).encode
+        convert_channel = ChannelDataProcessor.convert_channel
+        packed_keys = {}
+        key_masks = {}
+        channels = 0
+        tmp_path = sdx_path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as out:
+                write = out.write
+                for sat in groups['sat']:
+                    write(encode(ChannelDataProcessor.convert_satellite(sat)))
+                for tp in groups['tp']:
+                    write(encode(ChannelDataProcessor.convert_transponder(tp)))
+                for obj_type, ch in chl_objects():
+                    if obj_type != 'ch':
+                        continue
+                    idx = ch.get('Index', 0)
+                    packed = (ch.get('TPIndex', 0) << 16) | int(ch.get('SID', '0'))
+                    program = convert_channel(ch)
+                    mask = index_masks.get(idx)
+                    if mask is not None:
+                        packed_keys[idx] = packed
+                        mask = key_masks[packed] = key_masks.get(packed, 0) | mask
+                    else:
+                        mask = key_masks.get(packed)
+                    if mask:
+                        program[f"program_tv_object_{idx}"]["FavBit"] = mask
+                    write(encode(program))
+                    channels += 1
+                for obj in _favourite_objects(groups['fav'], packed_keys):
+                    write(encode(obj))
+            os.replace(tmp_path, sdx_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        return {'satellites': len(groups['sat']), 'transponders': len(groups['tp']),
+                'channels': channels, 'favorites': len(groups['fav'])}
 
     @staticmethod
     def parse_kingofsat_html(html_content):
         """
         Parse KingOfSat HTML to extract channel information.
+
+        The page is parsed in a single pass; see kingofsat.KingOfSatParser.
         
         Args:
             html_content (str): HTML content from KingOfSat
@@ -77,65 +389,7 @@ class ChannelDataProcessor:
         Returns:
             list: List of channel dictionaries with name, sid, and freq
         """
-        channels = []
-        
-        # Search for frequencies: class="bld">10758.50</td>
-        # Format: 5 digits dot 2 decimals
-        freq_pattern = re.compile(r'class="bld">(\d{5})\.\d{2}</td>')
-        
-        # Search for channel blocks: from <tr data-channel-id to </tr>
-        channel_pattern = re.compile(
-            r'<tr\s+data-channel-id="(\d+)">(.*?)</tr>',
-            re.DOTALL | re.IGNORECASE
-        )
-        
-        # First, extract all frequencies with their positions
-        freq_positions = []
-        for match in freq_pattern.finditer(html_content):
-            freq_positions.append((match.start(), int(match.group(1))))
-        
-        # For each channel, find the most recent frequency (earlier in HTML)
-        for match in channel_pattern.finditer(html_content):
-            channel_pos = match.start()
-            channel_html = match.group(2)
-            
-            # Find the closest previous frequency
-            freq = 0
-            for pos, f in freq_positions:
-                if pos < channel_pos:
-                    freq = f
-                else:
-                    break
-            
-            # Extract name: class="A3">ChannelName</a>
-            name_match = re.search(r'class="A3">([^<]+)</a>', channel_html)
-            if not name_match:
-                continue
-            name = name_match.group(1).strip()
-            
-            # Extract SID: <td class="s">29850</td>
-            sid_match = re.search(r'<td class="s">(\d+)</td>', channel_html)
-            if not sid_match:
-                continue
-            sid = int(sid_match.group(1))
-            
-            if name and sid:
-                channels.append({
-                    'name': name,
-                    'sid': sid,
-                    'freq': freq
-                })
-        
-        # Remove duplicates (same name and SID)
-        seen = set()
-        unique = []
-        for ch in channels:
-            key = (ch['name'], ch['sid'])
-            if key not in seen:
-                seen.add(key)
-                unique.append(ch)
-        
-        return unique
+        return _parse_kingofsat_html(html_content)
 
     @staticmethod
     def get_service_type(sdt_type):
@@ -158,10 +412,131 @@ class ChannelDataProcessor:
         }
         return types.get(sdt_type, f"Tipo {sdt_type}")
 
+    @staticmethod
+    def convert_satellite(sat):
+        """Convert one CHL "sat" record to a satellite_object_N object."""
+        idx = sat.get('Index', 0)
+        tuner2 = _SAT_TUNER2_TEMPLATE.copy()
+        tuner2["iSatMotoPosition"] = idx
+        tuner2["uiSet"] = {"uiBit": _SAT_TUNER2_BITS.copy(), "uiStatus": 5}
+        obj = _SAT_TEMPLATE.copy()
+        obj["SatName"] = sat.get('Name', f'Sat {idx}')
+        obj["SatAngle"] = int(sat.get('Angle', '0'))
+        obj["iSatMotoPosition"] = idx
+        obj["uiSet"] = {"uiBit": _SAT_BITS.copy(), "uiStatus": 5}
+        obj["tuner2_antena"] = tuner2
+        return {f"satellite_object_{idx}": obj}
+
+    @staticmethod
+    def convert_transponder(tp):
+        """Convert one CHL "tp" record to a transponder_object_N object."""
+        idx = tp.get('Index', 0)
+        flags = _TP_FLAG_TEMPLATE.copy()
+        flags["POL"] = _POLARISATION_CODES.get(tp.get('Pol', 'H').upper(), 0)
+        flags["SatIndex"] = tp.get('SatIndex', 0)
+        flags["TPIndex"] = idx
+        obj = _TP_TEMPLATE.copy()
+        obj["Freq"] = int(tp.get('Freq', '0'))
+        obj["SR"] = int(tp.get('SR', '0'))
+        obj["stFlag"] = flags
+        return {f"transponder_object_{idx}": obj}
+
+    @staticmethod
+    def convert_channel(ch):
+        """
+        Convert one CHL "ch" record to a program_tv_object_N object.
+
+        A channel is HD when its name says so or its video is HEVC. Its audio
+        tracks come from "Audio"; records without them get one track in the
+        language of "AudioLang" (Spanish by default).
+        """
+        get = ch.get
+        idx = get('Index', 0)
+        tp_idx = get('TPIndex', 0)
+        sid = int(get('SID', '0'))
+        name = get('Name', f'Canal {idx}')
+        video_type = get('VideoType', 'MPEG2')
+        is_hd = 1 if 'HD' in name.upper() or 'HD' in video_type or video_type in _HD_VIDEO_CODECS else 0
+
+        audio_array = []
+        for aud in get('Audio', ()):
+            codec = _AUDIO_CODECS.get(aud.get('Type'))
+            if not codec:
+                codec = 2 if aud.get('DolbyAC3', 0) else 0
+            audio_array.append({
+                "PID": aud.get('PID', 0),
+                "Mode": 0,
+                "Lang": _AUDIO_LANGUAGE_CODES.get(aud.get('Lang', 'und'), 0),
+                "Codec": codec
+            })
+        if not audio_array:
+            lang = _AUDIO_LANGUAGE_CODES.get(get('AudioLang', 'spa').lower()[:3], 83)
+            audio_array.append({"PID": 0, "Mode": 0, "Lang": lang, "Codec": 0})
+
+        bits = _PROGRAM_BITS.copy()
+        bits["Lock"] = get('Lock', 0)
+        bits["Skip"] = get('Skip', 0)
+        bits["CA"] = 1 if get('CA', 0) > 0 else 0
+        bits["VideoCodec"] = _VIDEO_CODECS.get(video_type, 1)
+        bits["HD"] = is_hd
+        bits["Hide"] = get('Hide', 0)
+
+        video_pid = get('VideoPID', 0)
+        obj = _PROGRAM_TEMPLATE.copy()
+        obj["ucNameLen"] = len(name)
+        obj["ucAudioPID"] = len(audio_array)
+        obj["VideoPID"] = video_pid
+        obj["PCRPID"] = get('PcrPID', video_pid)
+        obj["PMTPID"] = get('PmtPID', 0)
+        obj["TTXPID"] = get('TTXPID', 8191)
+        obj["stProgNo"] = {
+            "ServiceID": f"{tp_idx:08d}{sid:06d}",
+            "unShort": {"sLo16": sid, "sHi16": tp_idx}
+        }
+        obj["uiSet"] = {"uiBit": bits, "uiStatus": 0}
+        obj["SDTServiceType"] = 25 if is_hd else 1
+        obj["t2mi_pg"] = get('t2miPg', 0)
+        obj["t2mi_plp_id"] = get('t2miPlpId', 0)
+        obj["t2mi_payload_pid"] = get('t2miPayloadPid', 8191)
+        obj["ServiceName"] = name
+        obj["AudioArray"] = audio_array
+        obj["SubtArray"] = []
+        return {f"program_tv_object_{idx}": obj}
+
+    @staticmethod
+    def convert_satellites(satellites):
+        """
+        Convert CHL satellite records to SDX satellite objects.
+
+        Args:
+            satellites (list): CHL "sat" objects
+
+        Returns:
+            list: satellite_object_N objects
+        """
+        return list(map(ChannelDataProcessor.convert_satellite, satellites))
+
+    @staticmethod
+    def convert_transponders(transponders):
+        """
+        Convert CHL transponder records to SDX transponder objects.
+
+        Args:
+            transponders (list): CHL "tp" objects
+
+        Returns:
+            list: transponder_object_N objects
+        """
+        return list(map(ChannelDataProcessor.convert_transponder, transponders))
+
     @staticmethod
     def convert_chl_to_sdx(chl_data):
         """
         Convert CHL data to SDX format.
+
+        Table-driven: every object is a copy of its kind's template with only
+        the per-row slots filled in (see the templates at the top of this
+        module), built with the garbage collector paused.
         
         Args:
             chl_data (dict): Parsed CHL data
@@ -169,290 +544,385 @@ class ChannelDataProcessor:
         Returns:
             list: List of SDX objects
         """
-        sdx_objects = []
-
-        # Convert satellites
-        for sat in chl_data.get('satellites', []):
-            idx = sat.get('Index', 0)
-            angle = int(sat.get('Angle', '0'))
-            sdx_sat = {
-                f"satellite_object_{idx}": {
-                    "SatName": sat.get('Name', f'Sat {idx}'),
-                    "LowLnbFreq": 9750,
-                    "HighLnbFreq": 10600,
-                    "SatAngle": angle,
-                    "iSatMotoPosition": idx,
-                    "usUnicableIndex_old": 0,
-                    "TunerMask": 1,
-                    "UnicableFreq": 1210,
-                    "DLNBMask": 0,
-                    "DLNBUserBand": 0,
-                    "DLNBType": 0,
-                    "UnicableCH": 0,
-                    "uiSet": {
-                        "uiBit": {
-                            "22Hz": 2,
-                            "V12": 0,
-                            "DiSEqC": 0,
-                            "DiSEqC11": 0,
-                            "IsUnicable": 0,
-                            "UnicableType": 0,
-                            "FTAOnly": 0,
-                            "Motor": 0,
-                            "SatDir": 0,
-                            "LNBPower": 0,
-                            "SelectedTP": 0,
-                            "NetWorkSearch": 0,
-                            "Hide": 0
-                        },
-                        "uiStatus": 5
-                    },
-                    "tuner2_antena": {
-                        "LowLnbFreq": 9750,
-                        "HighLnbFreq": 10600,
-                        "iSatMotoPosition": idx,
-                        "UnicableCH": 0,
-                        "UnicableFreq": 1210,
-                        "uiSet": {
-                            "uiBit": {
-                                "22Hz": 2,
-                                "DiSEqC": 0,
-                                "DiSEqC11": 0,
-                                "UnicableType": 0,
-                                "Motor": 0,
-                                "LNBPower": 0,
-                                "SelectedTP": 0
-                            },
-                            "uiStatus": 5
-                        }
-                    }
-                }
-            }
-            sdx_objects.append(sdx_sat)
-
-        # Convert transponders
-        pol_map = {'H': 0, 'V': 1, 'L': 2, 'R': 3}
-        for tp in chl_data.get('transponders', []):
-            idx = tp.get('Index', 0)
-            freq = int(tp.get('Freq', '0'))
-            sr = int(tp.get('SR', '0'))
-            pol_str = tp.get('Pol', 'H')
-            pol = pol_map.get(pol_str.upper(), 0)
-            sat_idx = tp.get('SatIndex', 0)
-
-            sdx_tp = {
-                f"transponder_object_{idx}": {
-                    "usStartCode": 43690,
-                    "usNetworkLen": 0,
-                    "Freq": freq,
-                    "SR": sr,
-                    "t2_plp_index": 0,
-                    "t2_signal": 0,
-                    "uiFlag": 0,
-                    "ucMUX": 0,
-                    "ucQam": 0,
-                    "stFlag": {
-                        "POL": pol,
-                        "FEC": 4,
-                        "IQ": 0,
-                        "SatIndex": sat_idx,
-                        "NetNameNo": 0,
-                        "TPIndex": idx
-                    }
-                }
-            }
-            sdx_objects.append(sdx_tp)
-
-        # Convert channels
-        video_codec_map = {'MPEG2': 1, 'H264': 2, 'HEVC': 3, 'H265': 3}
-        for ch in chl_data.get('channels', []):
-            idx = ch.get('Index', 0)
-            tp_idx = ch.get('TPIndex', 0)
-            sid = int(ch.get('SID', '0'))
-            name = ch.get('Name', f'Canal {idx}')
-
-            # Video codec
-            video_type = ch.get('VideoType', 'MPEG2')
-            video_codec = video_codec_map.get(video_type, 1)
-
-            # HD detection
-            is_hd = 1 if 'HD' in video_type or video_type in ['HEVC', 'H265'] else 0
-
-            # Audio language
-            audio_lang = ch.get('AudioLang', 'spa')
-            lang_map = {'spa': 83, 'eng': 69, 'por': 80, 'fre': 70, 'ger': 71, 'ita': 73}
-            audio_lang_code = lang_map.get(audio_lang.lower()[:3], 83)
-
-            # CA (encryption)
-            is_ca = ch.get('CA', 0)
-
-            sdx_ch = {
-                f"program_tv_object_{idx}": {
-                    "usStartCode": 43690,
-                    "ServiceName": name,
-                    "stProgNo": {
-                        "unShort": {
-                            "sLo16": sid,
-                            "sHi16": tp_idx
-                        }
-                    },
-                    "iLCN": 0,
-                    "SDTServiceType": 25 if is_hd else 1,
-                    "ucVideoCodec": video_codec,
-                    "ucAudioCodec": 2,
-                    "signal_quality": 0,
-                    "FEC": 4,
-                    "ucTotalCountry": 1,
-                    "ucSubtitle": 0,
-                    "ucCountry": 0,
-                    "ucAC3": 0,
-                    "language_code": audio_lang_code,
-                    "subtitle_language_code": 0,
-                    "uiSet": {
-                        "uiBit": {
-                            "HD": is_hd,
-                            "CA": is_ca,
-                            "Skip": 0,
-                            "Lock": 0,
-                            "Fav": 0,
-                            "Mosaic": 0,
-                            "ServiceType": 3 if is_hd else 0
-                        },
-                        "uiStatus": 0
-                    },
-                    "FavBit": 0
-                }
-            }
-            sdx_objects.append(sdx_ch)
+        with paused_gc():
+            sdx_objects = ChannelDataProcessor.convert_satellites(chl_data.get('satellites', []))
+            sdx_objects += ChannelDataProcessor.convert_transponders(chl_data.get('transponders', []))
+            append = sdx_objects.append
 
-        # Convert favorites
-        for fav in chl_data.get('favorites', []):
-            idx = fav.get('Index', 0)
-            channels_list = fav.get('Channels', [])
-            
-            # Build favorite entries
-            fav_entries = []
-            for pos, ch_idx in enumerate(channels_list):
-                fav_entries.append({
-                    "stProgNo": {
-                        "unShort": {
-                            "sLo16": 0,  # Will be filled by actual channel SID
-                            "sHi16": 0   # Will be filled by actual channel TP
-                        }
-                    },
-                    "usPosition": pos
-                })
-
-            sdx_fav = {
-                f"fav_list_object_{idx}": {
-                    "usStartCode": 43690,
-                    "usTotalNO": len(fav_entries),
-                    "entries": fav_entries
-                }
-            }
-            sdx_objects.append(sdx_fav)
-
-        # Add box object with favorite names
-        if chl_data.get('favorites'):
-            fav_names = []
-            for fav in chl_data.get('favorites', []):
-                name = fav.get('Name', f"Favoritos {fav.get('Index', 0)}")
-                # Pad or truncate to 16 characters
-                padded_name = (name[:16]).ljust(16, '\x00')
-                fav_names.append(padded_name)
-
-            sdx_objects.append({
-                "fav_list_info_in_box_object": {
-                    "usStartCode": 43690,
-                    "ucTotalFavList": len(fav_names),
-                    "FavListName": fav_names
-                }
-            })
+            # Index the packed (TP, SID) key of every channel for the favourites
+            channels = chl_data.get('channels', [])
+            favorites = chl_data.get('favorites', [])
+            packed_keys = {ch.get('Index', 0): (ch.get('TPIndex', 0) << 16) | int(ch.get('SID', '0'))
+                           for ch in channels}
+            key_masks = {}
+            for idx, mask in _favourite_masks(favorites).items():
+                packed = packed_keys.get(idx)
+                if packed is not None:
+                    key_masks[packed] = key_masks.get(packed, 0) | mask
+
+            # Convert channels, with FavBit set as update_fav_bits sets it
+            convert_channel = ChannelDataProcessor.convert_channel
+            for ch in channels:
+                program = convert_channel(ch)
+                idx = ch.get('Index', 0)
+                mask = key_masks.get(packed_keys[idx])
+                if mask:
+                    program[f"program_tv_object_{idx}"]["FavBit"] = mask
+                append(program)
+
+            sdx_objects += _favourite_objects(favorites, packed_keys)
 
         return sdx_objects
 
     @staticmethod
-    def process_sdx_data(all_data_objects):
+    def convert_sdx_to_chl(all_data_objects):
+        """
+        Convert SDX objects to CHL records.
+
+        Favourite entries are written as the index of the first channel with
+        their SID and transponder; entries without a channel are dropped.
+
+        Args:
+            all_data_objects (list): List of SDX objects
+
+        Returns:
+            list: The "index" record followed by the fav, sat, tp and ch
+                records, each kind sorted by index
+        """
+        satellites = []
+        transponders = []
+        channels = []
+        favorites = []
+        names = []
+        for obj in all_data_objects:
+            if not isinstance(obj, dict):
+                continue
+            key = next(iter(obj), "")
+            data = obj.get(key)
+
+            if key.startswith("satellite_object_"):
+                idx = int(key.split("_")[-1])
+                satellites.append((idx, {
+                    "Type": "sat",
+                    "Index": idx,
+                    "Name": data.get("SatName", f"Sat {idx}"),
+                    "Angle": str(data.get("SatAngle", 0)),
+                    "Band": "KU"
+                }))
+
+            elif key.startswith("transponder_object_"):
+                idx = int(key.split("_")[-1])
+                st_flag = data.get("stFlag", {})
+                pol = st_flag.get("POL", 0)
+                transponders.append((idx, {
+                    "Type": "tp",
+                    "Index": idx,
+                    "SatIndex": st_flag.get("SatIndex", 0),
+                    "Freq": str(data.get("Freq", 0)),
+                    "SR": str(data.get("SR", 0)),
+                    "Pol": POLARISATIONS[pol] if 0 <= pol < len(POLARISATIONS) else "H",
+                    "FEC": "auto",
+                    "plsNumber": 0,
+                    "msTp": 0,
+                    "msIsid": 0,
+                    "tsnTp": 0,
+                    "tsnId": 0
+                }))
+
+            elif "program_tv_object" in key:
+                idx = int(key.split("_")[-1])
+                un_short = data.get("stProgNo", {}).get("unShort", {})
+                ui_set = data.get("uiSet", {}).get("uiBit", {})
+                audio_array = []
+                for aud in data.get("AudioArray", []):
+                    codec = aud.get("Codec", 0)
+                    audio_array.append({
+                        "PID": aud.get("PID", 0),
+                        "Type": _AUDIO_TYPES.get(codec, "MPEG"),
+                        "Lang": _AUDIO_LANGUAGES.get(aud.get("Lang", 0), "und"),
+                        "DolbyAC3": 1 if codec == 2 else 0
+                    })
+                channels.append((idx, {
+                    "dataPidSid": None,
+                    "Type": "ch",
+                    "TVType": "TV",
+                    "Index": idx,
+                    "TPIndex": un_short.get("sHi16", 0),
+                    "SID": str(un_short.get("sLo16", 0)),
+                    "Name": data.get("ServiceName", f"Canal {idx}"),
+                    "VideoPID": data.get("VideoPID", 0),
+                    "PcrPID": data.get("PCRPID", 0),
+                    "PmtPID": data.get("PMTPID", 0),
+                    "TTXPID": data.get("TTXPID", 8191),
+                    "Provider": "",
+                    "CA": 2 if ui_set.get("CA", 0) else 0,
+                    "Lock": ui_set.get("Lock", 0),
+                    "Skip": ui_set.get("Skip", 0),
+                    "Hide": ui_set.get("Hide", 0),
+                    "VideoType": _VIDEO_TYPES.get(ui_set.get("VideoCodec", 1), "MPEG2"),
+                    "t2miPg": data.get("t2mi_pg", 0),
+                    "t2miPlpId": data.get("t2mi_plp_id", 0),
+                    "t2miPayloadPid": data.get("t2mi_payload_pid", 8191),
+                    "Audio": audio_array or [{"PID": 0, "Type": "MPEG", "Lang": "und", "DolbyAC3": 0}],
+                    "Sub": [],
+                    "sattv": None,
+                    "data_pid": None,
+                    "PvtPID": None,
+                    "CaSystemIdList": None
+                }))
+
+            elif key.startswith("fav_list_object_"):
+                favorites.append((int(key.split("_")[-1]), data.get("stProgNo", [])))
+
+            elif key == "fav_list_info_in_box_object":
+                names = data.get("aucFavReName", [])
+
+        satellites.sort(key=lambda item: item[0])
+        transponders.sort(key=lambda item: item[0])
+        channels.sort(key=lambda item: item[0])
+        favorites.sort(key=lambda item: item[0])
+
+        # Packed (TP, SID) key -> index of the first channel with it
+        channel_index = {}
+        for ch_idx, ch in channels:
+            channel_index.setdefault((ch["TPIndex"] << 16) | int(ch["SID"]), ch_idx)
+
+        fav_records = []
+        for idx, entries in favorites:
+            name = names[idx] if idx < len(names) and names[idx].strip() else f"Lista {idx}"
+            tv_channels = [channel_index[key] for key in map(fav_entry_key, entries) if key in channel_index]
+            fav_records.append({"Type": "fav", "Index": idx, "Name": name,
+                                "TVChs": tv_channels, "RadioChs": []})
+
+        chl_objects = [{
+            "Type": "index",
+            "Ver": 1,
+            "Sat": len(satellites),
+            "TP": len(transponders),
+            "ChTV": len(channels),
+            "CHRadio": 0,
+            "FAV": len(favorites)
+        }]
+        chl_objects += fav_records
+        chl_objects += [sat for _, sat in satellites]
+        chl_objects += [tp for _, tp in transponders]
+        chl_objects += [ch for _, ch in channels]
+        return chl_objects
+
+    @staticmethod
+    def process_sdx_data(all_data_objects, progress=None, progress_every=5000):
         """
         Process SDX data objects and extract programs and transponders.
         
         Args:
             all_data_objects (list): List of SDX objects
+            progress (callable): Optional progress(done, total), called every
+                progress_every objects and once at the end
+            progress_every (int): Objects between progress calls
             
         Returns:
             tuple: (programs_dict, programs_by_sid_tp, transponders, fav_lists_indices, fav_names_obj_index)
         """
-        programs_dict = {}
-        programs_by_sid_tp = {}
-        transponders = {}
-        fav_lists_indices = {}
-        fav_names_obj_index = -1
-        
-        # First pass: extract transponders
+        transponders, _ = _transponder_tables(all_data_objects)
+        return _program_tables(all_data_objects, transponders, progress, progress_every)
+
+    @staticmethod
+    def build_transponder_index(all_data_objects):
+        """
+        Index the transponders of SDX data by frequency, polarisation and satellite.
+
+        Args:
+            all_data_objects (list): List of SDX objects
+
+        Returns:
+            TransponderIndex: Index over every transponder_object_N
+        """
+        return _transponder_tables(all_data_objects)[1]
+
+    @staticmethod
+    def load_channel_data(all_data_objects, progress=None, progress_every=5000):
+        """
+        Build every model the editor needs for decoded SDX data.
+
+        Args:
+            all_data_objects (list): List of SDX objects, kept by reference
+            progress (callable): As in process_sdx_data
+            progress_every (int): Objects between progress calls
+
+        Returns:
+            ChannelData: Programs, transponders, favourite lists and their models
+        """
+        data = ChannelData(all_data_objects)
+        data.transponders, data.transponder_index = _transponder_tables(all_data_objects)
+        (data.programs_dict, data.programs_by_sid_tp, _, data.fav_lists_indices,
+         data.fav_names_obj_index) = _program_tables(all_data_objects, data.transponders,
+                                                     progress, progress_every)
+        data.program_list = [(key, info['name']) for key, info in data.programs_dict.items()]
+        data.channel_model = ChannelListModel(data.programs_dict, data.program_list)
+        data.program_matcher = ProgramMatcher(data.programs_dict.items(), data.transponder_index)
+        data.fav_models = ChannelDataProcessor.build_fav_models(
+            all_data_objects, data.fav_lists_indices, data.programs_by_sid_tp)
+        return data
+
+    @staticmethod
+    def fav_row_values(info):
+        """Return the favourite list columns (after "#") of a program's channel data."""
+        return (info['name'], info['freq'], info['sid'], info['lcn'], info['hd'], info['ca'], info['tipo'])
+
+    @staticmethod
+    def build_fav_models(all_data_objects, fav_lists_indices, programs_by_sid_tp):
+        """
+        Build the model of every favourite list.
+
+        Entries whose program is not in the file are kept and shown as
+        "Desconocido (SID_TP)".
+
+        Returns:
+            dict: List index -> FavListModel
+        """
+        fav_row_values = ChannelDataProcessor.fav_row_values
+        fav_models = {}
+        for f_idx, obj_idx in fav_lists_indices.items():
+            rows = []
+            for fav_entry in all_data_objects[obj_idx][f"fav_list_object_{f_idx}"].get("stProgNo", []):
+                un_short = fav_entry.get("unShort", {})
+                s_lo16 = un_short.get("sLo16", 0)
+                s_hi16 = un_short.get("sHi16", 0)
+                info = programs_by_sid_tp.get(f"{s_lo16}_{s_hi16}")
+                if info:
+                    rows.append((fav_entry, fav_row_values(info)))
+                else:
+                    rows.append((fav_entry, (f"Desconocido ({s_lo16}_{s_hi16})", "", s_lo16, "", "", "", "")))
+            fav_models[f_idx] = FavListModel(rows)
+        return fav_models
+
+    @staticmethod
+    def update_fav_bits(all_data_objects):
+        """
+        Recompute the FavBit of every program from the favourite lists.
+
+        Bit N of a program's FavBit is set when list N contains its packed
+        (transponder, SID) key.
+
+        Args:
+            all_data_objects (list): List of SDX objects, updated in place
+        """
+        masks = {}
+        programs = []
         for obj in all_data_objects:
             if not isinstance(obj, dict):
                 continue
-            key = list(obj.keys())[0]
-            if "transponder_object_" in key:
-                try:
-                    idx = int(key.split("_")[-1])
-                    data = obj[key]
-                    freq = data.get("Freq", 0)
-                    transponders[idx] = freq
-                except:
-                    pass
-        
-        # Second pass: extract channels and favorites
-        channel_order = 0
-        for i, obj in enumerate(all_data_objects):
-            if not isinstance(obj, dict):
-                continue
-            key = list(obj.keys())[0]
-            
+            key = next(iter(obj), "")
             if "program_tv_object" in key:
-                channel_order += 1
-                data = obj[key]
-                c_name = str(data.get("ServiceName", "Sin Nombre")).strip()
-                st_prog_no = data.get("stProgNo", {})
-                un_short = st_prog_no.get("unShort", {})
-                s_lo16 = un_short.get("sLo16", 0)
-                s_hi16 = un_short.get("sHi16", 0)
-                ui_set = data.get("uiSet", {}).get("uiBit", {})
-                is_hd = ui_set.get("HD", 0)
-                is_ca = ui_set.get("CA", 0)
-                lcn = data.get("iLCN", 0)
-                sdt_type = data.get("SDTServiceType", 0)
-                signal_quality = data.get("signal_quality", 0)
-                freq = transponders.get(s_hi16, 0)
-                prog_idx = key.split("_")[-1]
-                unique_key = f"{s_lo16}_{s_hi16}_{prog_idx}"
-
-                channel_data = {
-                    'name': c_name,
-                    'stProgNo': st_prog_no,
-                    'obj_index': i,
-                    'order': channel_order,
-                    'freq': freq,
-                    'sid': s_lo16,
-                    'lcn': lcn,
-                    'hd': "Sí" if is_hd else "",
-                    'ca': "Cifrado" if is_ca else "Libre",
-                    'tipo': ChannelDataProcessor.get_service_type(sdt_type),
-                    'calidad': f"{signal_quality}%"
-                }
-                programs_dict[unique_key] = channel_data
-                sid_tp_key = f"{s_lo16}_{s_hi16}"
-                if sid_tp_key not in programs_by_sid_tp:
-                    programs_by_sid_tp[sid_tp_key] = channel_data
-            
-            elif "fav_list_object_" in key:
+                programs.append(obj[key])
+            elif key.startswith("fav_list_object_"):
                 try:
-                    idx = int(key.split("_")[-1])
-                    fav_lists_indices[idx] = i
-                except:
-                    pass
-            
-            elif "fav_list_info_in_box_object" in key:
-                fav_names_obj_index = i
-        
-        return programs_dict, programs_by_sid_tp, transponders, fav_lists_indices, fav_names_obj_index
+                    bit = 1 << int(key.split("_")[-1])
+                except ValueError:
+                    continue
+                for fav_entry in obj[key].get("stProgNo", []):
+                    packed = fav_entry_key(fav_entry)
+                    masks[packed] = masks.get(packed, 0) | bit
+
+        for program in programs:
+            program["FavBit"] = masks.get(fav_entry_key(program.get("stProgNo", {})), 0)
+
+
+
+def _transponder_tables(all_data_objects):
+    """
+    Return ({transponder index: frequency}, TransponderIndex) of SDX objects.
+    """
+    transponders = {}
+    sat_angles = {}
+    tp_details = []
+    for obj in all_data_objects:
+        if not isinstance(obj, dict):
+            continue
+        key = next(iter(obj), "")
+        try:
+            if key.startswith("transponder_object_"):
+                data = obj[key]
+                idx = int(key.split("_")[-1])
+                freq = data.get("Freq", 0)
+                transponders[idx] = freq
+                st_flag = data.get("stFlag", {})
+                tp_details.append((idx, freq, st_flag.get("POL", 0), st_flag.get("SatIndex", 0)))
+            elif key.startswith("satellite_object_"):
+                sat_angles[int(key.split("_")[-1])] = obj[key].get("SatAngle")
+        except (ValueError, AttributeError):
+            continue
+
+    index = TransponderIndex()
+    for idx, freq, pol, sat_idx in tp_details:
+        pol_letter = POLARISATIONS[pol] if 0 <= pol < len(POLARISATIONS) else ""
+        index.add(idx, freq, pol_letter, sat_angles.get(sat_idx))
+    return transponders, index
+
+
+def _program_tables(all_data_objects, transponders, progress=None, progress_every=5000):
+    """
+    Collect the programs and favourite lists of SDX objects in one pass.
+
+    Returns:
+        tuple: As ChannelDataProcessor.process_sdx_data
+    """
+    programs_dict = {}
+    programs_by_sid_tp = {}
+    fav_lists_indices = {}
+    fav_names_obj_index = -1
+    get_service_type = ChannelDataProcessor.get_service_type
+    total = len(all_data_objects)
+    channel_order = 0
+    for i, obj in enumerate(all_data_objects):
+        if progress is not None and i % progress_every == 0:
+            progress(i, total)
+        if not isinstance(obj, dict):
+            continue
+        key = next(iter(obj), "")
+
+        if "program_tv_object" in key:
+            channel_order += 1
+            data = obj[key]
+            c_name = str(data.get("ServiceName", "Sin Nombre")).strip()
+            st_prog_no = data.get("stProgNo", {})
+            un_short = st_prog_no.get("unShort", {})
+            s_lo16 = un_short.get("sLo16", 0)
+            s_hi16 = un_short.get("sHi16", 0)
+            ui_set = data.get("uiSet", {}).get("uiBit", {})
+            signal_quality = data.get("signal_quality", 0)
+            # The program index keeps duplicate SID/TP combinations apart
+            prog_idx = key.split("_")[-1]
+            unique_key = f"{s_lo16}_{s_hi16}_{prog_idx}"
+
+            channel_data = {
+                'name': c_name,
+                'stProgNo': st_prog_no,
+                'obj_index': i,
+                'order': channel_order,
+                'freq': transponders.get(s_hi16, 0),
+                'sid': s_lo16,
+                'lcn': data.get("iLCN", 0),
+                'hd': "Sí" if ui_set.get("HD", 0) else "",
+                'ca': "Cifrado" if ui_set.get("CA", 0) else "Libre",
+                'tipo': get_service_type(data.get("SDTServiceType", 0)),
+                'calidad': f"{signal_quality}%"
+            }
+            programs_dict[unique_key] = channel_data
+            # Favourite entries only carry SID and TP: keep the first program
+            sid_tp_key = f"{s_lo16}_{s_hi16}"
+            if sid_tp_key not in programs_by_sid_tp:
+                programs_by_sid_tp[sid_tp_key] = channel_data
+
+        elif "fav_list_object_" in key:
+            try:
+                fav_lists_indices[int(key.split("_")[-1])] = i
+            except ValueError:
+                pass
+
+        elif "fav_list_info_in_box_object" in key:
+            fav_names_obj_index = i
+
+    if progress is not None:
+        progress(total, total)
+    return programs_dict, programs_by_sid_tp, transponders, fav_lists_indices, fav_names_obj_index
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Channel Validation Module
+
+Integrity checks for decoded SDX data. One pass over the objects builds
+hash indexes of satellites, transponders, programs and favourite lists;
+every check is then a dictionary lookup, so validating a file is linear in
+its number of objects and favourite entries:
+
+    report = validate_sdx(all_data_objects)
+    if not report.ok:
+        print(report.summary())
+
+validate_sdx_files() checks a batch of files in a process pool.
+"""
+
+import os
+
+from channel_models import fav_entry_key
+from channel_processor import ChannelDataProcessor
+
+# Issue kinds. Errors break the list on the receiver; warnings are legal
+# but usually a sign of a bad merge or edit
+FAV_MISSING_PROGRAM = "fav_missing_program"
+DUPLICATE_PROGRAM = "duplicate_program"
+MISSING_TRANSPONDER = "missing_transponder"
+MISSING_SATELLITE = "missing_satellite"
+FAV_BIT_MISMATCH = "fav_bit_mismatch"
+FAV_COUNT_MISMATCH = "fav_count_mismatch"
+
+ERRORS = frozenset((FAV_MISSING_PROGRAM, MISSING_TRANSPONDER, MISSING_SATELLITE, FAV_BIT_MISMATCH))
+# Reports list errors first
+_KIND_ORDER = {kind: n for n, kind in enumerate((
+    FAV_MISSING_PROGRAM, MISSING_TRANSPONDER, MISSING_SATELLITE, FAV_BIT_MISMATCH,
+    DUPLICATE_PROGRAM, FAV_COUNT_MISMATCH))}
+
+
+class ValidationReport:
+    """
+    Problems found in one file.
+
+    Attributes:
+        issues (list): (kind, obj_index, message) tuples, errors first and
+            in object order within each kind
+        objects (int): Number of objects checked
+        programs (int): Number of programs checked
+    """
+
+    def __init__(self):
+        self.issues = []
+        self.objects = 0
+        self.programs = 0
+
+    def add(self, kind, obj_index, message):
+        self.issues.append((kind, obj_index, message))
+
+    @property
+    def ok(self):
+        return not self.issues
+
+    @property
+    def errors(self):
+        """Issues whose kind is in ERRORS."""
+        return [issue for issue in self.issues if issue[0] in ERRORS]
+
+    def counts(self):
+        """Return {kind: number of issues}, errors first."""
+        counts = {}
+        for kind, _, _ in self.issues:
+            counts[kind] = counts.get(kind, 0) + 1
+        return counts
+
+    def summary(self):
+        if self.ok:
+            return f"no problems in {self.programs} programs"
+        return ", ".join(f"{count} {kind}" for kind, count in self.counts().items())
+
+
+def validate_sdx(all_data_objects):
+    """
+    Check the references and derived fields of SDX data.
+
+    Finds favourite entries whose program does not exist, programs sharing
+    a (SID, transponder) pair (favourites and the editor only reach the
+    first), programs on missing transponders, transponders on missing
+    satellites, FavBit values that disagree with the favourite lists and
+    sNoOfTVFavor counts that disagree with the entries.
+
+    Args:
+        all_data_objects (list): List of SDX objects
+
+    Returns:
+        ValidationReport: Problems found
+    """
+    report = ValidationReport()
+    report.objects = len(all_data_objects)
+    satellites = set()
+    transponders = {}
+    programs = []
+    fav_lists = []
+    for i, obj in enumerate(all_data_objects):
+        if not isinstance(obj, dict):
+            continue
+        key = next(iter(obj), "")
+        data = obj[key] if key else None
+        if not isinstance(data, dict):
+            continue
+        if "program_tv_object" in key:
+            programs.append((i, key, data))
+            continue
+        idx = key.rsplit("_", 1)[-1]
+        if not idx.isdigit():
+            continue
+        if key.startswith("satellite_object_"):
+            satellites.add(int(idx))
+        elif key.startswith("transponder_object_"):
+            transponders[int(idx)] = (i, key, data.get("stFlag", {}).get("SatIndex", 0))
+        elif key.startswith("fav_list_object_"):
+            fav_lists.append((i, key, int(idx), data))
+    report.programs = len(programs)
+
+    for i, key, sat_idx in transponders.values():
+        if sat_idx not in satellites:
+            report.add(MISSING_SATELLITE, i, f"{key} is on satellite {sat_idx}, which does not exist")
+
+    first_by_key = {}
+    for i, key, data in programs:
+        packed = fav_entry_key(data.get("stProgNo", {}))
+        sid, tp_idx = packed & 0xFFFF, packed >> 16
+        if tp_idx not in transponders:
+            report.add(MISSING_TRANSPONDER, i, f"{key} is on transponder {tp_idx}, which does not exist")
+        first = first_by_key.setdefault(packed, key)
+        if first != key:
+            report.add(DUPLICATE_PROGRAM, i,
+                       f"{key} has SID {sid} on transponder {tp_idx} like {first}; "
+                       f"favourites only reach {first}")
+
+    masks = {}
+    for i, key, fav_idx, data in fav_lists:
+        bit = 1 << fav_idx
+        entries = data.get("stProgNo", [])
+        for pos, entry in enumerate(entries):
+            packed = fav_entry_key(entry)
+            masks[packed] = masks.get(packed, 0) | bit
+            if packed not in first_by_key:
+                report.add(FAV_MISSING_PROGRAM, i,
+                           f"{key} entry {pos + 1} points to SID {packed & 0xFFFF} on transponder "
+                           f"{packed >> 16}, which has no program")
+        count = data.get("sNoOfTVFavor", len(entries))
+        if count != len(entries):
+            report.add(FAV_COUNT_MISMATCH, i, f"{key} says {count} channels but has {len(entries)}")
+
+    for i, key, data in programs:
+        expected = masks.get(fav_entry_key(data.get("stProgNo", {})), 0)
+        if data.get("FavBit", 0) != expected:
+            report.add(FAV_BIT_MISMATCH, i,
+                       f"{key} has FavBit {data.get('FavBit', 0)} but its lists give {expected}")
+
+    report.issues.sort(key=lambda issue: _KIND_ORDER[issue[0]])
+    return report
+
+
+def validate_sdx_file(path):
+    """Read, decode and validate an SDX file."""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return validate_sdx(ChannelDataProcessor.decode_objects(f.read()))
+
+
+def validate_sdx_files(paths, max_workers=None):
+    """
+    Validate SDX files in a process pool.
+
+    Args:
+        paths (list): SDX files
+        max_workers (int): Worker processes, os.cpu_count() if None
+
+    Returns:
+        tuple: ({path: ValidationReport}, {path: error}) for the files that
+            could be read and those that could not
+    """
+    reports = {}
+    errors = {}
+    if len(paths) == 1:
+        try:
+            reports[paths[0]] = validate_sdx_file(paths[0])
+        except OSError as e:
+            errors[paths[0]] = e
+    elif paths:
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = max(1, min(max_workers or os.cpu_count() or 1, len(paths)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(path, pool.submit(validate_sdx_file, path)) for path in paths]
+            for path, future in futures:
+                try:
+                    reports[path] = future.result()
+                except OSError as e:
+                    errors[path] = e
+    return reports, errors
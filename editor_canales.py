@@ -1,18 +1,71 @@
 #!/usr/bin/env python3
+import time
+
+_STARTUP_T0 = time.perf_counter()
+
 import json
 import os
-import re
 import sys
-import traceback
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog, ttk
-from urllib.request import urlopen, Request
-from urllib.error import URLError
+
+# urllib, traceback y re se importan al usarse (importación KingOfSat,
+# diálogos de error, comprobación de integridad, combinar reescaneo) para no
+# retrasar el arranque, y latency solo con --profile
+from background import BackgroundTask
+from channel_models import ChannelData, FavListDiff, fav_entry_key, make_fav_entry
+from channel_processor import ChannelDataProcessor
+from profiling import PhaseProfiler
+
+
+class StartupProfile:
+    """
+    Mide las fases del arranque (activado con --startup-profile o la variable
+    de entorno EDITOR_CANALES_STARTUP_PROFILE) y las imprime en stderr con el
+    formato de python -X importtime.
+    """
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.last = _STARTUP_T0
+        self.phases = []
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last, now - _STARTUP_T0))
+        self.last = now
+
+    def report(self):
+        if not self.enabled or not self.phases:
+            return
+        print("startup: self [us] | cumulative | phase", file=sys.stderr)
+        for phase, own, cumulative in self.phases:
+            print(f"startup: {own * 1e6:9.0f} | {cumulative * 1e6:10.0f} | {phase}", file=sys.stderr)
+        self.phases = []
+
+
+# Número máximo de problemas listados en el informe de integridad
+VALIDATION_SHOWN = 500
 
 
 class SDXEditorApp:
-    def __init__(self, root):
+    def __init__(self, root, path=None, profile=None, profiler=None, latency=None):
         self.root = root
+        self.startup_profile = profile
+        # Modo de perfilado (--profile): tiempos por fase de cada operación y
+        # latencia de los manejadores de eventos de Tk
+        self.profiler = profiler or PhaseProfiler()
+        self.latency = latency
+        if latency is not None:
+            latency.size = self._model_size
+
+        # Empezar a leer el archivo de la línea de comandos mientras se construye la interfaz
+        startup_task = None
+        if path:
+            startup_task = BackgroundTask(self._open_job(path), path).start()
+
         self.root.title("Editor de canales SAT - v3.0")
         self.root.geometry("1500x800")
 
@@ -30,13 +83,19 @@ class SDXEditorApp:
         # Cursor de espera compatible con Linux, macOS y Windows
         self.cursor_wait = "watch" if sys.platform == "linux" else "wait"
 
-        self.all_data_objects = []
-        self.programs_dict = {}
-        self.program_list = []
-        self.transponders = {}
-        self.fav_lists_indices = {}
-        self.fav_names_obj_index = -1
-        self.fav_trees = {}
+        # Datos del archivo cargado (objetos, canales, listas de favoritos...)
+        self.data = ChannelData()
+        self.fav_tab_frames = {}
+        self.fav_tab_ids = {}
+        # Un único Treeview de favoritos: lista enlazada y vista guardada de cada lista
+        self.fav_tree_tab = None
+        self.fav_view_state = {}
+        # Deshacer: (lista, modelo, snapshot) antes de cada operación en bloque
+        self.fav_undo = []
+
+        # Orden de la lista general (columna y sentido)
+        self.sort_column = "nombre"
+        self.sort_descending = False
         
         # Flag para controlar cambios no guardados
         self.unsaved_changes = False
@@ -47,7 +106,15 @@ class SDXEditorApp:
         # Variable para edición inline
         self.edit_entry = None
 
+        # Tarea en segundo plano en curso (carga de archivos, descargas)
+        self.current_task = None
+
         self._setup_ui()
+
+        if startup_task is not None:
+            self.root.after_idle(lambda: self._run_task(
+                "Abrir archivo", None, task=startup_task,
+                on_done=lambda result: self._on_startup_loaded(path, result)))
         
         # Configurar confirmación al cerrar
         self.root.protocol("WM_DELETE_WINDOW", self._on_closing)
@@ -82,6 +149,7 @@ class SDXEditorApp:
         # Grupo: Cargar archivos
         tk.Button(top_frame, text="📂 Cargar SDX", command=self.load_file, bg="#e1e1e1").pack(side=tk.LEFT, padx=2)
         tk.Button(top_frame, text="📂 Cargar CHL", command=self.import_chl_file, bg="#e1e1e1").pack(side=tk.LEFT, padx=2)
+        tk.Button(top_frame, text="🔀 Combinar reescaneo", command=self.merge_rescan, bg="#e1e1e1").pack(side=tk.LEFT, padx=2)
 
         # Separador
         ttk.Separator(top_frame, orient=tk.VERTICAL).pack(side=tk.LEFT, fill=tk.Y, padx=10)
@@ -94,6 +162,18 @@ class SDXEditorApp:
         tk.Button(top_frame, text="📡 Importar desde KingOfSat", command=self.import_from_kingofsat,
                   bg="#fff3cd", fg="black").pack(side=tk.RIGHT, padx=5)
 
+        # Barra de estado del modo de perfilado, con la última operación medida
+        self.profile_var = None
+        if self.profiler.enabled:
+            status_f = tk.Frame(self.root, relief=tk.SUNKEN, bd=1)
+            status_f.pack(side=tk.BOTTOM, fill=tk.X)
+            self.profile_var = tk.StringVar(value="Perfilado activo")
+            tk.Label(status_f, textvariable=self.profile_var, anchor="w").pack(
+                side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+            tk.Button(status_f, text="Guardar perfil...", command=self.save_profile).pack(side=tk.RIGHT)
+            if self.latency is not None:
+                tk.Button(status_f, text="Latencia...", command=self.show_latency).pack(side=tk.RIGHT)
+
         pw = tk.PanedWindow(self.root, orient=tk.HORIZONTAL)
         pw.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
@@ -103,9 +183,9 @@ class SDXEditorApp:
 
         self.search_var = tk.StringVar()
         try:
-            self.search_var.trace_add("write", lambda *args: self._refresh_all_channels_list())
+            self.search_var.trace_add("write", lambda *args: self._on_search())
         except AttributeError:
-            self.search_var.trace("w", lambda *args: self._refresh_all_channels_list())
+            self.search_var.trace("w", lambda *args: self._on_search())
         
         search_frame = tk.Frame(left_f)
         search_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -116,15 +196,14 @@ class SDXEditorApp:
         columns = ("#", "nombre", "freq", "sid", "lcn", "hd", "ca", "tipo", "calidad")
         self.tree_all = ttk.Treeview(left_f, columns=columns, show="headings", selectmode="extended")
         
-        self.tree_all.heading("#", text="#")
-        self.tree_all.heading("nombre", text="Nombre")
-        self.tree_all.heading("freq", text="Freq (MHz)")
-        self.tree_all.heading("sid", text="SID")
-        self.tree_all.heading("lcn", text="LCN")
-        self.tree_all.heading("hd", text="HD")
-        self.tree_all.heading("ca", text="Cifrado")
-        self.tree_all.heading("tipo", text="Tipo")
-        self.tree_all.heading("calidad", text="Señal")
+        self.all_headings = {
+            "#": "#", "nombre": "Nombre", "freq": "Freq (MHz)", "sid": "SID", "lcn": "LCN",
+            "hd": "HD", "ca": "Cifrado", "tipo": "Tipo", "calidad": "Señal"
+        }
+        for col in columns:
+            self.tree_all.heading(col, text=self.all_headings[col],
+                                  command=lambda c=col: self._sort_all_by(c))
+        self._update_sort_headings()
         
         self.tree_all.column("#", width=45, anchor="center")
         self.tree_all.column("nombre", width=180, anchor="w")
@@ -145,8 +224,18 @@ class SDXEditorApp:
         right_f = tk.LabelFrame(pw, text="Listas de Favoritos (Arrastra para reordenar o haz doble clic en #)")
         pw.add(right_f)
 
+        # Las pestañas solo seleccionan la lista; todas comparten el mismo Treeview
         self.fav_notebook = ttk.Notebook(right_f)
-        self.fav_notebook.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.fav_notebook.pack(fill=tk.X, padx=5, pady=(5, 0))
+        self.fav_notebook.bind("<<NotebookTabChanged>>", self._on_fav_tab_changed)
+
+        fav_tree_f = tk.Frame(right_f)
+        fav_tree_f.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+        self.fav_tree = self._create_fav_tree(fav_tree_f)
+        self.fav_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        sb_fav = ttk.Scrollbar(fav_tree_f, command=self.fav_tree.yview)
+        sb_fav.pack(side=tk.RIGHT, fill=tk.Y)
+        self.fav_tree.config(yscrollcommand=sb_fav.set)
 
         btn_f = tk.Frame(right_f)
         btn_f.pack(fill=tk.X, pady=10)
@@ -154,6 +243,11 @@ class SDXEditorApp:
         tk.Button(btn_f, text="<- Quitar", command=self.remove_from_fav, bg="#f8d7da").pack(side=tk.LEFT, padx=5)
         tk.Button(btn_f, text="↑ Subir", command=lambda: self.move_item(-1)).pack(side=tk.LEFT, padx=10)
         tk.Button(btn_f, text="↓ Bajar", command=lambda: self.move_item(1)).pack(side=tk.LEFT, padx=2)
+        tk.Button(btn_f, text="⤒", command=lambda: self.move_selection_to("top")).pack(side=tk.LEFT, padx=2)
+        tk.Button(btn_f, text="⤓", command=lambda: self.move_selection_to("bottom")).pack(side=tk.LEFT, padx=2)
+        tk.Button(btn_f, text="Mover a...", command=lambda: self.move_selection_to("ask")).pack(side=tk.LEFT, padx=2)
+        tk.Button(btn_f, text="↶ Deshacer", command=self.undo_fav_change).pack(side=tk.LEFT, padx=10)
+        self.root.bind("<Control-z>", lambda e: self.undo_fav_change())
 
         # Separador visual
         ttk.Separator(btn_f, orient=tk.VERTICAL).pack(side=tk.LEFT, fill=tk.Y, padx=10)
@@ -164,183 +258,171 @@ class SDXEditorApp:
         tk.Button(btn_f, text="Renombrar", command=self.rename_fav_group).pack(side=tk.RIGHT, padx=5)
 
     def import_from_kingofsat(self):
-        """Importa canales desde una URL de KingOfSat."""
-        if not self.program_list:
+        """Importa canales desde una o varias URLs de KingOfSat."""
+        if not self.data.program_list:
             messagebox.showwarning("Aviso", "Primero debes cargar un archivo SDX o CHL")
             return
         
-        # Pedir URL al usuario
-        url = simpledialog.askstring(
-            "Importar desde KingOfSat",
-            "Introduce la URL del paquete de KingOfSat:\n\nEjemplo: https://en.kingofsat.net/pack-digitalplusa",
-            initialvalue="https://en.kingofsat.net/pack-"
-        )
-        
-        if not url:
+        # Pedir las URLs al usuario
+        urls, offline = self._ask_kingofsat_urls()
+        if not urls:
             return
         
-        # Validar URL
-        if "kingofsat.net" not in url:
-            messagebox.showerror("Error", "La URL debe ser de kingofsat.net")
+        # Validar URLs
+        invalid = [url for url in urls if "kingofsat.net" not in url]
+        if invalid:
+            messagebox.showerror("Error", "La URL debe ser de kingofsat.net:\n" + "\n".join(invalid))
             return
         
-        try:
-            # Mostrar progreso
-            self.root.config(cursor=self.cursor_wait)
-            self.root.update()
-            
-            # Descargar página
-            req = Request(url, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-            })
-            with urlopen(req, timeout=30) as response:
-                html_content = response.read().decode('utf-8', errors='replace')
-            
-            # DEBUG: Guardar HTML para análisis
-            debug_path = '/tmp/kingofsat_debug.html'
-            try:
-                with open(debug_path, 'w', encoding='utf-8') as f:
-                    f.write(html_content)
-                print(f"HTML guardado en {debug_path}")
-            except:
-                pass
-            
-            # Parsear canales
-            kos_channels = self._parse_kingofsat_html(html_content)
-            
-            if not kos_channels:
-                # Mostrar información de debug
-                sample = html_content[:2000] if len(html_content) > 2000 else html_content
-                has_tables = '<table' in html_content.lower()
-                has_tr = '<tr' in html_content.lower()
-                num_5digit = len(re.findall(r'\b\d{5}\b', html_content))
-                
-                messagebox.showwarning("Aviso", 
-                    f"No se encontraron canales en la página.\n\n"
-                    f"Información de debug:\n"
-                    f"- Tamaño HTML: {len(html_content)} bytes\n"
-                    f"- Contiene <table>: {has_tables}\n"
-                    f"- Contiene <tr>: {has_tr}\n"
-                    f"- Números de 5 dígitos encontrados: {num_5digit}\n\n"
-                    f"Primeros caracteres:\n{html_content[:500]}")
-                return
-            
-            # Mostrar diálogo de importación con los canales de KingOfSat
-            self._show_import_dialog(kos_channels, url)
-            
-        except URLError as e:
-            messagebox.showerror("Error de conexión", f"No se pudo conectar a KingOfSat:\n{e}")
-        except Exception as e:
-            error_details = traceback.format_exc()
-            messagebox.showerror("Error", f"Error al procesar:\n{e}\n\nDetalles:\n{error_details[:500]}")
-        finally:
-            self.root.config(cursor="")
-
-    def _parse_kingofsat_html(self, html_content):
-        """Parsea el HTML real de KingOfSat para extraer canales."""
-        channels = []
-        current_freq = 0
-        
-        # Buscar frecuencias: class="bld">10758.50</td>
-        # Formato: 5 dígitos punto 2 decimales
-        freq_pattern = re.compile(r'class="bld">(\d{5})\.\d{2}</td>')
-        
-        # Buscar bloques de canal: desde <tr data-channel-id hasta </tr>
-        channel_pattern = re.compile(
-            r'<tr\s+data-channel-id="(\d+)">(.*?)</tr>',
-            re.DOTALL | re.IGNORECASE
-        )
-        
-        # Primero, extraer todas las frecuencias con sus posiciones
-        freq_positions = []
-        for match in freq_pattern.finditer(html_content):
-            freq_positions.append((match.start(), int(match.group(1))))
-        
-        # Para cada canal, encontrar la frecuencia más reciente (anterior en el HTML)
-        for match in channel_pattern.finditer(html_content):
-            channel_pos = match.start()
-            channel_html = match.group(2)
-            
-            # Encontrar la frecuencia más cercana anterior
-            freq = 0
-            for pos, f in freq_positions:
-                if pos < channel_pos:
-                    freq = f
-                else:
-                    break
-            
-            # Extraer nombre: class="A3">NombreCanal</a>
-            name_match = re.search(r'class="A3">([^<]+)</a>', channel_html)
-            if not name_match:
-                continue
-            name = name_match.group(1).strip()
-            
-            # Extraer SID: <td class="s">29850</td>
-            sid_match = re.search(r'<td class="s">(\d+)</td>', channel_html)
-            if not sid_match:
-                continue
-            sid = int(sid_match.group(1))
-            
-            if name and sid:
-                channels.append({
-                    'name': name,
-                    'sid': sid,
-                    'freq': freq
-                })
-        
-        # Eliminar duplicados (mismo nombre y SID)
-        seen = set()
-        unique = []
-        for ch in channels:
-            key = (ch['name'], ch['sid'])
-            if key not in seen:
-                seen.add(key)
-                unique.append(ch)
-        
-        return unique
+        if self.current_task is not None:
+            messagebox.showwarning("Aviso", "Ya hay una operación en curso.")
+            return
 
-    def _parse_kingofsat_text(self, content):
-        """Parser alternativo - ya no se usa."""
-        return []
+        # Las páginas se descargan a la vez y se parsean mientras llegan: el
+        # diálogo se abre ya y se va llenando con cada lote de canales
+        self._show_import_dialog(urls, BackgroundTask(self._fetch_kingofsat_job, urls, offline))
 
-    def _parse_kingofsat_alternative(self, html_content):
-        """Método alternativo - no usado."""
-        return []
+    def _ask_kingofsat_urls(self):
+        """
+        Pide una o varias URLs de paquetes (una por línea).
 
-    def _show_import_dialog(self, kos_channels, url):
-        """Muestra diálogo con resultados y opciones de importación."""
+        Devuelve (lista de URLs, usar solo la caché sin conexión).
+        """
         dialog = tk.Toplevel(self.root)
         dialog.title("Importar desde KingOfSat")
-        dialog.geometry("700x550")
         dialog.transient(self.root)
+        tk.Label(dialog, justify=tk.LEFT, anchor="w",
+                 text="Introduce las URLs de los paquetes de KingOfSat (una por línea):\n\n"
+                      "Ejemplo: https://en.kingofsat.net/pack-digitalplusa").pack(fill=tk.X, padx=10, pady=(10, 5))
+        text = tk.Text(dialog, width=60, height=6)
+        text.pack(fill=tk.BOTH, expand=True, padx=10)
+        text.insert("1.0", "https://en.kingofsat.net/pack-")
+        text.focus_set()
+        offline_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(dialog, text="Sin conexión (usar solo las páginas guardadas en la caché)",
+                       variable=offline_var).pack(anchor=tk.W, padx=10, pady=(5, 0))
+
+        urls = []
+
+        def accept():
+            lines = text.get("1.0", tk.END).split()
+            # Sin repetidos, respetando el orden
+            urls.extend(dict.fromkeys(lines))
+            dialog.destroy()
+
+        btn_f = tk.Frame(dialog, pady=10)
+        btn_f.pack(fill=tk.X, padx=10)
+        tk.Button(btn_f, text="Aceptar", command=accept, width=10).pack(side=tk.LEFT)
+        tk.Button(btn_f, text="Cancelar", command=dialog.destroy, width=10).pack(side=tk.RIGHT)
+        dialog.wait_visibility()
         dialog.grab_set()
+        self.root.wait_window(dialog)
+        return urls, offline_var.get()
+
+    def _fetch_kingofsat_job(self, task, urls, offline=False):
+        """
+        Descarga y parsea las páginas a la vez (se ejecuta en un hilo de trabajo).
+
+        Las páginas pasan por la caché en disco: las recientes no se descargan
+        ni se parsean. Devuelve (canales fusionados en el orden de las URLs,
+        bytes recibidos, {url: error} de las páginas que fallaron, páginas
+        servidas desde la caché).
+        """
+        import threading
+        from kingofsat import fetch_kingofsat_packages
+        from kingofsat_cache import KingOfSatCache
+
+        lock = threading.Lock()
+        received = {}
+
+        def progress(url, done, total):
+            # Llamado desde los hilos de descarga
+            with lock:
+                received[url] = (done, total)
+                done_all = sum(d for d, _ in received.values())
+                total_all = sum(t for _, t in received.values())
+                known = len(received) == len(urls) and all(t for _, t in received.values())
+            task.report(f"Descargando {len(received)}/{len(urls)} páginas: {done_all // 1024} KB",
+                        done_all / total_all if known else None)
+
+        task.report("Conectando con KingOfSat...")
+        cache = KingOfSatCache(offline=offline)
+        channels, errors = fetch_kingofsat_packages(
+            urls, on_channels=lambda url, batch: task.publish(batch), progress=progress, cache=cache)
+        from_cache = sum(1 for status in cache.status.values() if status != "downloaded")
+        return channels, sum(d for d, _ in received.values()), errors, from_cache
+
+    def _show_import_dialog(self, urls, task):
+        """
+        Muestra el diálogo de importación y lo va llenando con los canales que
+        publica la tarea de descarga. Importar se habilita al terminar.
+        """
+        from channel_matching import AMBIGUOUS, MISSING, RESOLVED
+        from kingofsat import DEBUG_DUMP_ENV
+
+        kos_channels = []
+        seen = set()
+        # (sid, freq) -> (estado, claves de programa, método) contra el archivo cargado
+        matches = {}
+        match_counts = {RESOLVED: 0, AMBIGUOUS: 0, MISSING: 0}
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Importar desde KingOfSat")
+        dialog.geometry("760x630")
+        dialog.transient(self.root)
         
         # Frame de información
         info_frame = tk.Frame(dialog, pady=10)
         info_frame.pack(fill=tk.X, padx=10)
         
-        tk.Label(info_frame, text=f"URL: {url}", anchor="w", fg="blue").pack(fill=tk.X)
-        tk.Label(info_frame, text=f"📡 Canales encontrados: {len(kos_channels)}", 
-                anchor="w", fg="green", font=('TkDefaultFont', 10, 'bold')).pack(fill=tk.X)
+        url_text = f"URL: {urls[0]}" if len(urls) == 1 else f"URLs ({len(urls)}): " + ", ".join(urls)
+        tk.Label(info_frame, text=url_text, anchor="w", justify=tk.LEFT, fg="blue",
+                 wraplength=660).pack(fill=tk.X)
+        count_label = tk.Label(info_frame, text="📡 Canales encontrados: 0",
+                               anchor="w", fg="green", font=('TkDefaultFont', 10, 'bold'))
+        count_label.pack(fill=tk.X)
+        match_label = tk.Label(info_frame, anchor="w")
+        match_label.pack(fill=tk.X)
+        status_label = tk.Label(info_frame, text="Iniciando...", anchor="w")
+        status_label.pack(fill=tk.X)
+        bar = ttk.Progressbar(info_frame, mode="indeterminate", maximum=100)
+        bar.pack(fill=tk.X)
+        bar.start(15)
         
         # Lista de canales
         list_frame = tk.LabelFrame(dialog, text="Canales a importar")
         list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
-        columns = ("name", "sid", "freq")
+        columns = ("estado", "name", "sid", "freq", "pol", "ca")
         tree = ttk.Treeview(list_frame, columns=columns, show="headings", height=15)
+        tree.heading("estado", text="")
         tree.heading("name", text="Nombre")
         tree.heading("sid", text="SID")
         tree.heading("freq", text="Freq (MHz)")
+        tree.heading("pol", text="Pol")
+        tree.heading("ca", text="CA")
         
-        tree.column("name", width=350)
-        tree.column("sid", width=100)
-        tree.column("freq", width=100)
-        
-        for ch in kos_channels:
-            tree.insert("", "end", values=(ch['name'], ch['sid'], ch['freq']))
+        tree.column("estado", width=30, anchor=tk.CENTER)
+        tree.column("name", width=300)
+        tree.column("sid", width=80)
+        tree.column("freq", width=90)
+        tree.column("pol", width=40)
+        tree.column("ca", width=150)
+
+        tree.tag_configure(AMBIGUOUS, foreground="#b8860b")
+        tree.tag_configure(MISSING, foreground="red")
+        status_marks = {RESOLVED: "✔", AMBIGUOUS: "?", MISSING: "✘"}
+
+        def insert_row(ch):
+            status = matches[(ch['sid'], ch['freq'])][0]
+            tree.insert("", "end", tags=(status,), values=(
+                status_marks[status], ch['name'], ch['sid'], ch['freq'], ch.get('pol', ""),
+                ", ".join(ch.get('ca', ()))))
+
+        def update_match_label():
+            match_label.config(text=f"✔ {match_counts[RESOLVED]} en el archivo   "
+                                    f"? {match_counts[AMBIGUOUS]} ambiguos   "
+                                    f"✘ {match_counts[MISSING]} no encontrados")
+        update_match_label()
         
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         sb = ttk.Scrollbar(list_frame, command=tree.yview)
@@ -358,11 +440,11 @@ class SDXEditorApp:
         tk.Label(fav_select_frame, text="Importar a lista:").pack(side=tk.LEFT)
         
         fav_names = []
-        if self.fav_names_obj_index != -1:
-            fav_names = self.all_data_objects[self.fav_names_obj_index]["fav_list_info_in_box_object"].get("aucFavReName", [])
+        if self.data.fav_names_obj_index != -1:
+            fav_names = self.data.all_data_objects[self.data.fav_names_obj_index]["fav_list_info_in_box_object"].get("aucFavReName", [])
         
         fav_options = []
-        for f_idx in sorted(self.fav_lists_indices.keys()):
+        for f_idx in sorted(self.data.fav_lists_indices.keys()):
             name = fav_names[f_idx] if f_idx < len(fav_names) and fav_names[f_idx].strip() else f"Lista {f_idx}"
             fav_options.append((f_idx, name))
         
@@ -373,11 +455,38 @@ class SDXEditorApp:
             combo.current(0)
         combo.pack(side=tk.LEFT, padx=10)
         
-        # Checkbox sobreescribir
-        overwrite_var = tk.BooleanVar(value=False)
-        overwrite_check = tk.Checkbutton(options_frame, text="Sobreescribir lista (eliminar canales existentes)", 
-                                          variable=overwrite_var, fg="red")
-        overwrite_check.pack(anchor=tk.W, padx=5, pady=5)
+        # Modo de importación
+        mode_var = tk.StringVar(value="diff")
+        mode_frame = tk.Frame(options_frame)
+        mode_frame.pack(fill=tk.X, padx=5)
+        tk.Radiobutton(mode_frame, text="Solo cambios", variable=mode_var,
+                       value="diff").pack(side=tk.LEFT)
+        tk.Radiobutton(mode_frame, text="Añadir al final", variable=mode_var,
+                       value="append").pack(side=tk.LEFT, padx=10)
+        tk.Radiobutton(mode_frame, text="Sobreescribir lista", variable=mode_var,
+                       value="overwrite", fg="red").pack(side=tk.LEFT)
+
+        diff_frame = tk.Frame(options_frame)
+        diff_frame.pack(fill=tk.X, padx=25)
+        remove_var = tk.BooleanVar(value=True)
+        reorder_var = tk.BooleanVar(value=True)
+        diff_checks = (
+            tk.Checkbutton(diff_frame, text="Quitar los que ya no están en el paquete", variable=remove_var),
+            tk.Checkbutton(diff_frame, text="Reordenar como el paquete", variable=reorder_var),
+        )
+        for check in diff_checks:
+            check.pack(side=tk.LEFT, padx=(0, 10))
+
+        def on_mode_change(*_):
+            state = tk.NORMAL if mode_var.get() == "diff" else tk.DISABLED
+            for check in diff_checks:
+                check.config(state=state)
+
+        mode_var.trace_add("write", on_mode_change)
+
+        ambiguous_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(options_frame, text="Importar también los ambiguos (primer candidato)",
+                       variable=ambiguous_var).pack(anchor=tk.W, padx=5, pady=(0, 5))
         
         # Botones
         action_frame = tk.Frame(dialog, pady=10)
@@ -387,71 +496,186 @@ class SDXEditorApp:
             if not combo_var.get():
                 return
             tab_id = int(combo_var.get().split(":")[0])
-            overwrite = overwrite_var.get()
-            self._import_kos_channels(kos_channels, tab_id, overwrite)
+            mode = mode_var.get()
+            # Solo se importan canales que existen en el archivo: el receptor
+            # ignora las entradas de favoritos sin programa
+            accepted = (RESOLVED, AMBIGUOUS) if ambiguous_var.get() else (RESOLVED,)
+            program_keys = []
+            for ch in kos_channels:
+                status, keys, _ = matches[(ch['sid'], ch['freq'])]
+                if status in accepted:
+                    program_keys.append(keys[0])
+            diff = self._import_kos_channels(program_keys, tab_id, mode,
+                                             remove_var.get(), reorder_var.get())
             dialog.destroy()
-            action = "reemplazaron" if overwrite else "añadieron"
-            messagebox.showinfo("Importación completada", f"Se {action} {len(kos_channels)} canales.")
-        
-        tk.Button(action_frame, text="Importar canales", command=do_import, 
-                  bg="#90EE90", fg="black", activebackground="#32CD32", 
-                  font=('TkDefaultFont', 10, 'bold'), padx=20).pack(side=tk.LEFT, padx=10)
-        tk.Button(action_frame, text="Cancelar", command=dialog.destroy).pack(side=tk.RIGHT)
-
-    def _import_kos_channels(self, channels, tab_id, overwrite=False):
-        """Importa canales de KingOfSat a una lista de favoritos."""
-        tree = self.fav_trees[tab_id]
-        
-        # Si overwrite, eliminar todos los canales existentes
-        if overwrite:
-            for item in tree.get_children():
-                tree.delete(item)
-        
-        # Crear índice de frecuencia -> transponder del SDX
-        freq_to_tp = {}
-        for tp_idx, freq in self.transponders.items():
-            # Guardar frecuencia exacta y con tolerancia ±3 MHz
-            for delta in range(-3, 4):
-                f = freq + delta
-                if f not in freq_to_tp:
-                    freq_to_tp[f] = tp_idx
-        
-        current_count = len(tree.get_children())
-        
-        for ch in channels:
-            current_count += 1
-            sid = ch['sid']
-            freq = ch['freq']
-            
-            # Buscar transponder por frecuencia
-            tp_idx = freq_to_tp.get(freq, 0)
-            
-            # Fabricar entrada (orden de claves importante para el receptor)
-            ui_word32 = (tp_idx << 16) | sid
-            
-            fav_entry = {
-                "uiWord32": ui_word32,
-                "unShort": {
-                    "sLo16": sid,
-                    "sHi16": tp_idx
-                }
-            }
-            
-            fav_json = json.dumps(fav_entry, separators=(',', ':'))
-            
-            tree.insert("", "end", tags=(fav_json,), values=(
-                current_count,
-                ch['name'],
-                freq,
-                sid,
-                "",  # LCN
-                "",  # HD
-                "",  # CA
-                ""   # Tipo
-            ))
-        
+            if diff is not None:
+                summary = (f"{len(diff.added)} añadidos, "
+                           f"{len(diff.removed) if remove_var.get() else 0} eliminados, "
+                           f"{len(diff.moved) if reorder_var.get() else 0} movidos, "
+                           f"{diff.unchanged} sin cambios.")
+            else:
+                action = "reemplazaron" if mode == "overwrite" else "añadieron"
+                summary = f"Se {action} {len(program_keys)} canales."
+            skipped = len(kos_channels) - len(program_keys)
+            messagebox.showinfo("Importación completada", summary
+                                + (f"\n{skipped} canales no se importaron (no están en el archivo o son ambiguos)."
+                                   if skipped else ""))
+
+        def close():
+            # Cancelar la descarga si sigue en curso; sus mensajes pendientes se ignoran
+            task.cancel()
+            dialog.destroy()
+
+        import_button = tk.Button(action_frame, text="Importar canales", command=do_import,
+                                  bg="#90EE90", fg="black", activebackground="#32CD32",
+                                  font=('TkDefaultFont', 10, 'bold'), padx=20, state=tk.DISABLED)
+        import_button.pack(side=tk.LEFT, padx=10)
+        tk.Button(action_frame, text="Cancelar", command=close).pack(side=tk.RIGHT)
+        dialog.protocol("WM_DELETE_WINDOW", close)
+        dialog.wait_visibility()
+        dialog.grab_set()
+
+        def on_progress(text, fraction):
+            if not task.cancelled:
+                self._show_progress(status_label, bar, text, fraction)
+
+        def on_data(channels):
+            if task.cancelled:
+                return
+            # Los paquetes llegan mezclados: se quitan ya los (sid, freq) repetidos
+            match = self.data.program_matcher.match
+            for ch in channels:
+                key = (ch['sid'], ch['freq'])
+                if key not in seen:
+                    seen.add(key)
+                    kos_channels.append(ch)
+                    matches[key] = match(ch)
+                    match_counts[matches[key][0]] += 1
+                    insert_row(ch)
+            count_label.config(text=f"📡 Canales encontrados: {len(kos_channels)}")
+            update_match_label()
+
+        def on_done(result):
+            self.current_task = None
+            if task.cancelled:
+                return
+            channels, received, errors, from_cache = result
+            if not channels:
+                dialog.destroy()
+                if errors and len(urls) == 1:
+                    self._show_task_error(errors[urls[0]], "")
+                elif errors:
+                    messagebox.showerror("Error de conexión", "No se pudo descargar ningún paquete:\n\n" +
+                                         "\n".join(f"{url}: {error}" for url, error in errors.items()))
+                else:
+                    messagebox.showwarning("Aviso",
+                        f"No se encontraron canales en la página.\n\n"
+                        f"- Tamaño HTML: {received} bytes\n\n"
+                        f"Para analizar la página, define la variable de entorno {DEBUG_DUMP_ENV} "
+                        f"con la ruta donde guardar una copia y repite la importación.")
+                return
+            if channels != kos_channels:
+                # Mostrar el resultado final en el orden de las URLs
+                kos_channels[:] = channels
+                tree.delete(*tree.get_children())
+                for ch in channels:
+                    insert_row(ch)
+                count_label.config(text=f"📡 Canales encontrados: {len(kos_channels)}")
+            status = f"Descarga completada: {received // 1024} KB"
+            if from_cache:
+                status += f" ({from_cache} de {len(urls)} páginas desde la caché)"
+            self._show_progress(status_label, bar, status, 1.0)
+            import_button.config(state=tk.NORMAL)
+            if errors:
+                messagebox.showwarning("Aviso", "No se pudieron descargar algunos paquetes:\n\n" +
+                                       "\n".join(f"{url}: {error}" for url, error in errors.items()),
+                                       parent=dialog)
+
+        def on_error(error, details):
+            self.current_task = None
+            if not task.cancelled:
+                dialog.destroy()
+                self._show_task_error(error, details)
+
+        def on_cancelled():
+            self.current_task = None
+
+        self.current_task = task
+        task.start()
+        task.attach(self.root, on_progress=on_progress, on_data=on_data, on_done=on_done,
+                    on_error=on_error, on_cancelled=on_cancelled)
+
+    def _import_kos_channels(self, program_keys, tab_id, mode="append", remove=True, reorder=True):
+        """
+        Importa a una lista de favoritos los programas del archivo con los que
+        se han emparejado los canales de KingOfSat.
+
+        mode es "append" (añadir al final), "overwrite" (sustituir la lista) o
+        "diff" (aplicar solo altas, bajas y movimientos, sin tocar el orden de
+        los demás). La lista se reconstruye de una vez y se puede deshacer.
+
+        Returns:
+            FavListDiff or None: Los cambios aplicados en modo "diff"
+        """
+        model = self.data.fav_models[tab_id]
+        new_rows = {}
+        for program_key in program_keys:
+            info = self.data.programs_dict[program_key]
+            un_short = info['stProgNo'].get('unShort', {})
+            sid = un_short.get('sLo16', info['sid'])
+            fav_entry = make_fav_entry(sid, un_short.get('sHi16', 0))
+            new_rows.setdefault(fav_entry["uiWord32"], (fav_entry, ChannelDataProcessor.fav_row_values(info)))
+
+        diff = None
+        if mode == "diff":
+            ids = model.ids
+            diff = FavListDiff([fav_entry_key(model.entry(row_id)) for row_id in ids], list(new_rows))
+            if not diff:
+                return diff
+            rows = [ids[pos] if pos is not None else new_rows[key]
+                    for pos, key in diff.plan(remove, reorder)]
+        elif mode == "overwrite":
+            rows = list(new_rows.values())
+        else:
+            rows = list(model.ids) + list(new_rows.values())
+
+        self._push_fav_undo(tab_id)
+        model.replace(rows)
+        self._refill_fav_tree(tab_id)
         self._sync(tab_id)
         self._mark_unsaved()
+        return diff
+
+    def _push_fav_undo(self, tab_id):
+        """Guarda el estado de una lista antes de un cambio en bloque."""
+        model = self.data.fav_models[tab_id]
+        self.fav_undo.append((tab_id, model, model.snapshot()))
+        del self.fav_undo[:-20]
+
+    def undo_fav_change(self):
+        """Deshace el último cambio en bloque de una lista de favoritos."""
+        while self.fav_undo:
+            tab_id, model, snapshot = self.fav_undo.pop()
+            # La lista puede haberse borrado o recargado desde entonces
+            if self.data.fav_models.get(tab_id) is model:
+                break
+        else:
+            return
+        model.restore(snapshot)
+        self._refill_fav_tree(tab_id)
+        self._sync(tab_id)
+        self._mark_unsaved()
+
+    def _refill_fav_tree(self, tab_id):
+        """Vuelve a llenar el Treeview de favoritos si muestra la lista tab_id."""
+        if self.fav_tree_tab != tab_id:
+            return
+        tree = self.fav_tree
+        model = self.data.fav_models[tab_id]
+        self._close_edit_entry()
+        tree.delete(*tree.get_children())
+        for pos, row_id in enumerate(model.ids, 1):
+            tree.insert("", "end", iid=row_id, values=(pos,) + model.values(row_id))
 
     def import_chl_file(self):
         """Importa un archivo CHL convirtiéndolo a formato SDX."""
@@ -462,399 +686,226 @@ class SDXEditorApp:
         if not path:
             return
 
-        try:
-            self.root.config(cursor=self.cursor_wait)
-            self.root.update()
-
-            # Parse the CHL file
-            chl_data = self._parse_chl_file(path)
-
-            if not chl_data.get('channels'):
-                messagebox.showwarning("Aviso", "No se encontraron canales en el archivo CHL.")
-                return
-
-            # Convert to SDX format
-            sdx_objects = self._convert_chl_to_sdx(chl_data)
-
-            # Load the converted data
-            self.all_data_objects = sdx_objects
-            self._process_data()
-            self._refresh_all_channels_list()
-            self._build_fav_tabs()
-
-            # Reset unsaved changes flag
-            self.unsaved_changes = False
-            self.root.title("Editor de canales SAT - v3.0 (Importado desde CHL)")
+        self._run_task("Cargar CHL", self._load_chl_job, path, on_done=self._on_chl_loaded)
+
+    def _load_chl_job(self, task, path):
+        """Lee, convierte y procesa un archivo CHL (se ejecuta en un hilo de trabajo)."""
+        task.report(f"Leyendo {os.path.basename(path)}...")
+        with self.profiler.phase("leer y decodificar CHL", unit="canales") as phase:
+            chl_data = ChannelDataProcessor.parse_chl_file(path, self._decode_progress(task))
+            phase.count = len(chl_data.get('channels', []))
+        if not chl_data.get('channels'):
+            return chl_data, None
+
+        task.report("Convirtiendo a SDX...")
+        with self.profiler.phase("convertir", unit="objetos") as phase:
+            sdx_objects = ChannelDataProcessor.convert_chl_to_sdx(chl_data)
+            phase.count = len(sdx_objects)
+        return chl_data, self._load_data(sdx_objects, task)
+
+    def _on_chl_loaded(self, result):
+        chl_data, state = result
+        if state is None:
+            self._profile_done("Cargar CHL")
+            messagebox.showwarning("Aviso", "No se encontraron canales en el archivo CHL.")
+            return
 
-            messagebox.showinfo("Éxito",
-                f"Importación CHL completada:\n"
-                f"- {len(chl_data.get('satellites', []))} satélites\n"
-                f"- {len(chl_data.get('transponders', []))} transponders\n"
-                f"- {len(chl_data.get('channels', []))} canales\n"
-                f"- {len(chl_data.get('favorites', []))} listas de favoritos")
+        # Load the converted data
+        self._apply_state(state)
+        self._profile_done("Cargar CHL")
 
-        except Exception as e:
-            error_details = traceback.format_exc()
-            messagebox.showerror("Error", f"Error al importar CHL:\n{e}\n\nDetalles:\n{error_details[:500]}")
-        finally:
-            self.root.config(cursor="")
+        # Reset unsaved changes flag
+        self.unsaved_changes = False
+        self.root.title("Editor de canales SAT - v3.0 (Importado desde CHL)")
+
+        messagebox.showinfo("Éxito",
+            f"Importación CHL completada:\n"
+            f"- {len(chl_data.get('satellites', []))} satélites\n"
+            f"- {len(chl_data.get('transponders', []))} transponders\n"
+            f"- {len(chl_data.get('channels', []))} canales\n"
+            f"- {len(chl_data.get('favorites', []))} listas de favoritos")
+        self._show_validation(self.data.validation, "Problemas en el archivo cargado")
+
+    def merge_rescan(self):
+        """Pasa las listas de favoritos actuales a un SDX guardado por el receptor tras reescanear."""
+        if not self.data.all_data_objects:
+            messagebox.showwarning("Aviso", "Primero carga el archivo con tus listas de favoritos.")
+            return
+        path = filedialog.askopenfilename(title="Seleccionar SDX reescaneado",
+                                          filetypes=[("SDX Files", "*.sdx")])
+        if not path:
+            return
+        # Con el archivo del que partían los dos, también se conservan los canales
+        # que el reescaneo ha añadido a las listas
+        base_path = None
+        if messagebox.askyesno("Archivo base",
+                               "¿Tienes el archivo del que partían los dos (la copia anterior al reescaneo)?\n\n"
+                               "Con él se añaden también los canales que el reescaneo ha metido en las listas."):
+            base_path = filedialog.askopenfilename(title="Seleccionar SDX base",
+                                                   filetypes=[("SDX Files", "*.sdx")]) or None
+        self._run_task("Combinar reescaneo", self._merge_rescan_job, path, base_path,
+                       on_done=self._on_rescan_merged)
+
+    def _merge_rescan_job(self, task, path, base_path=None):
+        """Lee el SDX reescaneado (y el base), combina los favoritos y procesa el resultado (hilo de trabajo)."""
+        theirs = self._decode_objects(self._read_text(path, task), task)
+        base = self._decode_objects(self._read_text(base_path, task), task) if base_path else None
+        from channel_diff import merge_sdx
+        task.report("Emparejando canales...", 0.6)
+        with self.profiler.phase("combinar", unit="objetos") as phase:
+            merged, report = merge_sdx(self.data.all_data_objects, theirs, base)
+            phase.count = len(merged)
+        return report, self._load_data(merged, task)
+
+    def _on_rescan_merged(self, result):
+        report, state = result
+        self._profile_done("Combinar reescaneo")
+        diff = report.diff
+
+        win = tk.Toplevel(self.root)
+        win.title("Combinar reescaneo")
+        win.geometry("760x460")
+        win.transient(self.root)
+        lines = [f"Canales: {len(diff.added)} nuevos, {len(diff.removed)} desaparecidos, "
+                 f"{len(diff.renamed)} renombrados, {len(diff.moved)} con otra clave"]
+        for fav_idx, kept in report.kept.items():
+            lines.append(f"Lista {fav_idx}: {kept} conservados, {len(report.dropped[fav_idx])} eliminados, "
+                         f"{report.added[fav_idx]} añadidos por el reescaneo")
+        tk.Label(win, justify=tk.LEFT, anchor="w", text="\n".join(lines)).pack(fill=tk.X, padx=10, pady=10)
+
+        text_f = tk.Frame(win)
+        text_f.pack(fill=tk.BOTH, expand=True, padx=10)
+        text = tk.Text(text_f, wrap="none", height=12)
+        sb = ttk.Scrollbar(text_f, command=text.yview)
+        text.config(yscrollcommand=sb.set)
+        sb.pack(side=tk.RIGHT, fill=tk.Y)
+        text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        text.insert("1.0", "\n".join(diff.lines(limit=VALIDATION_SHOWN)))
+        text.config(state=tk.DISABLED)
 
-    def _parse_chl_file(self, path):
-        """Parse a CHL file and extract all data."""
-        with open(path, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
-
-        data = {
-            'index': None,
-            'favorites': [],
-            'satellites': [],
-            'transponders': [],
-            'channels': []
-        }
+        def apply():
+            win.destroy()
+            self._apply_state(state)
+            self._mark_unsaved()
+            self._show_validation(self.data.validation, "Problemas en el archivo combinado")
 
-        decoder = json.JSONDecoder()
-        pos = 0
-        while pos < len(content):
-            chunk = content[pos:].lstrip()
-            if not chunk:
-                break
-            try:
-                obj, index = decoder.raw_decode(chunk)
-                obj_type = obj.get('Type', '')
-
-                if obj_type == 'index':
-                    data['index'] = obj
-                elif obj_type == 'fav':
-                    data['favorites'].append(obj)
-                elif obj_type == 'sat':
-                    data['satellites'].append(obj)
-                elif obj_type == 'tp':
-                    data['transponders'].append(obj)
-                elif obj_type == 'ch':
-                    data['channels'].append(obj)
-
-                pos += (len(content[pos:]) - len(chunk)) + index
-            except json.JSONDecodeError:
-                pos += 1
-
-        return data
-
-    def _convert_chl_to_sdx(self, chl_data):
-        """Convert CHL data to SDX format."""
-        sdx_objects = []
-
-        # Convert satellites
-        for sat in chl_data.get('satellites', []):
-            idx = sat.get('Index', 0)
-            angle = int(sat.get('Angle', '0'))
-            sdx_sat = {
-                f"satellite_object_{idx}": {
-                    "SatName": sat.get('Name', f'Sat {idx}'),
-                    "LowLnbFreq": 9750,
-                    "HighLnbFreq": 10600,
-                    "SatAngle": angle,
-                    "iSatMotoPosition": idx,
-                    "usUnicableIndex_old": 0,
-                    "TunerMask": 1,
-                    "UnicableFreq": 1210,
-                    "DLNBMask": 0,
-                    "DLNBUserBand": 0,
-                    "DLNBType": 0,
-                    "UnicableCH": 0,
-                    "uiSet": {
-                        "uiBit": {
-                            "22Hz": 2,
-                            "V12": 0,
-                            "DiSEqC": 0,
-                            "DiSEqC11": 0,
-                            "IsUnicable": 0,
-                            "UnicableType": 0,
-                            "FTAOnly": 0,
-                            "Motor": 0,
-                            "SatDir": 0,
-                            "LNBPower": 0,
-                            "SelectedTP": 0,
-                            "NetWorkSearch": 0,
-                            "Hide": 0
-                        },
-                        "uiStatus": 5
-                    },
-                    "tuner2_antena": {
-                        "LowLnbFreq": 9750,
-                        "HighLnbFreq": 10600,
-                        "iSatMotoPosition": idx,
-                        "UnicableCH": 0,
-                        "UnicableFreq": 1210,
-                        "uiSet": {
-                            "uiBit": {
-                                "22Hz": 2,
-                                "DiSEqC": 0,
-                                "DiSEqC11": 0,
-                                "UnicableType": 0,
-                                "Motor": 0,
-                                "LNBPower": 0,
-                                "SelectedTP": 0
-                            },
-                            "uiStatus": 5
-                        }
-                    }
-                }
-            }
-            sdx_objects.append(sdx_sat)
-
-        # Convert transponders
-        pol_map = {'H': 0, 'V': 1, 'L': 2, 'R': 3}
-        for tp in chl_data.get('transponders', []):
-            idx = tp.get('Index', 0)
-            freq = int(tp.get('Freq', '0'))
-            sr = int(tp.get('SR', '0'))
-            pol_str = tp.get('Pol', 'H')
-            pol = pol_map.get(pol_str.upper(), 0)
-            sat_idx = tp.get('SatIndex', 0)
-
-            sdx_tp = {
-                f"transponder_object_{idx}": {
-                    "usStartCode": 43690,
-                    "usNetworkLen": 0,
-                    "Freq": freq,
-                    "SR": sr,
-                    "t2_plp_index": 0,
-                    "t2_signal": 0,
-                    "uiFlag": 0,
-                    "ucMUX": 0,
-                    "ucQam": 0,
-                    "stFlag": {
-                        "POL": pol,
-                        "FEC": 4,
-                        "IQ": 0,
-                        "SatIndex": sat_idx,
-                        "NetNameNo": 0,
-                        "TPIndex": idx
-                    }
-                }
-            }
-            sdx_objects.append(sdx_tp)
-
-        # Convert channels
-        video_codec_map = {'MPEG2': 1, 'H264': 2, 'HEVC': 3, 'H265': 3}
-        for ch in chl_data.get('channels', []):
-            idx = ch.get('Index', 0)
-            tp_idx = ch.get('TPIndex', 0)
-            sid = int(ch.get('SID', '0'))
-            name = ch.get('Name', f'Canal {idx}')
-
-            # Video codec
-            video_type = ch.get('VideoType', 'MPEG2')
-            video_codec = video_codec_map.get(video_type, 1)
-
-            # HD detection
-            is_hd = 1 if ('HD' in name.upper() or video_type in ['H264', 'HEVC', 'H265']) else 0
-
-            # CA (encrypted)
-            ca_val = ch.get('CA', 0)
-            is_ca = 1 if ca_val > 0 else 0
-
-            # Service type
-            sdt_type = 25 if is_hd else 1  # 25=HD, 1=SD
-
-            # Audio array
-            audio_array = []
-            for aud in ch.get('Audio', []):
-                lang_str = aud.get('Lang', 'und')
-                # Map language string to numeric code (simplified)
-                lang_code = 0
-                if lang_str == 'spa':
-                    lang_code = 83
-                elif lang_str == 'eng':
-                    lang_code = 69
-                elif lang_str == 'por':
-                    lang_code = 80
-
-                audio_codec = 0  # MPEG
-                if aud.get('Type') == 'AAC':
-                    audio_codec = 1
-                elif aud.get('Type') == 'AC3' or aud.get('DolbyAC3', 0):
-                    audio_codec = 2
-
-                audio_array.append({
-                    "PID": aud.get('PID', 0),
-                    "Mode": 0,
-                    "Lang": lang_code,
-                    "Codec": audio_codec
-                })
-
-            # If no audio, add default
-            if not audio_array:
-                audio_array.append({"PID": 0, "Mode": 0, "Lang": 0, "Codec": 0})
-
-            sdx_ch = {
-                f"program_tv_object_{idx}": {
-                    "uiStartCode": 21845,
-                    "ucNameLen": len(name),
-                    "ucAudioPID": len(audio_array),
-                    "ucSubPID": 0,
-                    "VideoPID": ch.get('VideoPID', 0),
-                    "PCRPID": ch.get('PcrPID', ch.get('VideoPID', 0)),
-                    "PMTPID": ch.get('PmtPID', 0),
-                    "TTXPID": ch.get('TTXPID', 8191),
-                    "stProgNo": {
-                        "ServiceID": f"{tp_idx:08d}{sid:06d}",
-                        "unShort": {
-                            "sLo16": sid,
-                            "sHi16": tp_idx
-                        }
-                    },
-                    "uiSet": {
-                        "uiBit": {
-                            "Lock": ch.get('Lock', 0),
-                            "TV": 0,
-                            "Skip": ch.get('Skip', 0),
-                            "CA": is_ca,
-                            "VideoCodec": video_codec,
-                            "HD": is_hd,
-                            "Hide": ch.get('Hide', 0),
-                            "NetNameSelected": 0
-                        },
-                        "uiStatus": 0
-                    },
-                    "TSID": 0,
-                    "ONID": 0,
-                    "SDTServiceType": sdt_type,
-                    "t2mi_pg": ch.get('t2miPg', 0),
-                    "t2mi_plp_id": ch.get('t2miPlpId', 0),
-                    "t2mi_payload_pid": ch.get('t2miPayloadPid', 8191),
-                    "FavBit": 0,
-                    "iLCN": 0,
-                    "uiOriginalLCN": 0,
-                    "country_code": 0,
-                    "channel_list_id": 0,
-                    "visible": 0,
-                    "signal_quality": 75,
-                    "t2_signal": 0,
-                    "t2_plp_index": 0,
-                    "t2_plp_id": 0,
-                    "t2_lite_or_base": 0,
-                    "ServiceName": name,
-                    "AudioSelected": 0,
-                    "AudioArray": audio_array,
-                    "SubtSelected": 0,
-                    "SubtArray": []
-                }
-            }
-            sdx_objects.append(sdx_ch)
-
-        # Build channel index to (SID, TPIndex) mapping
-        ch_idx_to_sid_tp = {}
-        for ch in chl_data.get('channels', []):
-            ch_idx = ch.get('Index', 0)
-            sid = int(ch.get('SID', '0'))
-            tp_idx = ch.get('TPIndex', 0)
-            ch_idx_to_sid_tp[ch_idx] = (sid, tp_idx)
-
-        # Convert favorites
-        fav_names = []
-        for fav in chl_data.get('favorites', []):
-            idx = fav.get('Index', 0)
-            name = fav.get('Name', f'Lista {idx}')
-            fav_names.append(name)
-
-            # Convert TVChs to stProgNo
-            st_prog_no = []
-            for ch_idx in fav.get('TVChs', []):
-                if ch_idx in ch_idx_to_sid_tp:
-                    sid, tp_idx = ch_idx_to_sid_tp[ch_idx]
-                    ui_word32 = (tp_idx << 16) | sid
-                    st_prog_no.append({
-                        "uiWord32": ui_word32,
-                        "unShort": {
-                            "sLo16": sid,
-                            "sHi16": tp_idx
-                        }
-                    })
-
-            sdx_fav = {
-                f"fav_list_object_{idx}": {
-                    "sNoOfTVFavor": len(st_prog_no),
-                    "sNoOfRadioFavor": 0,
-                    "stProgNo": st_prog_no
-                }
-            }
-            sdx_objects.append(sdx_fav)
-
-        # Asegurar que fav_names tenga al menos 8 entradas y esté ordenado por índice
-        # Crear lista con todos los nombres en sus posiciones correctas
-        max_idx = max([fav.get('Index', 0) for fav in chl_data.get('favorites', [])] + [7])
-        all_fav_names = [f"Lista {i}" for i in range(max_idx + 1)]
-        for fav in chl_data.get('favorites', []):
-            idx = fav.get('Index', 0)
-            name = fav.get('Name', f'Lista {idx}')
-            if idx < len(all_fav_names):
-                all_fav_names[idx] = name
-
-        # Create fav_list_info_in_box_object
-        sdx_fav_info = {
-            "fav_list_info_in_box_object": {
-                "aucFavReName": all_fav_names,
-                "ucFavNameChangeMask": (1 << len(all_fav_names)) - 1  # Todos los bits activos
-            }
-        }
-        sdx_objects.append(sdx_fav_info)
-
-        # Create box_object with basic settings
-        sdx_box = {
-            "box_object": {
-                "aucFavReName": all_fav_names,
-                "ucFavNameChangeMask": (1 << len(all_fav_names)) - 1
-            }
-        }
-        sdx_objects.append(sdx_box)
+        btn_f = tk.Frame(win)
+        btn_f.pack(fill=tk.X, padx=10, pady=10)
+        tk.Button(btn_f, text="Aplicar", command=apply, bg="#8fbc8f").pack(side=tk.RIGHT, padx=5)
+        tk.Button(btn_f, text="Cancelar", command=win.destroy).pack(side=tk.RIGHT)
 
-        return sdx_objects
+    def _setup_drag_and_drop(self, tree):
+        """Configura drag & drop, edición inline y tecla Delete para el Treeview de favoritos.
 
-    def _setup_drag_and_drop(self, tree, tab_id):
-        """Configura drag & drop, edición inline y tecla Delete para un Treeview de favoritos."""
-        tree.bind("<ButtonPress-1>", lambda e: self._on_drag_start(e, tree, tab_id))
+        Los manejadores reciben la lista enlazada en ese momento (fav_tree_tab).
+        """
+        tree.bind("<ButtonPress-1>", lambda e: self._on_drag_start(e, tree, self.fav_tree_tab))
         tree.bind("<B1-Motion>", lambda e: self._on_drag_motion(e, tree))
-        tree.bind("<ButtonRelease-1>", lambda e: self._on_drag_release(e, tree, tab_id))
-        tree.bind("<Double-1>", lambda e: self._on_double_click(e, tree, tab_id))
-        tree.bind("<Delete>", lambda e: self._on_delete_key(tree, tab_id))
-        tree.bind("<BackSpace>", lambda e: self._on_delete_key(tree, tab_id))
+        tree.bind("<ButtonRelease-1>", lambda e: self._on_drag_release(e, tree, self.fav_tree_tab))
+        tree.bind("<Double-1>", lambda e: self._on_double_click(e, tree, self.fav_tree_tab))
+        tree.bind("<Delete>", lambda e: self._on_delete_key(tree, self.fav_tree_tab))
+        tree.bind("<BackSpace>", lambda e: self._on_delete_key(tree, self.fav_tree_tab))
 
     def _on_delete_key(self, tree, tab_id):
         """Maneja la tecla Delete/Supr para eliminar canales."""
-        self._remove_selected_from_fav(tree, tab_id)
+        if tab_id is not None:
+            self._remove_selected_from_fav(tree, tab_id)
 
     def _on_drag_start(self, event, tree, tab_id):
         self._close_edit_entry()
         item = tree.identify_row(event.y)
-        if item:
-            self.drag_data["item"] = item
-            self.drag_data["tree"] = tree
-            self.drag_data["tab_id"] = tab_id
-            tree.selection_set(item)
+        if not item or tab_id is None or event.state & 0x0005:
+            # Sin item, o con Shift/Control: dejar que el Treeview gestione la selección
+            return None
+        selection = tree.selection()
+        self.drag_data.update({
+            "item": item, "tree": tree, "tab_id": tab_id,
+            "items": (item,), "y": event.y, "gap": None, "job": None,
+            "moved": False, "collapse": False, "indicator": None,
+        })
+        if item in selection and len(selection) > 1:
+            # Arrastrar toda la selección: impedir que el clic la reduzca a un solo item
+            self.drag_data["items"] = selection
+            self.drag_data["collapse"] = True
+            tree.focus(item)
+            return "break"
+        return None
 
     def _on_drag_motion(self, event, tree):
         if not self.drag_data["item"]:
             return
-        target = tree.identify_row(event.y)
-        if target and target != self.drag_data["item"]:
+        self.drag_data["y"] = event.y
+        self.drag_data["moved"] = True
+        # Agrupar todos los eventos de movimiento hasta que Tk quede libre
+        if self.drag_data["job"] is None:
+            self.drag_data["job"] = tree.after_idle(self._update_drop_indicator)
+
+    def _update_drop_indicator(self):
+        """Calcula el hueco de destino del arrastre y coloca la línea indicadora."""
+        self.drag_data["job"] = None
+        tree = self.drag_data["tree"]
+        if tree is None:
+            return
+        model = self.data.fav_models[self.drag_data["tab_id"]]
+        y = self.drag_data["y"]
+        # Autodesplazamiento al arrastrar por encima o por debajo de la lista
+        scrolled = y < 0 or y > tree.winfo_height()
+        if scrolled:
+            tree.yview_scroll(-1 if y < 0 else 1, "units")
+
+        target = tree.identify_row(y)
+        if target:
             bbox = tree.bbox(target)
-            if bbox:
-                mid_y = bbox[1] + bbox[3] // 2
-                source_idx = tree.index(self.drag_data["item"])
-                target_idx = tree.index(target)
-                if event.y < mid_y and source_idx > target_idx:
-                    tree.move(self.drag_data["item"], "", target_idx)
-                elif event.y >= mid_y and source_idx < target_idx:
-                    tree.move(self.drag_data["item"], "", target_idx)
+            gap = model.index(target)
+            if bbox and y >= bbox[1] + bbox[3] // 2:
+                gap += 1
+        elif y > 0 and len(model):
+            gap = len(model)
+        else:
+            gap = self.drag_data["gap"]
+        if gap is None or (gap == self.drag_data["gap"] and not scrolled):
+            return
+        self.drag_data["gap"] = gap
+
+        if gap < len(model):
+            bbox = tree.bbox(model.ids[gap])
+            line_y = bbox[1] if bbox else None
+        else:
+            bbox = tree.bbox(model.ids[-1])
+            line_y = bbox[1] + bbox[3] if bbox else None
+        indicator = self.drag_data["indicator"]
+        if indicator is None:
+            indicator = tk.Frame(tree, height=2, bg="#1f6fd1")
+            self.drag_data["indicator"] = indicator
+        if line_y is None:
+            indicator.place_forget()
+        else:
+            indicator.place(x=0, y=max(line_y - 1, 0), relwidth=1, height=2)
 
     def _on_drag_release(self, event, tree, tab_id):
-        if self.drag_data["item"]:
-            self._renumber_fav_tree(tree)
-            self._sync(tab_id)
-            self._mark_unsaved()
-        self.drag_data["item"] = None
-        self.drag_data["tree"] = None
+        item = self.drag_data["item"]
+        if item:
+            if self.drag_data["job"] is not None:
+                tree.after_cancel(self.drag_data["job"])
+            if self.drag_data["moved"]:
+                self.drag_data["y"] = event.y
+                self._update_drop_indicator()
+            if self.drag_data["indicator"] is not None:
+                self.drag_data["indicator"].destroy()
+
+            gap = self.drag_data["gap"]
+            if self.drag_data["moved"] and gap is not None:
+                # Un único movimiento en el modelo y un único _sync al soltar
+                model = self.data.fav_models[tab_id]
+                affected = model.move_before(self.drag_data["items"], gap)
+                if affected:
+                    self._apply_fav_range(tree, model, *affected)
+                    self._sync(tab_id)
+                    self._mark_unsaved()
+            elif self.drag_data["collapse"]:
+                # Clic sin arrastre sobre una selección múltiple: seleccionar solo ese item
+                tree.selection_set(item)
+        self.drag_data = {"item": None, "tree": None}
 
     def _on_double_click(self, event, tree, tab_id):
         region = tree.identify("region", event.x, event.y)
@@ -891,15 +942,12 @@ class SDXEditorApp:
             tree = self.edit_entry.tree
             item = self.edit_entry.item
             tab_id = self.edit_entry.tab_id
-            total_items = len(tree.get_children())
-            if new_pos < 1:
-                new_pos = 1
-            elif new_pos > total_items:
-                new_pos = total_items
-            tree.move(item, "", new_pos - 1)
-            self._renumber_fav_tree(tree)
-            self._sync(tab_id)
-            self._mark_unsaved()
+            model = self.data.fav_models[tab_id]
+            affected = model.move_to([item], new_pos - 1)
+            if affected:
+                self._apply_fav_range(tree, model, *affected)
+                self._sync(tab_id)
+                self._mark_unsaved()
         except ValueError:
             pass
         self._close_edit_entry()
@@ -912,128 +960,205 @@ class SDXEditorApp:
     def load_file(self):
         path = filedialog.askopenfilename(filetypes=[("SDX Files", "*.sdx")])
         if not path: return
-        try:
-            with open(path, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
+        self._run_task("Cargar SDX", self._load_sdx_job, path, on_done=self._on_sdx_loaded)
 
-            self.all_data_objects = []
-            self.programs_dict = {}
-            self.program_list = []
-            self.transponders = {}
-            
-            decoder = json.JSONDecoder()
-            pos = 0
-            while pos < len(content):
-                chunk = content[pos:].lstrip()
-                if not chunk: break
-                try:
-                    obj, index = decoder.raw_decode(chunk)
-                    self.all_data_objects.append(obj)
-                    pos += (len(content[pos:]) - len(chunk)) + index
-                except json.JSONDecodeError:
-                    pos += 1
-
-            self._process_data()
-            self._refresh_all_channels_list()
-            self._build_fav_tabs()
-            
-            # Resetear flag de cambios
-            self.unsaved_changes = False
-            self.root.title("Editor de canales SAT - v3.0")
-            
-            messagebox.showinfo("Éxito", f"Carga completada: {len(self.program_list)} canales encontrados.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al leer: {e}")
-
-    def _get_service_type(self, sdt_type):
-        types = {1: "TV SD", 2: "Radio", 17: "TV SD", 22: "TV SD", 25: "TV HD", 31: "TV UHD"}
-        return types.get(sdt_type, f"Tipo {sdt_type}")
-
-    def _process_data(self):
-        self.programs_dict = {}
-        self.programs_by_sid_tp = {}  # Secondary lookup by SID_TP only
-        self.program_list = []
-        self.transponders = {}
-        self.fav_lists_indices = {}
+    def _load_sdx_job(self, task, path):
+        """Lee, decodifica y procesa un archivo SDX (se ejecuta en un hilo de trabajo)."""
+        content = self._read_text(path, task)
+        return self._load_data(self._decode_objects(content, task), task)
+
+    def _on_sdx_loaded(self, state):
+        self._apply_state(state)
+        self._profile_done("Cargar SDX")
         
-        for obj in self.all_data_objects:
-            if not isinstance(obj, dict): continue
-            key = list(obj.keys())[0]
-            if "transponder_object_" in key:
-                try:
-                    idx = int(key.split("_")[-1])
-                    data = obj[key]
-                    freq = data.get("Freq", 0)
-                    self.transponders[idx] = freq
-                except: pass
+        # Resetear flag de cambios
+        self.unsaved_changes = False
+        self.root.title("Editor de canales SAT - v3.0")
         
-        channel_order = 0
-        for i, obj in enumerate(self.all_data_objects):
-            if not isinstance(obj, dict): continue
-            key = list(obj.keys())[0]
-            
-            if "program_tv_object" in key:
-                channel_order += 1
-                data = obj[key]
-                c_name = str(data.get("ServiceName", "Sin Nombre")).strip()
-                st_prog_no = data.get("stProgNo", {})
-                un_short = st_prog_no.get("unShort", {})
-                s_lo16 = un_short.get("sLo16", 0)
-                s_hi16 = un_short.get("sHi16", 0)
-                ui_set = data.get("uiSet", {}).get("uiBit", {})
-                is_hd = ui_set.get("HD", 0)
-                is_ca = ui_set.get("CA", 0)
-                lcn = data.get("iLCN", 0)
-                sdt_type = data.get("SDTServiceType", 0)
-                signal_quality = data.get("signal_quality", 0)
-                freq = self.transponders.get(s_hi16, 0)
-                # Use program index to ensure uniqueness for duplicate SID/TP combinations
-                prog_idx = key.split("_")[-1]
-                unique_key = f"{s_lo16}_{s_hi16}_{prog_idx}"
-
-                channel_data = {
-                    'name': c_name,
-                    'stProgNo': st_prog_no,
-                    'obj_index': i,
-                    'order': channel_order,
-                    'freq': freq,
-                    'sid': s_lo16,
-                    'lcn': lcn,
-                    'hd': "Sí" if is_hd else "",
-                    'ca': "Cifrado" if is_ca else "Libre",
-                    'tipo': self._get_service_type(sdt_type),
-                    'calidad': f"{signal_quality}%"
-                }
-                self.programs_dict[unique_key] = channel_data
-                # Also store by SID_TP for favorites lookup (keeps first occurrence)
-                sid_tp_key = f"{s_lo16}_{s_hi16}"
-                if sid_tp_key not in self.programs_by_sid_tp:
-                    self.programs_by_sid_tp[sid_tp_key] = channel_data
-                self.program_list.append((unique_key, c_name))
-            
-            elif "fav_list_object_" in key:
-                try:
-                    idx = int(key.split("_")[-1])
-                    self.fav_lists_indices[idx] = i
-                except: pass
-            
-            elif "fav_list_info_in_box_object" in key:
-                self.fav_names_obj_index = i
+        messagebox.showinfo("Éxito", f"Carga completada: {len(self.data.program_list)} canales encontrados.")
+        self._show_validation(self.data.validation, "Problemas en el archivo cargado")
+
+    def _read_text(self, path, task=None):
+        """Lee un archivo de texto informando del progreso."""
+        if task:
+            task.report(f"Leyendo {os.path.basename(path)}...")
+        with self.profiler.phase("leer", unit="caracteres") as phase:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                content = f.read()
+            phase.count = len(content)
+        return content
+
+    def _decode_objects(self, content, task=None):
+        """Decodifica los objetos JSON concatenados informando del progreso."""
+        with self.profiler.phase("decodificar", unit="objetos") as phase:
+            objects = ChannelDataProcessor.decode_objects(content, self._decode_progress(task))
+            phase.count = len(objects)
+        return objects
+
+    def _decode_progress(self, task):
+        """Función de progreso de la decodificación para una tarea (None sin tarea)."""
+        if not task:
+            return None
+
+        def progress(position, total, count):
+            task.report(f"Decodificando: {position / 1e6:.1f} de {total / 1e6:.1f} MB ({count} objetos)",
+                        0.6 * position / total if total else None)
+        return progress
+
+    def _open_job(self, path):
+        """Tarea de carga adecuada para un archivo según su extensión."""
+        return self._load_chl_job if path.lower().endswith(".chl") else self._load_sdx_job
+
+    def _on_startup_loaded(self, path, result):
+        """Instala el archivo pasado por línea de comandos cuando termina de cargarse."""
+        if self.startup_profile is not None:
+            self.startup_profile.mark("archivo cargado")
+            self.startup_profile.report()
+        if path.lower().endswith(".chl"):
+            self._on_chl_loaded(result)
+        else:
+            self._on_sdx_loaded(result)
+
+    def _run_task(self, title, func, *args, on_done=None, task=None):
+        """
+        Ejecuta func(task, *args) en segundo plano con barra de progreso y botón
+        de cancelar. Si se pasa task, muestra el progreso de una tarea ya iniciada.
+        """
+        if self.current_task is not None:
+            messagebox.showwarning("Aviso", "Ya hay una operación en curso.")
+            return None
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title(title)
+        dialog.geometry("420x130")
+        dialog.transient(self.root)
+        dialog.resizable(False, False)
+        label = tk.Label(dialog, text="Iniciando...", anchor="w")
+        label.pack(fill=tk.X, padx=10, pady=(15, 5))
+        bar = ttk.Progressbar(dialog, mode="indeterminate", maximum=100)
+        bar.pack(fill=tk.X, padx=10)
+        bar.start(15)
+
+        if task is None:
+            task = BackgroundTask(func, *args)
+        tk.Button(dialog, text="Cancelar", command=task.cancel).pack(pady=10)
+        dialog.protocol("WM_DELETE_WINDOW", task.cancel)
+        dialog.wait_visibility()
+        dialog.grab_set()
+        self.root.config(cursor=self.cursor_wait)
+
+        def on_progress(text, fraction):
+            self._show_progress(label, bar, text, fraction)
+
+        def finish():
+            self.current_task = None
+            self.root.config(cursor="")
+            dialog.destroy()
+
+        def on_success(result):
+            finish()
+            if on_done:
+                on_done(result)
+
+        def on_error(error, details):
+            finish()
+            self._show_task_error(error, details)
+
+        self.current_task = task
+        if not task.started:
+            task.start()
+        task.attach(self.root, on_progress=on_progress, on_done=on_success,
+                    on_error=on_error, on_cancelled=finish)
+        return task
+
+    def _show_progress(self, label, bar, text, fraction):
+        """Actualiza una etiqueta y barra de progreso (fraction None = indeterminada)."""
+        label.config(text=text)
+        if fraction is None:
+            if str(bar.cget("mode")) != "indeterminate":
+                bar.config(mode="indeterminate")
+                bar.start(15)
+        else:
+            if str(bar.cget("mode")) != "determinate":
+                bar.stop()
+                bar.config(mode="determinate")
+            bar["value"] = fraction * 100
+
+    def _show_task_error(self, error, details):
+        """Muestra el error de una tarea en segundo plano."""
+        from urllib.error import URLError
+        if isinstance(error, URLError):
+            messagebox.showerror("Error de conexión", f"No se pudo conectar a KingOfSat:\n{error}")
+        else:
+            messagebox.showerror("Error", f"Error al procesar:\n{error}\n\nDetalles:\n{details[:500]}")
+
+    def _load_data(self, all_data_objects, task=None):
+        """
+        Construye todo el modelo de datos de un archivo (ver
+        ChannelDataProcessor.load_channel_data).
+
+        No toca la interfaz ni el estado actual, así que puede ejecutarse en un
+        hilo de trabajo; _apply_state lo instala después de una sola vez.
+        """
+        progress = None
+        if task:
+            def progress(done, total):
+                if done < total:
+                    task.report(f"Procesando objetos: {done} de {total}", 0.6 + 0.3 * done / total)
+                else:
+                    task.report("Preparando listas...", 0.9)
+        with self.profiler.phase("procesar", unit="canales") as phase:
+            state = ChannelDataProcessor.load_channel_data(all_data_objects, progress)
+            phase.count = len(state.program_list)
+        if task:
+            task.report("Comprobando integridad...", 0.95)
+        from channel_validation import validate_sdx
+        with self.profiler.phase("validar", unit="problemas") as phase:
+            state.validation = validate_sdx(all_data_objects)
+            phase.count = len(state.validation.issues)
+        return state
+
+    def _apply_state(self, state):
+        """Instala un ChannelData construido por _load_data y reconstruye la interfaz."""
+        self.data = state
+        self._refresh_all_channels_list()
+        self._build_fav_tabs()
 
     def _refresh_all_channels_list(self):
-        self.tree_all.delete(*self.tree_all.get_children())
-        query = self.search_var.get().lower()
-        for unique_key, name in sorted(self.program_list, key=lambda x: x[1].lower()):
-            if query in name.lower():
-                info = self.programs_dict[unique_key]
-                self.tree_all.insert("", "end", iid=unique_key, values=(
-                    info['order'], info['name'], info['freq'], info['sid'],
-                    info['lcn'], info['hd'], info['ca'], info['tipo'], info['calidad']
-                ))
-
-    def _create_fav_tree(self, parent, tab_id):
+        with self.profiler.phase("lista general", unit="filas") as phase:
+            self.tree_all.delete(*self.tree_all.get_children())
+            query = self.search_var.get().lower()
+            model = self.data.channel_model
+            view = model.view(query, self.sort_column, self.sort_descending)
+            for pos in view:
+                self.tree_all.insert("", "end", iid=model.keys[pos], values=model.rows[pos])
+            phase.count = len(view)
+
+    def _on_search(self):
+        self._refresh_all_channels_list()
+        self._profile_done("Buscar")
+
+    def _sort_all_by(self, column):
+        """Ordena la lista general por la columna pulsada (otro clic invierte el orden)."""
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = False
+        self._update_sort_headings()
+        self._refresh_all_channels_list()
+        self._profile_done("Ordenar")
+
+    def _update_sort_headings(self):
+        """Muestra una flecha en la cabecera de la columna de ordenación."""
+        for col, text in self.all_headings.items():
+            if col == self.sort_column:
+                text += " ▼" if self.sort_descending else " ▲"
+            self.tree_all.heading(col, text=text)
+
+    def _create_fav_tree(self, parent):
         columns = ("#", "nombre", "freq", "sid", "lcn", "hd", "ca", "tipo")
-        tree = ttk.Treeview(parent, columns=columns, show="headings", selectmode="browse")
+        tree = ttk.Treeview(parent, columns=columns, show="headings", selectmode="extended")
         tree.heading("#", text="#")
         tree.heading("nombre", text="Nombre")
         tree.heading("freq", text="Freq")
@@ -1050,65 +1175,101 @@ class SDXEditorApp:
         tree.column("hd", width=30, anchor="center")
         tree.column("ca", width=55, anchor="center")
         tree.column("tipo", width=55, anchor="center")
-        self._setup_drag_and_drop(tree, tab_id)
+        self._setup_drag_and_drop(tree)
         return tree
 
     def _build_fav_tabs(self):
-        for tab in self.fav_notebook.tabs(): 
-            self.fav_notebook.forget(tab)
-        self.fav_trees = {}
+        """Crea una pestaña por lista; el Treeview compartido se enlaza a la lista seleccionada."""
+        with self.profiler.phase("pestañas", len(self.data.fav_lists_indices), "listas"):
+            for tab in self.fav_notebook.tabs():
+                self.fav_notebook.forget(tab)
+            for frame in self.fav_tab_frames.values():
+                frame.destroy()
+            self.fav_tab_frames = {}
+            self.fav_tab_ids = {}
+            self.fav_view_state = {}
+            self.fav_undo = []
+            self.fav_tree_tab = None
+            self.fav_tree.delete(*self.fav_tree.get_children())
+
+            names = []
+            if self.data.fav_names_obj_index != -1:
+                names = self.data.all_data_objects[self.data.fav_names_obj_index]["fav_list_info_in_box_object"].get("aucFavReName", [])
+
+            for f_idx in sorted(self.data.fav_lists_indices.keys()):
+                full_name = names[f_idx] if f_idx < len(names) and names[f_idx].strip() else f"Lista {f_idx}"
+                self._add_fav_tab(f_idx, full_name)
+
+            tab_id = self._get_current_fav_id()
+            if tab_id is not None:
+                self._bind_fav_tree(tab_id)
+
+    def _add_fav_tab(self, tab_id, full_name):
+        """Añade al notebook la pestaña de una lista de favoritos (un marco vacío)."""
+        # Truncar nombre a máximo 7 caracteres para la pestaña
+        tab_name = full_name[:7] if len(full_name) > 7 else full_name
+        # Añadir espacios para forzar ancho mínimo de 7 caracteres
+        tab_name = tab_name.center(7)
         
-        names = []
-        if self.fav_names_obj_index != -1:
-            names = self.all_data_objects[self.fav_names_obj_index]["fav_list_info_in_box_object"].get("aucFavReName", [])
-
-        for f_idx in sorted(self.fav_lists_indices.keys()):
-            full_name = names[f_idx] if f_idx < len(names) and names[f_idx].strip() else f"Lista {f_idx}"
-            # Truncar nombre a máximo 7 caracteres para la pestaña
-            tab_name = full_name[:7] if len(full_name) > 7 else full_name
-            # Añadir espacios para forzar ancho mínimo de 7 caracteres
-            tab_name = tab_name.center(7)
-            
-            frame = tk.Frame(self.fav_notebook)
-            self.fav_notebook.add(frame, text=tab_name)
-            
-            tree = self._create_fav_tree(frame, f_idx)
-            tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            sb = ttk.Scrollbar(frame, command=tree.yview)
-            sb.pack(side=tk.RIGHT, fill=tk.Y)
-            tree.config(yscrollcommand=sb.set)
-            self.fav_trees[f_idx] = tree
-            
-            obj_idx = self.fav_lists_indices[f_idx]
-            key = f"fav_list_object_{f_idx}"
-            
-            fav_order = 0
-            for fav_entry in self.all_data_objects[obj_idx][key].get("stProgNo", []):
-                fav_order += 1
-                un_short = fav_entry.get("unShort", {})
-                s_lo16 = un_short.get("sLo16", 0)
-                s_hi16 = un_short.get("sHi16", 0)
-                lookup_key = f"{s_lo16}_{s_hi16}"
-                channel_info = self.programs_by_sid_tp.get(lookup_key)
-                
-                if channel_info:
-                    fav_json = json.dumps(fav_entry, separators=(',', ':'))
-                    tree.insert("", "end", tags=(fav_json,), values=(
-                        fav_order, channel_info['name'], channel_info['freq'],
-                        channel_info['sid'], channel_info['lcn'], channel_info['hd'],
-                        channel_info['ca'], channel_info['tipo']
-                    ))
-                else:
-                    fav_json = json.dumps(fav_entry, separators=(',', ':'))
-                    tree.insert("", "end", tags=(fav_json,), values=(
-                        fav_order, f"Desconocido ({s_lo16}_{s_hi16})", "", s_lo16, "", "", "", ""
-                    ))
+        frame = tk.Frame(self.fav_notebook, height=1)
+        self.fav_notebook.add(frame, text=tab_name)
+        self.fav_tab_frames[tab_id] = frame
+        self.fav_tab_ids[str(frame)] = tab_id
+        return frame
+
+    def _on_fav_tab_changed(self, event=None):
+        tab_id = self._get_current_fav_id()
+        if tab_id is not None:
+            self._bind_fav_tree(tab_id)
+
+    def _bind_fav_tree(self, tab_id):
+        """
+        Enlaza el Treeview de favoritos al modelo de una lista y lo devuelve.
+
+        Guarda el desplazamiento y la selección de la lista anterior y
+        restaura los de la nueva, así que el Treeview solo contiene en cada
+        momento las filas de una lista.
+        """
+        tree = self.fav_tree
+        if self.fav_tree_tab == tab_id:
+            return tree
+        self._close_edit_entry()
+        self.drag_data = {"item": None, "tree": None}
+        
+        if self.fav_tree_tab in self.data.fav_models:
+            self.fav_view_state[self.fav_tree_tab] = (
+                tree.yview()[0], tree.selection(), tree.focus()
+            )
+        tree.delete(*tree.get_children())
+        
+        model = self.data.fav_models[tab_id]
+        for pos, row_id in enumerate(model.ids, 1):
+            tree.insert("", "end", iid=row_id, values=(pos,) + model.values(row_id))
+        self.fav_tree_tab = tab_id
+        
+        top, selection, focus = self.fav_view_state.get(tab_id, (0.0, (), ""))
+        selection = [row_id for row_id in selection if row_id in model]
+        if selection:
+            tree.selection_set(selection)
+        if focus in model:
+            tree.focus(focus)
+        tree.yview_moveto(top)
+        return tree
 
-    def _renumber_fav_tree(self, tree):
-        for idx, item in enumerate(tree.get_children(), 1):
-            values = list(tree.item(item, "values"))
-            values[0] = idx
-            tree.item(item, values=values)
+    def _renumber_fav_tree(self, tree, model, lo, hi=None):
+        """Reescribe la columna # solo en el rango [lo, hi] (hasta el final si hi es None)."""
+        ids = model.ids
+        if hi is None:
+            hi = len(ids) - 1
+        for idx in range(lo, hi + 1):
+            tree.set(ids[idx], "#", idx + 1)
+
+    def _apply_fav_range(self, tree, model, lo, hi):
+        """Lleva al Treeview el orden del modelo en el rango [lo, hi] y lo renumera."""
+        ids = model.ids
+        for idx in range(lo, hi + 1):
+            tree.move(ids[idx], "", idx)
+            tree.set(ids[idx], "#", idx + 1)
 
     def add_to_fav(self):
         tab_id = self._get_current_fav_id()
@@ -1116,25 +1277,17 @@ class SDXEditorApp:
         sel = self.tree_all.selection()
         if not sel:
             return
-        tree = self.fav_trees[tab_id]
-        current_count = len(tree.get_children())
+        tree = self._bind_fav_tree(tab_id)
+        model = self.data.fav_models[tab_id]
         
         for unique_key in sel:
-            channel_info = self.programs_dict.get(unique_key)
+            channel_info = self.data.programs_dict.get(unique_key)
             if channel_info:
-                current_count += 1
-                st_prog_no = channel_info['stProgNo']
-                un_short = st_prog_no.get("unShort", {})
-                s_lo16 = un_short.get("sLo16", 0)
-                s_hi16 = un_short.get("sHi16", 0)
-                ui_word32 = (s_hi16 << 16) | s_lo16
-                fav_entry = {"uiWord32": ui_word32, "unShort": {"sLo16": s_lo16, "sHi16": s_hi16}}
-                fav_json = json.dumps(fav_entry, separators=(',', ':'))
-                tree.insert("", "end", tags=(fav_json,), values=(
-                    current_count, channel_info['name'], channel_info['freq'],
-                    channel_info['sid'], channel_info['lcn'], channel_info['hd'],
-                    channel_info['ca'], channel_info['tipo']
-                ))
+                packed = fav_entry_key(channel_info['stProgNo'])
+                fav_entry = make_fav_entry(packed & 0xFFFF, packed >> 16)
+                values = ChannelDataProcessor.fav_row_values(channel_info)
+                row_id = model.append(fav_entry, values)
+                tree.insert("", "end", iid=row_id, values=(len(model),) + values)
         self._sync(tab_id)
         self._mark_unsaved()
 
@@ -1142,7 +1295,7 @@ class SDXEditorApp:
         """Elimina canales seleccionados de favoritos (botón)."""
         tab_id = self._get_current_fav_id()
         if tab_id is None: return
-        tree = self.fav_trees[tab_id]
+        tree = self._bind_fav_tree(tab_id)
         self._remove_selected_from_fav(tree, tab_id)
 
     def _remove_selected_from_fav(self, tree, tab_id):
@@ -1151,29 +1304,20 @@ class SDXEditorApp:
         if not selection:
             return
         
-        # Obtener todos los items y encontrar el índice del primero seleccionado
-        all_items = tree.get_children()
-        if not all_items:
+        # Eliminar del modelo; devuelve el índice del primer item eliminado
+        model = self.data.fav_models[tab_id]
+        first_selected_idx = model.remove(selection)
+        tree.delete(*selection)
+        if first_selected_idx is None:
             return
         
-        # Encontrar el índice del primer item seleccionado
-        first_selected_idx = 0
-        for i, item in enumerate(all_items):
-            if item in selection:
-                first_selected_idx = i
-                break
-        
-        # Eliminar los items seleccionados
-        for item in selection:
-            tree.delete(item)
-        
-        # Renumerar
-        self._renumber_fav_tree(tree)
+        # Renumerar solo desde el primer hueco
+        self._renumber_fav_tree(tree, model, first_selected_idx)
         self._sync(tab_id)
         self._mark_unsaved()
         
         # Seleccionar el siguiente item (o el anterior si era el último)
-        remaining_items = tree.get_children()
+        remaining_items = model.ids
         if remaining_items:
             # Intentar seleccionar el item en la misma posición
             if first_selected_idx < len(remaining_items):
@@ -1188,15 +1332,38 @@ class SDXEditorApp:
     def move_item(self, direction):
         tab_id = self._get_current_fav_id()
         if tab_id is None: return
-        tree = self.fav_trees[tab_id]
+        tree = self._bind_fav_tree(tab_id)
+        sel = tree.selection()
+        if not sel: return
+        model = self.data.fav_models[tab_id]
+        affected = model.move(sel, direction)
+        if not affected: return
+        self._apply_fav_range(tree, model, *affected)
+        tree.see(sel[0] if direction < 0 else sel[-1])
+        self._sync(tab_id)
+        self._mark_unsaved()
+
+    def move_selection_to(self, where):
+        """Mueve la selección como bloque al inicio ("top"), al final ("bottom") o a una posición pedida ("ask")."""
+        tab_id = self._get_current_fav_id()
+        if tab_id is None: return
+        tree = self._bind_fav_tree(tab_id)
         sel = tree.selection()
         if not sel: return
-        for item in sorted(sel, reverse=(direction==1)):
-            idx = tree.index(item)
-            new_idx = idx + direction
-            if 0 <= new_idx < len(tree.get_children()):
-                tree.move(item, "", new_idx)
-        self._renumber_fav_tree(tree)
+        model = self.data.fav_models[tab_id]
+        if where == "top":
+            position = 0
+        elif where == "bottom":
+            position = len(model)
+        else:
+            new_pos = simpledialog.askinteger("Mover a", f"Nueva posición (1-{len(model)}):",
+                                              minvalue=1, maxvalue=len(model))
+            if new_pos is None: return
+            position = new_pos - 1
+        affected = model.move_to(sel, position)
+        if not affected: return
+        self._apply_fav_range(tree, model, *affected)
+        tree.see(sel[0])
         self._sync(tab_id)
         self._mark_unsaved()
 
@@ -1207,23 +1374,23 @@ class SDXEditorApp:
         
         # Obtener el nombre completo actual (no el truncado)
         names = []
-        if self.fav_names_obj_index != -1:
-            names = self.all_data_objects[self.fav_names_obj_index]["fav_list_info_in_box_object"].get("aucFavReName", [])
+        if self.data.fav_names_obj_index != -1:
+            names = self.data.all_data_objects[self.data.fav_names_obj_index]["fav_list_info_in_box_object"].get("aucFavReName", [])
         old_full = names[tab_id] if tab_id < len(names) and names[tab_id].strip() else f"Lista {tab_id}"
         
         new = simpledialog.askstring("Renombrar", "Nuevo nombre:", initialvalue=old_full)
-        if new and self.fav_names_obj_index != -1:
+        if new and self.data.fav_names_obj_index != -1:
             # Guardar nombre completo en fav_list_info_in_box_object
-            self.all_data_objects[self.fav_names_obj_index]["fav_list_info_in_box_object"]["aucFavReName"][tab_id] = new
+            self.data.all_data_objects[self.data.fav_names_obj_index]["fav_list_info_in_box_object"]["aucFavReName"][tab_id] = new
             
             # Actualizar ucFavNameChangeMask para indicar que esta lista tiene nombre personalizado
-            fav_info = self.all_data_objects[self.fav_names_obj_index]["fav_list_info_in_box_object"]
+            fav_info = self.data.all_data_objects[self.data.fav_names_obj_index]["fav_list_info_in_box_object"]
             current_mask = fav_info.get("ucFavNameChangeMask", 0)
             new_mask = current_mask | (1 << tab_id)  # Setear el bit correspondiente
             fav_info["ucFavNameChangeMask"] = new_mask
             
             # IMPORTANTE: También actualizar en box_object (donde el deco lee los nombres)
-            self._sync_fav_names_to_box_object()
+            self.data.sync_fav_names()
             
             # Mostrar nombre truncado en la pestaña (máximo 7 caracteres)
             tab_name = new[:7] if len(new) > 7 else new
@@ -1234,7 +1401,7 @@ class SDXEditorApp:
 
     def create_fav_list(self):
         """Crea una nueva lista de favoritos."""
-        if not self.all_data_objects:
+        if not self.data.all_data_objects:
             messagebox.showwarning("Aviso", "Primero debes cargar un archivo SDX o CHL")
             return
 
@@ -1243,51 +1410,12 @@ class SDXEditorApp:
         if not name:
             return
 
-        # Encontrar el siguiente índice disponible
-        existing_indices = set(self.fav_lists_indices.keys())
-        new_idx = 0
-        while new_idx in existing_indices:
-            new_idx += 1
-
-        # Crear el objeto fav_list_object
-        new_fav_obj = {
-            f"fav_list_object_{new_idx}": {
-                "sNoOfTVFavor": 0,
-                "sNoOfRadioFavor": 0,
-                "stProgNo": []
-            }
-        }
-        self.all_data_objects.append(new_fav_obj)
-        self.fav_lists_indices[new_idx] = len(self.all_data_objects) - 1
-
-        # Actualizar nombres en fav_list_info_in_box_object
-        if self.fav_names_obj_index != -1:
-            fav_info = self.all_data_objects[self.fav_names_obj_index]["fav_list_info_in_box_object"]
-            names = fav_info.get("aucFavReName", [])
-            # Extender la lista si es necesario
-            while len(names) <= new_idx:
-                names.append(f"Lista {len(names)}")
-            names[new_idx] = name
-            fav_info["aucFavReName"] = names
-            # Actualizar mask
-            current_mask = fav_info.get("ucFavNameChangeMask", 0)
-            fav_info["ucFavNameChangeMask"] = current_mask | (1 << new_idx)
-            self._sync_fav_names_to_box_object()
+        new_idx = self.data.add_fav_list(name)
 
         # Crear la pestaña en el notebook
-        frame = tk.Frame(self.fav_notebook)
-        tab_name = name[:7] if len(name) > 7 else name
-        tab_name = tab_name.center(7)
-        self.fav_notebook.add(frame, text=tab_name)
-
-        tree = self._create_fav_tree(frame, new_idx)
-        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        sb = ttk.Scrollbar(frame, command=tree.yview)
-        sb.pack(side=tk.RIGHT, fill=tk.Y)
-        tree.config(yscrollcommand=sb.set)
-        self.fav_trees[new_idx] = tree
+        frame = self._add_fav_tab(new_idx, name)
 
-        # Seleccionar la nueva pestaña
+        # Seleccionar la nueva pestaña (se rellena en _on_fav_tab_changed)
         self.fav_notebook.select(frame)
 
         self._mark_unsaved()
@@ -1302,8 +1430,8 @@ class SDXEditorApp:
 
         # Obtener nombre de la lista
         fav_name = f"Lista {tab_id}"
-        if self.fav_names_obj_index != -1:
-            names = self.all_data_objects[self.fav_names_obj_index]["fav_list_info_in_box_object"].get("aucFavReName", [])
+        if self.data.fav_names_obj_index != -1:
+            names = self.data.all_data_objects[self.data.fav_names_obj_index]["fav_list_info_in_box_object"].get("aucFavReName", [])
             if tab_id < len(names) and names[tab_id].strip():
                 fav_name = names[tab_id]
 
@@ -1319,130 +1447,87 @@ class SDXEditorApp:
         # Eliminar la pestaña del notebook
         self.fav_notebook.forget(cur_tab_idx)
 
-        # Eliminar el tree de fav_trees
-        if tab_id in self.fav_trees:
-            del self.fav_trees[tab_id]
+        # Desenlazar el Treeview compartido si mostraba esta lista
+        if self.fav_tree_tab == tab_id:
+            self.fav_tree.delete(*self.fav_tree.get_children())
+            self.fav_tree_tab = None
+        self.fav_view_state.pop(tab_id, None)
+        frame = self.fav_tab_frames.pop(tab_id, None)
+        if frame is not None:
+            self.fav_tab_ids.pop(str(frame), None)
+            frame.destroy()
+        self.data.fav_models.pop(tab_id, None)
 
         # Eliminar el objeto fav_list_object de all_data_objects
-        obj_idx = self.fav_lists_indices.get(tab_id)
+        obj_idx = self.data.fav_lists_indices.get(tab_id)
         if obj_idx is not None:
             # Marcar para eliminar (ponemos None y luego limpiamos)
-            self.all_data_objects[obj_idx] = None
+            self.data.all_data_objects[obj_idx] = None
 
         # Eliminar del índice
-        if tab_id in self.fav_lists_indices:
-            del self.fav_lists_indices[tab_id]
+        if tab_id in self.data.fav_lists_indices:
+            del self.data.fav_lists_indices[tab_id]
 
         # Limpiar objetos None de all_data_objects y reindexar
-        self.all_data_objects = [obj for obj in self.all_data_objects if obj is not None]
+        self.data.all_data_objects = [obj for obj in self.data.all_data_objects if obj is not None]
 
         # Reindexar fav_lists_indices
-        self.fav_lists_indices = {}
-        for i, obj in enumerate(self.all_data_objects):
+        self.data.fav_lists_indices = {}
+        for i, obj in enumerate(self.data.all_data_objects):
             if isinstance(obj, dict):
                 key = list(obj.keys())[0]
                 if "fav_list_object_" in key:
                     idx = int(key.split("_")[-1])
-                    self.fav_lists_indices[idx] = i
+                    self.data.fav_lists_indices[idx] = i
                 elif "fav_list_info_in_box_object" in key:
-                    self.fav_names_obj_index = i
+                    self.data.fav_names_obj_index = i
 
         # Limpiar nombre de la lista eliminada
-        if self.fav_names_obj_index != -1:
-            fav_info = self.all_data_objects[self.fav_names_obj_index]["fav_list_info_in_box_object"]
+        if self.data.fav_names_obj_index != -1:
+            fav_info = self.data.all_data_objects[self.data.fav_names_obj_index]["fav_list_info_in_box_object"]
             names = fav_info.get("aucFavReName", [])
             if tab_id < len(names):
                 names[tab_id] = ""
-            self._sync_fav_names_to_box_object()
+            self.data.sync_fav_names()
 
         self._mark_unsaved()
         messagebox.showinfo("Lista eliminada", f"Lista '{fav_name}' eliminada correctamente.")
 
-    def _sync_fav_names_to_box_object(self):
-        """Sincroniza los nombres de favoritos de fav_list_info_in_box_object a box_object."""
-        if self.fav_names_obj_index == -1:
-            return
-        
-        # Obtener nombres y mask de fav_list_info_in_box_object
-        fav_info = self.all_data_objects[self.fav_names_obj_index]["fav_list_info_in_box_object"]
-        names = fav_info.get("aucFavReName", [])
-        mask = fav_info.get("ucFavNameChangeMask", 0)
-        
-        # Buscar y actualizar box_object
-        for obj in self.all_data_objects:
-            if not isinstance(obj, dict):
-                continue
-            if "box_object" in obj:
-                box = obj["box_object"]
-                if "aucFavReName" in box:
-                    box["aucFavReName"] = names.copy()
-                    box["ucFavNameChangeMask"] = mask
-                break
-
     def _sync(self, tab_id):
-        tree = self.fav_trees[tab_id]
-        new_data = []
-        for item in tree.get_children():
-            tags = tree.item(item, "tags")
-            if tags:
-                fav_entry = json.loads(tags[0])
-                new_data.append(fav_entry)
-        obj_idx = self.fav_lists_indices[tab_id]
-        fav_key = f"fav_list_object_{tab_id}"
-        self.all_data_objects[obj_idx][fav_key]["stProgNo"] = new_data
-        self.all_data_objects[obj_idx][fav_key]["sNoOfTVFavor"] = len(new_data)
-        
-        # Actualizar FavBit de todos los programas
-        self._update_all_favbits()
+        with self.profiler.phase("sincronizar", unit="entradas") as phase:
+            new_data = self.data.fav_models[tab_id].entries()
+            obj_idx = self.data.fav_lists_indices[tab_id]
+            fav_key = f"fav_list_object_{tab_id}"
+            self.data.all_data_objects[obj_idx][fav_key]["stProgNo"] = new_data
+            self.data.all_data_objects[obj_idx][fav_key]["sNoOfTVFavor"] = len(new_data)
+
+            # Actualizar FavBit de todos los programas
+            self._update_all_favbits()
+            phase.count = len(new_data)
+        self._profile_done("Editar favoritos")
     
     def _update_all_favbits(self):
         """Recalcula el FavBit de cada programa basándose en las listas de favoritos."""
-        # Primero, limpiar todos los FavBit
-        for obj in self.all_data_objects:
-            if not isinstance(obj, dict):
-                continue
-            key = list(obj.keys())[0]
-            if "program_tv_object" in key:
-                obj[key]["FavBit"] = 0
-        
-        # Luego, recorrer todas las listas de favoritos y setear los bits correspondientes
-        for fav_idx, obj_idx in self.fav_lists_indices.items():
-            fav_key = f"fav_list_object_{fav_idx}"
-            fav_obj = self.all_data_objects[obj_idx].get(fav_key, {})
-            fav_channels = fav_obj.get("stProgNo", [])
-            
-            bit_mask = 1 << fav_idx  # bit 0 para lista 0, bit 1 para lista 1, etc.
-            
-            for fav_entry in fav_channels:
-                un_short = fav_entry.get("unShort", {})
-                s_lo16 = un_short.get("sLo16", 0)
-                s_hi16 = un_short.get("sHi16", 0)
-                lookup_key = f"{s_lo16}_{s_hi16}"
-                
-                # Buscar el programa en programs_dict para obtener su obj_index
-                if lookup_key in self.programs_dict:
-                    prog_obj_idx = self.programs_dict[lookup_key].get('obj_index')
-                    if prog_obj_idx is not None:
-                        prog_obj = self.all_data_objects[prog_obj_idx]
-                        prog_key = list(prog_obj.keys())[0]
-                        if "program_tv_object" in prog_key:
-                            current_favbit = prog_obj[prog_key].get("FavBit", 0)
-                            prog_obj[prog_key]["FavBit"] = current_favbit | bit_mask
+        ChannelDataProcessor.update_fav_bits(self.data.all_data_objects)
 
     def _get_current_fav_id(self):
         try:
             sel = self.fav_notebook.select()
             if not sel: return None
-            return sorted(self.fav_lists_indices.keys())[self.fav_notebook.index(sel)]
+            return self.fav_tab_ids[str(sel)]
         except: return None
 
     def save_file(self):
+        if not self._check_before_save():
+            return
         path = filedialog.asksaveasfilename(defaultextension=".sdx", initialfile="LISTA_CANALES_MOD.sdx")
         if not path: return
         try:
-            with open(path, 'w', encoding='utf-8') as f:
-                for obj in self.all_data_objects:
-                    f.write(json.dumps(obj, separators=(',', ':')))
+            with self.profiler.phase("guardar", len(self.data.all_data_objects), "objetos"):
+                with open(path, 'w', encoding='utf-8') as f:
+                    for obj in self.data.all_data_objects:
+                        f.write(json.dumps(obj, separators=(',', ':')))
+            self._profile_done("Guardar SDX")
             self.unsaved_changes = False
             # Quitar el asterisco del título
             title = self.root.title()
@@ -1454,9 +1539,11 @@ class SDXEditorApp:
 
     def save_as_chl(self):
         """Guarda los datos en formato CHL."""
-        if not self.all_data_objects:
+        if not self.data.all_data_objects:
             messagebox.showwarning("Aviso", "No hay datos para guardar.")
             return
+        if not self._check_before_save():
+            return
 
         path = filedialog.asksaveasfilename(
             defaultextension=".chl",
@@ -1470,12 +1557,16 @@ class SDXEditorApp:
             self.root.config(cursor=self.cursor_wait)
             self.root.update()
 
-            chl_objects = self._convert_sdx_to_chl()
+            with self.profiler.phase("convertir", unit="objetos") as phase:
+                chl_objects = ChannelDataProcessor.convert_sdx_to_chl(self.data.all_data_objects)
+                phase.count = len(chl_objects)
 
-            with open(path, 'w', encoding='utf-8') as f:
-                for obj in chl_objects:
-                    f.write(json.dumps(obj, indent=2))
-                    f.write('\n')
+            with self.profiler.phase("guardar", len(chl_objects), "objetos"):
+                with open(path, 'w', encoding='utf-8') as f:
+                    for obj in chl_objects:
+                        f.write(json.dumps(obj, indent=2))
+                        f.write('\n')
+            self._profile_done("Guardar CHL")
 
             self.unsaved_changes = False
             title = self.root.title()
@@ -1484,199 +1575,171 @@ class SDXEditorApp:
             messagebox.showinfo("Guardado", f"Archivo CHL guardado con éxito.\n{path}")
 
         except Exception as e:
+            import traceback
             error_details = traceback.format_exc()
             messagebox.showerror("Error", f"No se pudo guardar en CHL:\n{e}\n\nDetalles:\n{error_details[:500]}")
         finally:
             self.root.config(cursor="")
 
-    def _convert_sdx_to_chl(self):
-        """Convierte los datos SDX a formato CHL."""
-        chl_objects = []
-
-        # Contar elementos
-        satellites = []
-        transponders = []
-        channels = []
-        favorites = []
-
-        # Extraer datos de los objetos SDX
-        for obj in self.all_data_objects:
-            if not isinstance(obj, dict):
-                continue
-            key = list(obj.keys())[0]
-
-            if "satellite_object_" in key:
-                idx = int(key.split("_")[-1])
-                data = obj[key]
-                sat = {
-                    "Type": "sat",
-                    "Index": idx,
-                    "Name": data.get("SatName", f"Sat {idx}"),
-                    "Angle": str(data.get("SatAngle", 0)),
-                    "Band": "KU"
-                }
-                satellites.append((idx, sat))
-
-            elif "transponder_object_" in key:
-                idx = int(key.split("_")[-1])
-                data = obj[key]
-                st_flag = data.get("stFlag", {})
-                pol_map = {0: "H", 1: "V", 2: "L", 3: "R"}
-                tp = {
-                    "Type": "tp",
-                    "Index": idx,
-                    "SatIndex": st_flag.get("SatIndex", 0),
-                    "Freq": str(data.get("Freq", 0)),
-                    "SR": str(data.get("SR", 0)),
-                    "Pol": pol_map.get(st_flag.get("POL", 0), "H"),
-                    "FEC": "auto",
-                    "plsNumber": 0,
-                    "msTp": 0,
-                    "msIsid": 0,
-                    "tsnTp": 0,
-                    "tsnId": 0
-                }
-                transponders.append((idx, tp))
-
-            elif "program_tv_object" in key:
-                idx = int(key.split("_")[-1])
-                data = obj[key]
-                st_prog_no = data.get("stProgNo", {})
-                un_short = st_prog_no.get("unShort", {})
-                ui_set = data.get("uiSet", {}).get("uiBit", {})
-
-                # Video codec mapping
-                video_codec = ui_set.get("VideoCodec", 1)
-                video_type_map = {1: "MPEG2", 2: "H264", 3: "HEVC"}
-                video_type = video_type_map.get(video_codec, "MPEG2")
-
-                # Audio array
-                audio_array = []
-                for aud in data.get("AudioArray", []):
-                    lang_code = aud.get("Lang", 0)
-                    lang_map = {83: "spa", 69: "eng", 80: "por", 0: "und"}
-                    lang_str = lang_map.get(lang_code, "und")
-
-                    codec = aud.get("Codec", 0)
-                    audio_type_map = {0: "MPEG", 1: "AAC", 2: "AC3"}
-                    audio_type = audio_type_map.get(codec, "MPEG")
-
-                    audio_array.append({
-                        "PID": aud.get("PID", 0),
-                        "Type": audio_type,
-                        "Lang": lang_str,
-                        "DolbyAC3": 1 if codec == 2 else 0
-                    })
-
-                ch = {
-                    "dataPidSid": None,
-                    "Type": "ch",
-                    "TVType": "TV",
-                    "Index": idx,
-                    "TPIndex": un_short.get("sHi16", 0),
-                    "SID": str(un_short.get("sLo16", 0)),
-                    "Name": data.get("ServiceName", f"Canal {idx}"),
-                    "VideoPID": data.get("VideoPID", 0),
-                    "PcrPID": data.get("PCRPID", 0),
-                    "PmtPID": data.get("PMTPID", 0),
-                    "TTXPID": data.get("TTXPID", 8191),
-                    "Provider": "",
-                    "CA": 2 if ui_set.get("CA", 0) else 0,
-                    "Lock": ui_set.get("Lock", 0),
-                    "Skip": ui_set.get("Skip", 0),
-                    "Hide": ui_set.get("Hide", 0),
-                    "VideoType": video_type,
-                    "t2miPg": data.get("t2mi_pg", 0),
-                    "t2miPlpId": data.get("t2mi_plp_id", 0),
-                    "t2miPayloadPid": data.get("t2mi_payload_pid", 8191),
-                    "Audio": audio_array if audio_array else [{"PID": 0, "Type": "MPEG", "Lang": "und", "DolbyAC3": 0}],
-                    "Sub": [],
-                    "sattv": None,
-                    "data_pid": None,
-                    "PvtPID": None,
-                    "CaSystemIdList": None
-                }
-                channels.append((idx, ch))
-
-            elif "fav_list_object_" in key:
-                idx = int(key.split("_")[-1])
-                data = obj[key]
-                # Get fav name
-                fav_name = f"Lista {idx}"
-                if self.fav_names_obj_index != -1:
-                    names = self.all_data_objects[self.fav_names_obj_index].get("fav_list_info_in_box_object", {}).get("aucFavReName", [])
-                    if idx < len(names) and names[idx].strip():
-                        fav_name = names[idx]
-
-                # Store stProgNo for later processing
-                fav = {
-                    "Type": "fav",
-                    "Index": idx,
-                    "Name": fav_name,
-                    "TVChs": [],
-                    "RadioChs": [],
-                    "_stProgNo": data.get("stProgNo", [])  # Temporary, will be processed later
-                }
-                favorites.append((idx, fav))
-
-        # Ordenar por índice
-        satellites.sort(key=lambda x: x[0])
-        transponders.sort(key=lambda x: x[0])
-        channels.sort(key=lambda x: x[0])
-        favorites.sort(key=lambda x: x[0])
-
-        # Crear mapa de (SID, TPIndex) -> channel Index
-        sid_tp_to_channel_idx = {}
-        for ch_idx, ch in channels:
-            sid = int(ch["SID"])
-            tp_idx = ch["TPIndex"]
-            key = (sid, tp_idx)
-            if key not in sid_tp_to_channel_idx:
-                sid_tp_to_channel_idx[key] = ch_idx
-
-        # Procesar favoritos para añadir índices de canales
-        for _, fav in favorites:
-            st_prog_no = fav.pop("_stProgNo", [])
-            for prog in st_prog_no:
-                un_short = prog.get("unShort", {})
-                sid = un_short.get("sLo16", 0)
-                tp_idx = un_short.get("sHi16", 0)
-                ch_idx = sid_tp_to_channel_idx.get((sid, tp_idx))
-                if ch_idx is not None:
-                    fav["TVChs"].append(ch_idx)
-
-        # Crear objeto index
-        index_obj = {
-            "Type": "index",
-            "Ver": 1,
-            "Sat": len(satellites),
-            "TP": len(transponders),
-            "ChTV": len(channels),
-            "CHRadio": 0,
-            "FAV": len(favorites)
-        }
-        chl_objects.append(index_obj)
-
-        # Añadir favoritos
-        for _, fav in favorites:
-            chl_objects.append(fav)
-
-        # Añadir satélites
-        for _, sat in satellites:
-            chl_objects.append(sat)
+    def _check_before_save(self):
+        """
+        Recalcula los FavBit y comprueba la integridad antes de guardar.
 
-        # Añadir transponders
-        for _, tp in transponders:
-            chl_objects.append(tp)
-
-        # Añadir canales
-        for _, ch in channels:
-            chl_objects.append(ch)
+        Devuelve False si hay errores y el usuario decide no guardar.
+        """
+        self._update_all_favbits()
+        from channel_validation import validate_sdx
+        with self.profiler.phase("validar", unit="problemas") as phase:
+            report = validate_sdx(self.data.all_data_objects)
+            phase.count = len(report.issues)
+        self._profile_done("Validar")
+        if not report.errors:
+            return True
+        return self._show_validation(report, "Problemas antes de guardar", ask_save=True)
+
+    def _show_validation(self, report, title, ask_save=False):
+        """
+        Muestra el informe de integridad si tiene problemas.
+
+        Con ask_save pregunta si guardar de todos modos y devuelve la
+        respuesta; sin él devuelve True.
+        """
+        if report is None or report.ok:
+            return True
+
+        from channel_validation import (DUPLICATE_PROGRAM, ERRORS, FAV_BIT_MISMATCH, FAV_COUNT_MISMATCH,
+                                        FAV_MISSING_PROGRAM, MISSING_SATELLITE, MISSING_TRANSPONDER)
+        # Títulos del informe por tipo de problema
+        titles = {
+            FAV_MISSING_PROGRAM: "Favoritos que apuntan a canales inexistentes",
+            MISSING_TRANSPONDER: "Canales en transponders inexistentes",
+            MISSING_SATELLITE: "Transponders en satélites inexistentes",
+            FAV_BIT_MISMATCH: "FavBit desincronizado (se corrige al guardar)",
+            DUPLICATE_PROGRAM: "Canales con SID y transponder repetidos",
+            FAV_COUNT_MISMATCH: "Listas con número de canales incorrecto",
+        }
 
-        return chl_objects
+        win = tk.Toplevel(self.root)
+        win.title(title)
+        win.geometry("760x420")
+        win.transient(self.root)
+        counts = report.counts()
+        lines = [f"{titles.get(kind, kind)}: {count}"
+                 + (" (error)" if kind in ERRORS else "") for kind, count in counts.items()]
+        tk.Label(win, justify=tk.LEFT, anchor="w", text="\n".join(lines)).pack(fill=tk.X, padx=10, pady=10)
+
+        text_f = tk.Frame(win)
+        text_f.pack(fill=tk.BOTH, expand=True, padx=10)
+        text = tk.Text(text_f, wrap="none", height=12)
+        sb = ttk.Scrollbar(text_f, command=text.yview)
+        text.config(yscrollcommand=sb.set)
+        sb.pack(side=tk.RIGHT, fill=tk.Y)
+        text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        shown = report.issues[:VALIDATION_SHOWN]
+        text.insert("1.0", "\n".join(f"[{kind}] {message}" for kind, _, message in shown))
+        if len(report.issues) > len(shown):
+            text.insert(tk.END, f"\n... y {len(report.issues) - len(shown)} más")
+        text.config(state=tk.DISABLED)
+
+        answer = {"save": not ask_save}
+        btn_f = tk.Frame(win)
+        btn_f.pack(fill=tk.X, padx=10, pady=10)
+        if ask_save:
+            def save_anyway():
+                answer["save"] = True
+                win.destroy()
+            tk.Button(btn_f, text="Guardar de todos modos", command=save_anyway).pack(side=tk.RIGHT, padx=5)
+            tk.Button(btn_f, text="Cancelar", command=win.destroy).pack(side=tk.RIGHT)
+            win.grab_set()
+            self.root.wait_window(win)
+        else:
+            tk.Button(btn_f, text="Cerrar", command=win.destroy).pack(side=tk.RIGHT)
+        return answer["save"]
+
+    def _profile_done(self, operation):
+        """Cierra la operación medida y la muestra en la barra de estado (modo --profile)."""
+        summary = self.profiler.finish(operation)
+        if summary and self.profile_var is not None:
+            self.profile_var.set(summary)
+
+    def _model_size(self):
+        """Tamaño de los datos cargados, para el registro de manejadores lentos."""
+        text = f"{len(self.data.program_list)} canales"
+        if self.fav_tree_tab is not None and self.fav_tree_tab in self.data.fav_models:
+            text += f", lista {self.fav_tree_tab}: {len(self.data.fav_models[self.fav_tree_tab])} canales"
+        return text
+
+    def show_latency(self):
+        """Ventana de diagnóstico con la latencia de cada manejador de eventos."""
+        monitor = self.latency
+        win = tk.Toplevel(self.root)
+        win.title("Latencia de la interfaz")
+        win.geometry("900x500")
+        tk.Label(win, anchor="w", text=f"Llamadas de más de {monitor.threshold * 1000:.0f} ms "
+                 "se registran como lentas. Tiempos en ms.").pack(fill=tk.X, padx=10, pady=(10, 0))
+
+        columns = ("manejador", "llamadas", "media", "p95", "max", "total")
+        tree = ttk.Treeview(win, columns=columns, show="headings", height=12)
+        for col, text, width in zip(columns, ("Manejador", "Llamadas", "Media", "p95", "Máx", "Total"),
+                                    (420, 70, 70, 70, 70, 80)):
+            tree.heading(col, text=text)
+            tree.column(col, width=width, anchor="w" if col == "manejador" else "e")
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        tk.Label(win, text="Últimas llamadas lentas:", anchor="w").pack(fill=tk.X, padx=10)
+        slow_list = tk.Listbox(win, height=6)
+        slow_list.pack(fill=tk.X, padx=10)
+
+        def refresh():
+            tree.delete(*tree.get_children())
+            for name, calls, mean, p95, worst, total in monitor.rows():
+                tree.insert("", "end", values=(name, calls, f"{mean * 1000:.1f}", f"{p95 * 1000:.1f}",
+                                               f"{worst * 1000:.1f}", f"{total * 1000:.0f}"))
+            slow_list.delete(0, tk.END)
+            for name, seconds, size in reversed(monitor.slow):
+                slow_list.insert(tk.END, f"{seconds * 1000:.0f} ms  {name}  ({size})")
+
+        def reset():
+            monitor.reset()
+            refresh()
+
+        btn_f = tk.Frame(win)
+        btn_f.pack(fill=tk.X, padx=10, pady=10)
+        tk.Button(btn_f, text="Actualizar", command=refresh).pack(side=tk.LEFT)
+        tk.Button(btn_f, text="Reiniciar", command=reset).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_f, text="Cerrar", command=win.destroy).pack(side=tk.RIGHT)
+        refresh()
+
+    def save_profile(self):
+        """Guarda los tiempos, estadísticas de cProfile y memoria para adjuntar a una incidencia."""
+        path = filedialog.asksaveasfilename(defaultextension=".txt", initialfile="perfil_editor.txt",
+                                            filetypes=[("Texto", "*.txt"), ("All Files", "*.*")])
+        if not path:
+            return
+        try:
+            written = self.profiler.dump(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"No se pudo guardar el perfil: {e}")
+            return
+        messagebox.showinfo("Perfil guardado", "\n".join(written))
 
 if __name__ == "__main__":
+    # Uso: editor_canales.py [--startup-profile] [--profile] [archivo.sdx|archivo.chl]
+    args = sys.argv[1:]
+    profile = StartupProfile("--startup-profile" in args
+                             or bool(os.environ.get("EDITOR_CANALES_STARTUP_PROFILE")))
+    profiler = PhaseProfiler.from_environment(args)
+    # Los manejadores se envuelven al registrarse: instalar antes de crear la ventana
+    latency = None
+    if profiler.enabled:
+        from latency import LatencyMonitor
+        latency = LatencyMonitor.from_environment()
+        latency.install()
+    paths = [arg for arg in args if not arg.startswith("--")]
+    profile.mark("imports")
+
     root = tk.Tk()
+    profile.mark("tk.Tk()")
     style = ttk.Style()
     if 'clam' in style.theme_names(): 
         style.theme_use('clam')
@@ -1684,5 +1747,13 @@ if __name__ == "__main__":
     # Configurar estilo de las pestañas
     style.configure('TNotebook.Tab', padding=[6, 4])
     
-    app = SDXEditorApp(root)
+    app = SDXEditorApp(root, paths[0] if paths else None, profile, profiler, latency)
+    profile.mark("interfaz")
+
+    def first_frame():
+        root.update_idletasks()
+        profile.mark("primer frame")
+        profile.report()
+
+    root.after_idle(first_frame)
     root.mainloop()
@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+"""
+KingOfSat Module
+
+Parsing of KingOfSat package pages. The page is scanned once by a single
+compiled tokenizer that only recognises the markup we need; a small state
+machine on top of it tracks the current transponder and the channel row
+being read. Parsing is linear in the size of the page and can be fed
+incrementally while the page downloads (see stream_kingofsat_channels).
+"""
+
+import os
+import re
+import threading
+import time
+
+# One alternation, one pass. Tag tokens end with ">" and text tokens are
+# always followed by a "<", so any token that ends before the last ">" in
+# the buffer is complete; that is what makes incremental feeding safe (see
+# KingOfSatParser.feed). Text tokens are only tried right after a tag,
+# which keeps the scan fast. Only one named group matches per token, so
+# match.lastgroup identifies it.
+_TOKENS = re.compile(r'''
+    (?P<row><(?i:tr)\b[^>]*\bdata-channel-id=[^>]*>)
+  | (?P<row_end></(?i:tr)\s*>)
+  | \bclass="pos"[^>]*>\s*(?P<pos>\d{1,3}(?:\.\d)?\s*(?:&deg;|&\#176;|°)?\s*[EW])\s*</(?i:td)>
+  | \bclass="bld"[^>]*>\s*(?:
+        (?P<freq>\d{5}\.\d{2})
+      | (?P<pol>[HVLR])
+      | (?P<sr>\d{4,5})(?:\s+\d+/\d+)?
+    )\s*</(?i:td|a)>
+  | \bclass="A3"[^>]*>(?P<name>[^<]+)</(?i:a)>
+  | <(?i:td)\b[^>]*\bclass="s"[^>]*>(?P<sid>\d+)</(?i:td)>
+  | (?<=>)\s*(?P<video>(?:MPEG-?[24]|H\.?26[45]|HEVC|AVC)\b(?:\s*/?\s*(?:SD|HD|UHD|4K)\b)?)
+  | (?<=>)\s*(?P<ca>(?:Nagravision|Viaccess|Conax|Irdeto|Mediaguard|Seca|Videoguard|NDS|Cryptoworks
+               |PowerVu|Betacrypt|Verimatrix|DRE-?Crypt|BISS|Tandberg|Codicrypt|Digicipher
+               |Latens|Fairplay)\b(?:[ \t]*\d\b)?)
+''', re.VERBOSE)
+
+_POSITION_DEGREES = re.compile(r'\d{1,3}(?:\.\d)?')
+
+# Longest token we expect; unmatched text older than this is dropped from
+# the incremental buffer
+_MAX_TOKEN = 1024
+
+# Characters fed to the parser at a time by iter_kingofsat_channels, and
+# bytes read from the network at a time by stream_kingofsat_channels
+FEED_CHUNK = 64 * 1024
+
+# Bumped whenever the parser extracts different data, so cached channel
+# lists parsed by an older version are re-parsed from the stored page
+PARSER_VERSION = 3
+
+# When set, stream_kingofsat_channels saves the raw page to this path
+DEBUG_DUMP_ENV = "KINGOFSAT_DEBUG_HTML"
+
+# Concurrent downloads and minimum seconds between requests to one host
+MAX_WORKERS = 4
+MIN_REQUEST_INTERVAL = 0.1
+
+# Files picked up by find_kingofsat_pages
+PAGE_EXTENSIONS = ('.html', '.htm')
+
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+_MAX_REDIRECTS = 5
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+
+def _clean_name(raw):
+    name = raw.strip()
+    if '&' in name:
+        import html
+        name = html.unescape(name)
+    return name
+
+
+def parse_position(text):
+    """
+    Convert an orbital position such as "19.2°E" to tenths of a degree.
+
+    East is positive and west negative, so "30.0°W" is -300.
+    """
+    tenths = round(float(_POSITION_DEGREES.match(text).group()) * 10)
+    return -tenths if text.rstrip().endswith('W') else tenths
+
+
+def _video_format(text):
+    """Normalise a video format such as "MPEG-4/HD" to "MPEG-4 HD"."""
+    return ' '.join(text.replace('/', ' ').split())
+
+
+class KingOfSatParser:
+    """
+    Incremental single-pass parser for KingOfSat HTML.
+
+    Recognised markup, in transponder header rows:
+        - <td class="pos">19.2&deg;E</td>: orbital position
+        - <td class="bld">10758.50</td>: frequency in MHz, starts a new
+          transponder block
+        - <td class="bld">V</td>: polarisation (H, V, L or R)
+        - <td class="bld">22000</td> or <a class="bld">22000 2/3</a>:
+          symbol rate in kS/s
+
+    and in channel rows, <tr data-channel-id="..."> ... </tr>:
+        - <a class="A3">Name</a> and <td class="s">SID</td>
+        - a video format such as "MPEG-4/HD" or "HEVC/UHD"
+        - the names of CA systems (Nagravision 3, Viaccess, Conax...)
+
+    Each channel is a dict with name, sid, freq (integer MHz, as before),
+    freq_exact, pol, sr, position (tenths of a degree, east positive, or
+    None), video, hd and ca (list of CA system names; empty if free).
+    Missing transponder details are '' or 0.
+
+    Feed it text with feed(), call close() at the end, and collect the
+    channels completed so far with pop_channels(). Channels with the same
+    name and SID are emitted once.
+    """
+
+    def __init__(self):
+        self.current_freq = 0
+        self.current_position = None
+        self._transponder = self._new_transponder(0.0)
+        self._buffer = ''
+        self._start = 0
+        self._channels = []
+        self._seen = set()
+        self._row = None
+
+    def _new_transponder(self, freq_exact):
+        return {'freq': int(freq_exact), 'freq_exact': freq_exact, 'pol': '', 'sr': 0,
+                'position': self.current_position}
+
+    def feed(self, text):
+        """
+        Parse the next piece of the page.
+
+        Only tokens that end before the last ">" seen are consumed; the rest
+        is kept until more text arrives, along with the character before it
+        so that text tokens right after a tag still see its ">".
+        """
+        buffer = self._buffer + text
+        safe_end = buffer.rfind('>') + 1
+        last_end = self._scan(buffer, self._start, safe_end)
+        keep = max(last_end, safe_end - _MAX_TOKEN, 0)
+        self._start = min(keep, 1)
+        self._buffer = buffer[keep - self._start:]
+
+    def close(self):
+        """Parse whatever is left in the buffer."""
+        self._scan(self._buffer, self._start, len(self._buffer))
+        self._buffer = ''
+        self._start = 0
+
+    def pop_channels(self):
+        """
+        Return the channels completed since the previous call.
+
+        Returns:
+            list: Channel dictionaries (see the class docstring)
+        """
+        channels = self._channels
+        self._channels = []
+        return channels
+
+    def _scan(self, buffer, start, end):
+        last_end = start
+        for match in _TOKENS.finditer(buffer, start, end):
+            last_end = match.end()
+            kind = match.lastgroup
+            row = self._row
+            if kind == 'freq':
+                self._transponder = self._new_transponder(float(match.group('freq')))
+                self.current_freq = self._transponder['freq']
+            elif kind == 'pol':
+                self._transponder['pol'] = match.group('pol')
+            elif kind == 'sr':
+                self._transponder['sr'] = int(match.group('sr'))
+            elif kind == 'pos':
+                self.current_position = parse_position(match.group('pos'))
+                self._transponder['position'] = self.current_position
+            elif kind == 'row':
+                if row is None:
+                    self._row = dict(self._transponder, name=None, sid=None, video='', ca=[])
+            elif row is None:
+                continue
+            elif kind == 'name':
+                if row['name'] is None:
+                    row['name'] = _clean_name(match.group('name')) or None
+            elif kind == 'sid':
+                if row['sid'] is None:
+                    row['sid'] = int(match.group('sid'))
+            elif kind == 'video':
+                if not row['video']:
+                    row['video'] = _video_format(match.group('video'))
+            elif kind == 'ca':
+                system = ' '.join(match.group('ca').split())
+                if system not in row['ca']:
+                    row['ca'].append(system)
+            elif kind == 'row_end':
+                self._row = None
+                self._emit(row)
+        return last_end
+
+    def _emit(self, row):
+        if row['name'] and row['sid']:
+            key = (row['name'], row['sid'])
+            if key not in self._seen:
+                self._seen.add(key)
+                row['hd'] = row['video'].endswith(('HD', '4K'))
+                self._channels.append(row)
+
+
+def iter_kingofsat_channels(html_content):
+    """
+    Parse KingOfSat HTML lazily, yielding channels as they are found.
+
+    Args:
+        html_content (str): HTML content from KingOfSat
+
+    Yields:
+        dict: Channel with name, sid and freq
+    """
+    parser = KingOfSatParser()
+    for start in range(0, len(html_content), FEED_CHUNK):
+        parser.feed(html_content[start:start + FEED_CHUNK])
+        yield from parser.pop_channels()
+    parser.close()
+    yield from parser.pop_channels()
+
+
+def parse_kingofsat_html(html_content):
+    """
+    Parse KingOfSat HTML to extract channel information.
+
+    Args:
+        html_content (str): HTML content from KingOfSat
+
+    Returns:
+        list: Unique channel dictionaries with name, sid and freq
+    """
+    return list(iter_kingofsat_channels(html_content))
+
+
+class HostRateLimiter:
+    """
+    Space out requests to the same host.
+
+    wait(host) blocks until at least min_interval seconds have passed since
+    the previous request slot handed out for that host. Safe to share between
+    threads; different hosts never wait for each other.
+    """
+
+    def __init__(self, min_interval=MIN_REQUEST_INTERVAL):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# Keep-alive connections, one per (scheme, host) and thread. A worker thread
+# that fetches several pages from the same host reuses its socket.
+_local = threading.local()
+
+
+def _connection(scheme, netloc, timeout):
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get((scheme, netloc))
+    if conn is None:
+        import http.client
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        conn = connections[(scheme, netloc)] = cls(netloc, timeout=timeout)
+    else:
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+    return conn
+
+
+def _drop_connection(scheme, netloc):
+    conn = getattr(_local, 'connections', {}).pop((scheme, netloc), None)
+    if conn is not None:
+        conn.close()
+
+
+def open_page(url, timeout=30, rate_limiter=None, headers=None):
+    """
+    Send a GET request over this thread's keep-alive connection to the host.
+
+    Redirects are followed. A connection the server closed while idle is
+    reopened once.
+
+    Args:
+        url (str): http or https URL
+        timeout (float): Socket timeout in seconds
+        rate_limiter (HostRateLimiter): Applied before every request
+        headers (dict): Extra request headers, e.g. for conditional requests
+
+    Returns:
+        tuple: (http.client.HTTPResponse, scheme, netloc); the response must
+            be read to the end before the connection can be reused
+
+    Raises:
+        urllib.error.URLError: On network errors and HTTP error statuses
+    """
+    import http.client
+    from urllib.error import HTTPError, URLError
+    from urllib.parse import urljoin, urlsplit
+
+    request_headers = dict(REQUEST_HEADERS, **headers) if headers else REQUEST_HEADERS
+    for _ in range(_MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.netloc:
+            raise URLError(f"unsupported URL: {url}")
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        if rate_limiter is not None:
+            rate_limiter.wait(parts.netloc)
+        for attempt in (1, 2):
+            conn = _connection(parts.scheme, parts.netloc, timeout)
+            try:
+                conn.request('GET', path, headers=request_headers)
+                response = conn.getresponse()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                _drop_connection(parts.scheme, parts.netloc)
+                if attempt == 2:
+                    raise e if isinstance(e, URLError) else URLError(e) from e
+
+        location = response.getheader('Location')
+        if response.status in _REDIRECT_CODES and location:
+            response.read()
+            url = urljoin(url, location)
+            continue
+        if response.status >= 400:
+            _drop_connection(parts.scheme, parts.netloc)
+            raise HTTPError(url, response.status, response.reason, response.headers, None)
+        return response, parts.scheme, parts.netloc
+    raise URLError(f"too many redirects: {url}")
+
+
+def debug_dump_path(debug_path=None):
+    """Return debug_path, or the KINGOFSAT_DEBUG_HTML path when it is None."""
+    if debug_path is None:
+        debug_path = os.environ.get(DEBUG_DUMP_ENV) or None
+    return debug_path
+
+
+def read_kingofsat_response(response, scheme, netloc, progress=None, sinks=(),
+                            chunk_size=FEED_CHUNK):
+    """
+    Parse an open page response while it is being received.
+
+    Each network read is decoded and fed to a KingOfSatParser straight away,
+    so the first channels are available long before the download finishes.
+
+    Args:
+        response: Response returned by open_page
+        scheme (str), netloc (str): As returned by open_page; the connection
+            is dropped if the response is not read to the end
+        progress (callable): progress(received_bytes, total_bytes) after every
+            read; total_bytes is 0 when the server sends no Content-Length
+        sinks (iterable): Binary files that receive a copy of the raw page
+        chunk_size (int): Maximum bytes per read
+
+    Yields:
+        list: Channels completed by each read (never empty)
+
+    Raises:
+        urllib.error.URLError: If the connection fails mid-page
+    """
+    import codecs
+    import http.client
+    from urllib.error import URLError
+
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    parser = KingOfSatParser()
+    received = 0
+    complete = False
+    try:
+        total = int(response.getheader('Content-Length') or 0)
+        while True:
+            # read1 returns whatever has arrived instead of waiting for
+            # a full chunk, which keeps parsing in step with the network
+            try:
+                data = response.read1(chunk_size)
+            except (http.client.HTTPException, OSError) as e:
+                raise URLError(e) from e
+            if not data:
+                # read1 stops at Content-Length without releasing the
+                # response; read() marks it closed so the connection is reused
+                response.read()
+                break
+            received += len(data)
+            for sink in sinks:
+                sink.write(data)
+            parser.feed(decoder.decode(data))
+            if progress:
+                progress(received, total)
+            channels = parser.pop_channels()
+            if channels:
+                yield channels
+        complete = True
+        parser.feed(decoder.decode(b'', final=True))
+        parser.close()
+        channels = parser.pop_channels()
+        if channels:
+            yield channels
+    finally:
+        if not complete:
+            # Half-read responses leave the connection unusable
+            _drop_connection(scheme, netloc)
+
+
+def stream_kingofsat_channels(url, progress=None, debug_path=None, timeout=30,
+                              chunk_size=FEED_CHUNK, rate_limiter=None):
+    """
+    Download a KingOfSat page and parse it while it arrives.
+
+    Args:
+        url (str): Page URL
+        progress (callable): progress(received_bytes, total_bytes) after every
+            read; total_bytes is 0 when the server sends no Content-Length
+        debug_path (str): Save the raw page here. Defaults to the path in the
+            KINGOFSAT_DEBUG_HTML environment variable; no copy is kept if unset
+        timeout (float): Socket timeout in seconds
+        chunk_size (int): Maximum bytes per read
+        rate_limiter (HostRateLimiter): Shared limiter for concurrent fetches
+
+    Yields:
+        list: Channels completed by each read (never empty)
+
+    Raises:
+        urllib.error.URLError: If the page cannot be fetched
+    """
+    debug_path = debug_dump_path(debug_path)
+    response, scheme, netloc = open_page(url, timeout, rate_limiter)
+    if not debug_path:
+        yield from read_kingofsat_response(response, scheme, netloc, progress, (), chunk_size)
+        return
+    with open(debug_path, 'wb') as dump:
+        yield from read_kingofsat_response(response, scheme, netloc, progress, (dump,), chunk_size)
+
+
+def merge_kingofsat_channels(channel_lists):
+    """
+    Merge channels from several packages, keeping the first of each (sid, freq).
+
+    Args:
+        channel_lists (iterable): Channel lists in package order
+
+    Returns:
+        list: Merged channels
+    """
+    seen = set()
+    merged = []
+    for channels in channel_lists:
+        for ch in channels:
+            key = (ch['sid'], ch['freq'])
+            if key not in seen:
+                seen.add(key)
+                merged.append(ch)
+    return merged
+
+
+def fetch_kingofsat_packages(urls, on_channels=None, progress=None, max_workers=MAX_WORKERS,
+                             min_interval=MIN_REQUEST_INTERVAL, timeout=30, cache=None):
+    """
+    Download and parse several KingOfSat pages concurrently.
+
+    Pages are fetched by a small thread pool; each worker keeps one
+    keep-alive connection per host and requests to a host are spaced by
+    min_interval, so the wall time is close to that of the slowest page.
+
+    Args:
+        urls (list): Page URLs, in the order their channels should be merged
+        on_channels (callable): on_channels(url, channels) for every parsed
+            batch, called from the worker threads
+        progress (callable): progress(url, received_bytes, total_bytes),
+            called from the worker threads
+        max_workers (int): Maximum concurrent downloads (and connections)
+        min_interval (float): Minimum seconds between requests to one host
+        timeout (float): Socket timeout in seconds
+        cache (KingOfSatCache): Serve and store pages through this on-disk
+            cache (see kingofsat_cache)
+
+    Returns:
+        tuple: (merged channels deduplicated by (sid, freq), {url: error}
+            for the pages that could not be fetched)
+
+    Raises:
+        Exception: Anything raised by the callbacks, after the other
+            downloads have stopped
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    rate_limiter = HostRateLimiter(min_interval)
+    stream = cache.stream if cache is not None else stream_kingofsat_channels
+
+    def fetch(url):
+        page_progress = (lambda received, total: progress(url, received, total)) if progress else None
+        channels = []
+        for batch in stream(url, progress=page_progress, timeout=timeout, rate_limiter=rate_limiter):
+            channels.extend(batch)
+            if on_channels:
+                on_channels(url, batch)
+        return channels
+
+    results = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as pool:
+        futures = [(url, pool.submit(fetch, url)) for url in urls]
+        for url, future in futures:
+            try:
+                results[url] = future.result()
+            except OSError as e:
+                errors[url] = e
+    return merge_kingofsat_channels(results[url] for url in urls if url in results), errors
+
+
+def find_kingofsat_pages(directory):
+    """Return the saved pages (.html / .htm) in directory, sorted by name."""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(PAGE_EXTENSIONS)
+                  and os.path.isfile(os.path.join(directory, name)))
+
+
+def parse_kingofsat_file(path):
+    """Parse a KingOfSat page saved to disk."""
+    with open(path, encoding='utf-8', errors='replace') as f:
+        return parse_kingofsat_html(f.read())
+
+
+def parse_kingofsat_files(paths, max_workers=None):
+    """
+    Parse saved KingOfSat pages in a process pool.
+
+    Parsing is CPU-bound, so with more than one page every page goes to its
+    own worker process instead of a thread.
+
+    Args:
+        paths (list): Page files, in the order their channels should be merged
+        max_workers (int): Worker processes, os.cpu_count() if None
+
+    Returns:
+        tuple: (merged channels deduplicated by (sid, freq), {path: error}
+            for the files that could not be read)
+    """
+    results = {}
+    errors = {}
+    if len(paths) == 1:
+        try:
+            results[paths[0]] = parse_kingofsat_file(paths[0])
+        except OSError as e:
+            errors[paths[0]] = e
+    elif paths:
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = max(1, min(max_workers or os.cpu_count() or 1, len(paths)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(path, pool.submit(parse_kingofsat_file, path)) for path in paths]
+            for path, future in futures:
+                try:
+                    results[path] = future.result()
+                except OSError as e:
+                    errors[path] = e
+    return merge_kingofsat_channels(results[path] for path in paths if path in results), errors
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+KingOfSat Cache Module
+
+On-disk HTTP cache for KingOfSat package pages. Every entry keeps the raw
+page next to the channel list parsed from it, so a cache hit needs neither
+the network nor the parser. Entries are fresh for a TTL; stale entries are
+revalidated with If-None-Match / If-Modified-Since and a 304 answer reuses
+the stored channels. The cache is capped in size and evicts the least
+recently used pages first.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+
+import kingofsat
+
+# Overrides the cache location
+CACHE_DIR_ENV = "KINGOFSAT_CACHE_DIR"
+
+# Package pages change rarely; a day-old list is still good enough
+DEFAULT_TTL = 12 * 3600
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def default_cache_dir():
+    """Return $KINGOFSAT_CACHE_DIR or the per-user cache directory."""
+    path = os.environ.get(CACHE_DIR_ENV)
+    if path:
+        return path
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "editor_canales_sat", "kingofsat")
+
+
+class KingOfSatCache:
+    """
+    Page cache with TTL, conditional revalidation and size-capped LRU.
+
+    stream() is a drop-in replacement for kingofsat.stream_kingofsat_channels
+    and can be passed to kingofsat.fetch_kingofsat_packages as cache. Each
+    entry is two files named after the SHA-1 of the URL: <key>.html with the
+    page and <key>.json with the headers, timestamps and parsed channels. The
+    modification time of the .json file is the last access time.
+    """
+
+    def __init__(self, directory=None, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES,
+                 offline=False):
+        """
+        Args:
+            directory (str): Cache directory, default_cache_dir() if None
+            ttl (float): Seconds an entry is served without revalidation
+            max_bytes (int): Total size above which old entries are evicted
+            offline (bool): Serve every page from the cache, however old,
+                and never touch the network
+        """
+        self.directory = directory or default_cache_dir()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        # url -> "hit", "revalidated" or "downloaded" for the last stream()
+        self.status = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + '.json', base + '.html'
+
+    def lookup(self, url):
+        """
+        Return the stored entry for url.
+
+        Returns:
+            dict or None: Entry with url, etag, last_modified, validated,
+                parser_version and channels
+        """
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url or not os.path.exists(body_path):
+            return None
+        return entry
+
+    def _write_entry(self, entry):
+        meta_path, _ = self._paths(entry['url'])
+        tmp_path = f"{meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    def _channels(self, entry):
+        if entry.get('parser_version') != kingofsat.PARSER_VERSION:
+            # Parsed by an older parser: parse the stored page again, offline
+            _, body_path = self._paths(entry['url'])
+            with open(body_path, encoding='utf-8', errors='replace') as f:
+                entry['channels'] = kingofsat.parse_kingofsat_html(f.read())
+            entry['parser_version'] = kingofsat.PARSER_VERSION
+            self._write_entry(entry)
+        return entry['channels']
+
+    def _serve(self, entry, status):
+        channels = self._channels(entry)
+        meta_path, _ = self._paths(entry['url'])
+        with contextlib.suppress(OSError):
+            os.utime(meta_path)
+        self.status[entry['url']] = status
+        return channels
+
+    def stream(self, url, progress=None, debug_path=None, timeout=30,
+               chunk_size=kingofsat.FEED_CHUNK, rate_limiter=None):
+        """
+        Yield the channels of a page from the cache or the network.
+
+        Same arguments and batches as kingofsat.stream_kingofsat_channels.
+        Downloaded pages are parsed while they arrive and stored once
+        complete; progress is only called for downloads.
+
+        Raises:
+            urllib.error.URLError: If the page cannot be fetched, or is not
+                cached in offline mode
+        """
+        from urllib.error import URLError
+
+        entry = self.lookup(url)
+        if entry is not None and (self.offline or time.time() - entry['validated'] < self.ttl):
+            channels = self._serve(entry, "hit")
+            if channels:
+                yield channels
+            return
+        if self.offline:
+            raise URLError(f"not cached (offline mode): {url}")
+
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        response, scheme, netloc = kingofsat.open_page(url, timeout, rate_limiter, headers)
+
+        if response.status == 304 and entry is not None:
+            response.read()
+            entry['validated'] = time.time()
+            entry['etag'] = response.getheader('ETag') or entry.get('etag')
+            entry['last_modified'] = response.getheader('Last-Modified') or entry.get('last_modified')
+            self._write_entry(entry)
+            channels = self._serve(entry, "revalidated")
+            if channels:
+                yield channels
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        _, body_path = self._paths(url)
+        tmp_path = f"{body_path}.{threading.get_ident()}.tmp"
+        debug_path = kingofsat.debug_dump_path(debug_path)
+        channels = []
+        try:
+            with open(tmp_path, 'wb') as body, \
+                    (open(debug_path, 'wb') if debug_path else contextlib.nullcontext()) as dump:
+                sinks = (body, dump) if dump else (body,)
+                for batch in kingofsat.read_kingofsat_response(response, scheme, netloc, progress,
+                                                               sinks, chunk_size):
+                    channels.extend(batch)
+                    yield batch
+            os.replace(tmp_path, body_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+        self._write_entry({
+            'url': url,
+            'etag': response.getheader('ETag'),
+            'last_modified': response.getheader('Last-Modified'),
+            'validated': time.time(),
+            'parser_version': kingofsat.PARSER_VERSION,
+            'channels': channels,
+        })
+        self.status[url] = "downloaded"
+        self.evict(keep=url)
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used entries until the cache fits max_bytes.
+
+        Args:
+            keep (str): URL whose entry is never evicted
+        """
+        keep_key = self._paths(keep)[0] if keep else None
+        with self._lock:
+            entries = {}
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return
+            for name in names:
+                base, ext = os.path.splitext(name)
+                if ext not in ('.json', '.html'):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                size, last_used = entries.get(base, (0, 0))
+                if ext == '.json':
+                    last_used = stat.st_mtime
+                entries[base] = (size + stat.st_size, last_used)
+
+            total = sum(size for size, _ in entries.values())
+            for base, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+                if total <= self.max_bytes:
+                    break
+                meta_path = os.path.join(self.directory, base + '.json')
+                if meta_path == keep_key:
+                    continue
+                for ext in ('.json', '.html'):
+                    with contextlib.suppress(OSError):
+                        os.remove(os.path.join(self.directory, base + ext))
+                total -= size
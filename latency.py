@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Latency Module
+
+Measures how long Tk event handlers block the event loop. Every callback Tk
+runs (bindings, button commands, variable traces and after jobs) goes
+through tkinter.CallWrapper; LatencyMonitor.install() swaps in a subclass
+that times each call:
+
+    monitor = LatencyMonitor(threshold=0.1, size=lambda: f"{len(programs)} programs")
+    monitor.install()
+    ... build widgets, run mainloop ...
+    for row in monitor.rows():
+        print(row)
+
+Each handler gets a latency histogram. Calls slower than the threshold are
+logged with the handler name and the model size reported by size(), and
+the last few are kept for a diagnostics view. Handler names come from the
+callback: bound methods by qualified name, lambdas by the method they call,
+after jobs by the function they schedule.
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Slow-handler threshold in milliseconds, overriding the default
+THRESHOLD_ENV = "EDITOR_CANALES_SLOW_MS"
+
+DEFAULT_THRESHOLD = 0.1
+# Upper bounds of the histogram buckets in seconds; a last bucket takes the rest
+BUCKETS = (0.001, 0.004, 0.016, 0.05, 0.1, 0.25, 1.0)
+SLOW_EVENTS = 100
+
+
+def handler_name(func):
+    """Readable name of a Tk callback."""
+    code = getattr(func, "__code__", None)
+    if code is not None and code.co_name == "callit" and "func" in code.co_freevars:
+        # Misc.after wraps the job in a closure named callit
+        inner = func.__closure__[code.co_freevars.index("func")].cell_contents
+        return "after " + handler_name(inner)
+    func = getattr(func, "__func__", func)
+    code = getattr(func, "__code__", None)
+    name = getattr(func, "__qualname__", None) or type(func).__name__
+    if code is not None and func.__name__ == "<lambda>":
+        # lambda e: self._on_drag_start(e, ...) is named after the method it calls
+        outer = name.rpartition(".<lambda>")[0].replace(".<locals>", "")
+        name = f"<lambda {code.co_names[0]}>" if code.co_names else "<lambda>"
+        if outer:
+            name = f"{outer}.{name}"
+    return name
+
+
+class HandlerStats:
+    """Call count, total and maximum time and latency histogram of one handler."""
+
+    __slots__ = ("name", "calls", "total", "max", "buckets")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, seconds):
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of calls (max for the last one)."""
+        wanted = fraction * self.calls
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+
+class LatencyMonitor:
+    """
+    Per-handler latency histograms of the Tk event loop.
+
+    Attributes:
+        threshold (float): Seconds above which a call is logged as slow
+        size (callable): Returns a description of the model size for the
+            slow-call log, or None
+        stats (dict): Handler name -> HandlerStats
+        slow (list): (name, seconds, size) of the last SLOW_EVENTS slow calls
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, size=None, out=None):
+        """
+        Args:
+            threshold (float): Slow-call threshold in seconds
+            size (callable): Model size description for the slow-call log
+            out (file): Where slow calls are logged, sys.stderr by default
+        """
+        self.threshold = threshold
+        self.size = size
+        self.out = out
+        self.stats = {}
+        self.slow = []
+        self._lock = threading.Lock()
+        self._installed = None
+
+    @classmethod
+    def from_environment(cls, size=None):
+        """Monitor with the threshold of THRESHOLD_ENV (milliseconds) if set."""
+        value = os.environ.get(THRESHOLD_ENV)
+        try:
+            threshold = float(value) / 1000 if value else DEFAULT_THRESHOLD
+        except ValueError:
+            threshold = DEFAULT_THRESHOLD
+        return cls(threshold, size)
+
+    def record(self, name, seconds):
+        """Add one call of a handler; log it if slower than the threshold."""
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = HandlerStats(name)
+            stats.add(seconds)
+        if seconds < self.threshold:
+            return
+        try:
+            size = self.size() if self.size else None
+        except Exception:
+            size = None
+        with self._lock:
+            self.slow.append((name, seconds, size))
+            del self.slow[:-SLOW_EVENTS]
+        message = f"slow handler: {name} {seconds * 1000:.0f} ms"
+        print(message + (f" ({size})" if size else ""), file=self.out or sys.stderr)
+
+    def wrap(self, func, name=None):
+        """Return func timed as a handler named name (handler_name(func) by default)."""
+        name = name or handler_name(func)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return timed
+
+    def rows(self):
+        """
+        Handler statistics, most total time first.
+
+        Returns:
+            list: (name, calls, mean_s, p95_s, max_s, total_s) tuples
+        """
+        with self._lock:
+            stats = sorted(self.stats.values(), key=lambda s: s.total, reverse=True)
+            return [(s.name, s.calls, s.total / s.calls, s.percentile(0.95), s.max, s.total)
+                    for s in stats]
+
+    def reset(self):
+        with self._lock:
+            self.stats = {}
+            self.slow = []
+
+    def install(self):
+        """
+        Time every Tk callback registered from now on.
+
+        Callbacks are wrapped when registered, so install before building
+        the widgets. Only one monitor can be installed at a time.
+        """
+        import tkinter
+
+        if self._installed is not None:
+            return
+        monitor = self
+        original = tkinter.CallWrapper
+
+        class MonitoredCallWrapper(original):
+            def __call__(self, *args):
+                start = time.perf_counter()
+                try:
+                    return original.__call__(self, *args)
+                finally:
+                    monitor.record(handler_name(self.func), time.perf_counter() - start)
+
+        tkinter.CallWrapper = MonitoredCallWrapper
+        self._installed = original
+
+    def uninstall(self):
+        """Stop timing callbacks registered from now on."""
+        import tkinter
+
+        if self._installed is not None:
+            tkinter.CallWrapper = self._installed
+            self._installed = None
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Profiling Module
+
+Opt-in instrumentation for reports of slow operations. A PhaseProfiler
+records the wall time and an item count of every named phase of an
+operation (read, decode, process, refresh...), from any thread, and keeps a
+short history of finished operations:
+
+    profiler = PhaseProfiler(enabled=True)
+    with profiler.phase("decode", unit="objects") as phase:
+        objects = decode(text)
+        phase.count = len(objects)
+    print(profiler.finish("Load SDX"))
+    profiler.dump("profile.txt")
+
+While enabled, the outermost phase of each thread also runs under
+cProfile, and tracemalloc traces every allocation. dump() writes the
+operation history, the cProfile statistics of all phases so far and the
+top allocation sites to a text file that can be attached to a ticket.
+
+A disabled profiler (the default) records nothing and costs one context
+manager per phase. cProfile, pstats and tracemalloc are only imported once
+a profiler is enabled, so the editor starts as fast without --profile.
+"""
+
+import contextlib
+import io
+import os
+import threading
+import time
+
+# Set to any non-empty value to enable the editor's profiling mode
+PROFILE_ENV = "EDITOR_CANALES_PROFILE"
+
+TOP_ENTRIES = 25
+HISTORY = 50
+
+
+class Phase:
+    """One timed phase: name, wall time in seconds and optional item count."""
+
+    __slots__ = ("name", "seconds", "count", "unit")
+
+    def __init__(self, name, count=None, unit=""):
+        self.name = name
+        self.seconds = 0.0
+        self.count = count
+        self.unit = unit
+
+    def __str__(self):
+        text = f"{self.name} {self.seconds:.3f} s"
+        if self.count is not None:
+            text += f" ({self.count} {self.unit})" if self.unit else f" ({self.count})"
+        return text
+
+
+class PhaseProfiler:
+    """
+    Per-phase timing, cProfile statistics and tracemalloc snapshots.
+
+    Attributes:
+        enabled (bool): Whether phases are recorded
+        history (list): (operation, seconds, phases) of the last HISTORY
+            finished operations, oldest first
+    """
+
+    def __init__(self, enabled=False, trace_memory=True):
+        """
+        Args:
+            enabled (bool): Record phases; a disabled profiler is a no-op
+            trace_memory (bool): Start tracemalloc while enabled
+        """
+        self.enabled = enabled
+        self.history = []
+        self._phases = []
+        self._stats = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if enabled and trace_memory:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    @classmethod
+    def from_environment(cls, argv=()):
+        """Profiler enabled by a --profile argument or the PROFILE_ENV variable."""
+        return cls("--profile" in argv or bool(os.environ.get(PROFILE_ENV)))
+
+    @contextlib.contextmanager
+    def phase(self, name, count=None, unit=""):
+        """
+        Time the block as a phase of the current operation.
+
+        Yields the Phase, whose count can be set inside the block once known.
+        Nested phases are recorded too; only the outermost one of a thread
+        runs under cProfile.
+        """
+        phase = Phase(name, count, unit)
+        if not self.enabled:
+            yield phase
+            return
+
+        import cProfile
+        import pstats
+
+        profile = None
+        if not getattr(self._local, "profiling", False):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active (another thread on Python 3.12+,
+                # or the whole program runs under cProfile): time only
+                profile = None
+            else:
+                self._local.profiling = True
+        start = time.perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.seconds = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                self._local.profiling = False
+            with self._lock:
+                self._phases.append(phase)
+                if profile is not None:
+                    if self._stats is None:
+                        self._stats = pstats.Stats(profile)
+                    else:
+                        self._stats.add(profile)
+
+    def finish(self, operation):
+        """
+        Close the current operation, made of the phases recorded since the
+        last finish().
+
+        Returns:
+            str or None: summary() of the operation, None when disabled
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            phases, self._phases = self._phases, []
+            total = sum(phase.seconds for phase in phases)
+            self.history.append((operation, total, phases))
+            del self.history[:-HISTORY]
+        return self.summary()
+
+    def summary(self):
+        """One line with the last finished operation and its phases ("" if none)."""
+        if not self.history:
+            return ""
+        operation, total, phases = self.history[-1]
+        return f"{operation}: {total:.3f} s" + "".join(f" · {phase}" for phase in phases)
+
+    def dump(self, path, top=TOP_ENTRIES):
+        """
+        Write the operation history, cProfile statistics and tracemalloc top
+        allocation sites to a text file.
+
+        The raw statistics are also saved next to it, with a .pstats
+        extension, for pstats or snakeviz.
+
+        Returns:
+            list: Paths written
+        """
+        import tracemalloc
+
+        out = io.StringIO()
+        out.write("== Operations (wall time, oldest first) ==\n")
+        with self._lock:
+            history = list(self.history)
+            stats = self._stats
+            if stats is not None:
+                stats_text = io.StringIO()
+                stats.stream = stats_text
+                stats.sort_stats("cumulative").print_stats(top)
+        for operation, total, phases in history:
+            out.write(f"{operation}: {total:.3f} s\n")
+            for phase in phases:
+                out.write(f"    {phase}\n")
+
+        out.write(f"\n== cProfile, top {top} by cumulative time ==\n")
+        out.write(stats_text.getvalue() if stats is not None else "no phases profiled\n")
+
+        out.write(f"\n== tracemalloc, top {top} allocation sites ==\n")
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            out.write(f"current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n")
+            for stat in tracemalloc.take_snapshot().statistics("lineno")[:top]:
+                out.write(f"{stat}\n")
+        else:
+            out.write("tracemalloc is not tracing\n")
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        written = [path]
+        if stats is not None:
+            stats_path = os.path.splitext(path)[0] + ".pstats"
+            with self._lock:
+                stats.dump_stats(stats_path)
+            written.append(stats_path)
+        return written
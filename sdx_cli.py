@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+SDX Command Line Module
+
+Headless entry point for batch work on channel lists, for machines without
+a display or without internet access:
+
+    python3 sdx_cli.py import-kingofsat PAGES_DIR [--sdx FILE ...] [--fav LIST ...]
+    python3 sdx_cli.py convert-chl INPUT.chl OUTPUT.sdx
+    python3 sdx_cli.py validate FILE.sdx ...
+    python3 sdx_cli.py diff OLD.sdx NEW.sdx
+    python3 sdx_cli.py merge OURS.sdx RESCANNED.sdx OUTPUT.sdx [--base BASE.sdx]
+
+import-kingofsat parses every KingOfSat page saved in PAGES_DIR in a
+process pool, merges them into one channel set deduplicated by (SID,
+frequency) and, when SDX files are given, writes the channels found in
+each file into the chosen favourite lists.
+
+convert-chl streams a CHL file into an SDX file in bounded memory (see
+ChannelDataProcessor.convert_chl_file), so very large lists can be
+converted on small machines.
+
+validate checks the integrity of SDX files in a process pool (see
+channel_validation) and exits with status 1 when any file has errors.
+
+diff compares two SDX files, pairing programs across a rescan that
+renumbered the transponders; merge carries the favourite lists of OURS
+over to RESCANNED and writes the result (see channel_diff).
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from channel_diff import diff_sdx, merge_sdx
+from channel_matching import AMBIGUOUS, RESOLVED, ProgramMatcher
+from channel_models import FavListDiff, fav_entry_key, make_fav_entry
+from channel_processor import ChannelDataProcessor
+from channel_validation import validate_sdx_files
+from kingofsat import find_kingofsat_pages, parse_kingofsat_files
+
+IMPORT_MODES = ("diff", "append", "overwrite")
+
+
+def load_sdx(path):
+    """Read and decode an SDX file into its list of objects."""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return ChannelDataProcessor.decode_objects(f.read())
+
+
+def save_sdx(path, all_data_objects):
+    """Write SDX objects to path, replacing it only once fully written."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for obj in all_data_objects:
+            f.write(json.dumps(obj, separators=(',', ':')))
+    os.replace(tmp_path, path)
+
+
+def resolve_fav_lists(all_data_objects, fav_lists_indices, fav_names_obj_index, wanted):
+    """
+    Map list numbers or names to favourite list indices.
+
+    Raises:
+        ValueError: If a list does not exist in the file
+    """
+    names = []
+    if fav_names_obj_index != -1:
+        names = all_data_objects[fav_names_obj_index]["fav_list_info_in_box_object"].get("aucFavReName", [])
+    by_name = {name.strip().casefold(): idx for idx, name in enumerate(names)
+               if idx in fav_lists_indices and name.strip()}
+    resolved = []
+    for item in wanted:
+        if item.isdigit() and int(item) in fav_lists_indices:
+            idx = int(item)
+        elif item.strip().casefold() in by_name:
+            idx = by_name[item.strip().casefold()]
+        else:
+            raise ValueError(f"no favourite list {item!r}")
+        if idx not in resolved:
+            resolved.append(idx)
+    return resolved
+
+
+def import_into_sdx(all_data_objects, channels, fav_lists, mode="diff", remove=True,
+                    reorder=True, ambiguous=False):
+    """
+    Write imported channels into favourite lists of decoded SDX data.
+
+    Channels are matched against the file's programs with ProgramMatcher;
+    only channels that exist in the file are written.
+
+    Args:
+        all_data_objects (list): SDX objects, updated in place
+        channels (list): Merged KingOfSat channels
+        fav_lists (list): Favourite list numbers or names
+        mode (str): "diff", "append" or "overwrite", as in the editor
+        remove (bool): In diff mode, drop entries that are not in the channels
+        reorder (bool): In diff mode, move entries to the channels' order
+        ambiguous (bool): Also import ambiguous channels (first candidate)
+
+    Returns:
+        tuple: ({status: count} of the matching, {list index: FavListDiff,
+            or number of entries written outside diff mode})
+
+    Raises:
+        ValueError: If a favourite list does not exist in the file
+    """
+    programs_dict, _, _, fav_lists_indices, fav_names_obj_index = \
+        ChannelDataProcessor.process_sdx_data(all_data_objects)
+    fav_ids = resolve_fav_lists(all_data_objects, fav_lists_indices, fav_names_obj_index, fav_lists)
+    matcher = ProgramMatcher(programs_dict.items(),
+                             ChannelDataProcessor.build_transponder_index(all_data_objects))
+
+    accepted = (RESOLVED, AMBIGUOUS) if ambiguous else (RESOLVED,)
+    counts = {}
+    new_entries = {}
+    for channel in channels:
+        status, keys, _ = matcher.match(channel)
+        counts[status] = counts.get(status, 0) + 1
+        if status in accepted:
+            un_short = programs_dict[keys[0]]['stProgNo'].get('unShort', {})
+            entry = make_fav_entry(un_short.get('sLo16', programs_dict[keys[0]]['sid']),
+                                   un_short.get('sHi16', 0))
+            new_entries.setdefault(entry["uiWord32"], entry)
+
+    changes = {}
+    for fav_idx in fav_ids:
+        fav_obj = all_data_objects[fav_lists_indices[fav_idx]][f"fav_list_object_{fav_idx}"]
+        current = fav_obj.get("stProgNo", [])
+        if mode == "diff":
+            diff = FavListDiff([fav_entry_key(entry) for entry in current], list(new_entries))
+            entries = [current[pos] if pos is not None else new_entries[key]
+                       for pos, key in diff.plan(remove, reorder)]
+            changes[fav_idx] = diff
+        elif mode == "overwrite":
+            entries = list(new_entries.values())
+            changes[fav_idx] = len(entries)
+        else:
+            entries = current + list(new_entries.values())
+            changes[fav_idx] = len(new_entries)
+        fav_obj["stProgNo"] = entries
+        fav_obj["sNoOfTVFavor"] = len(entries)
+
+    ChannelDataProcessor.update_fav_bits(all_data_objects)
+    return counts, changes
+
+
+def _describe_change(change, remove, reorder):
+    if isinstance(change, FavListDiff):
+        return (f"+{len(change.added)} -{len(change.removed) if remove else 0} "
+                f"~{len(change.moved) if reorder else 0} ={change.unchanged}")
+    return f"{change} entries written"
+
+
+def cmd_import_kingofsat(args):
+    try:
+        pages = find_kingofsat_pages(args.pages)
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if not pages:
+        print(f"error: no .html pages in {args.pages}", file=sys.stderr)
+        return 1
+
+    channels, errors = parse_kingofsat_files(pages, args.workers)
+    for path, error in errors.items():
+        print(f"warning: {path}: {error}", file=sys.stderr)
+    print(f"{len(channels)} channels from {len(pages) - len(errors)} of {len(pages)} pages")
+    if not channels:
+        return 1
+
+    if args.channels_json:
+        with open(args.channels_json, 'w', encoding='utf-8') as f:
+            json.dump(channels, f, ensure_ascii=False, indent=1)
+
+    status = 0
+    for path in args.sdx:
+        try:
+            all_data_objects = load_sdx(path)
+            counts, changes = import_into_sdx(all_data_objects, channels, args.fav, args.mode,
+                                              not args.keep_removed, not args.keep_order,
+                                              args.ambiguous)
+            out_path = path
+            if args.output_dir:
+                os.makedirs(args.output_dir, exist_ok=True)
+                out_path = os.path.join(args.output_dir, os.path.basename(path))
+            save_sdx(out_path, all_data_objects)
+        except (OSError, ValueError) as e:
+            print(f"error: {path}: {e}", file=sys.stderr)
+            status = 1
+            continue
+        matched = ", ".join(f"{count} {name}" for name, count in sorted(counts.items()))
+        print(f"{out_path}: {matched}")
+        for fav_idx, change in changes.items():
+            print(f"  list {fav_idx}: {_describe_change(change, not args.keep_removed, not args.keep_order)}")
+    return status
+
+
+def cmd_convert_chl(args):
+    try:
+        counts = ChannelDataProcessor.convert_chl_file(args.input, args.output)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"{args.output}: " + ", ".join(f"{count} {name}" for name, count in counts.items()))
+    return 0
+
+
+def cmd_validate(args):
+    reports, errors = validate_sdx_files(args.files, args.workers)
+    status = 0
+    for path in args.files:
+        if path in errors:
+            print(f"error: {path}: {errors[path]}", file=sys.stderr)
+            status = 1
+            continue
+        report = reports[path]
+        print(f"{path}: {report.summary()}")
+        shown = report.issues if not args.limit else report.issues[:args.limit]
+        for kind, _, message in shown:
+            print(f"  [{kind}] {message}")
+        if len(shown) < len(report.issues):
+            print(f"  ... {len(report.issues) - len(shown)} more")
+        if report.errors:
+            status = 1
+    return status
+
+
+def cmd_diff(args):
+    try:
+        old, new = load_sdx(args.old), load_sdx(args.new)
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    diff = diff_sdx(old, new)
+    print(diff.summary())
+    for line in diff.lines(args.limit or None):
+        print(line)
+    return 0
+
+
+def cmd_merge(args):
+    try:
+        ours, theirs = load_sdx(args.ours), load_sdx(args.rescanned)
+        base = load_sdx(args.base) if args.base else None
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    merged, report = merge_sdx(ours, theirs, base)
+    try:
+        save_sdx(args.output, merged)
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"{args.output}: {report.summary() or 'no favourite lists'}")
+    for fav_idx, names in report.dropped.items():
+        for name in names[:args.limit] if args.limit else names:
+            print(f"  list {fav_idx}: dropped {name}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="sdx_cli.py", description="Headless tools for SDX channel lists.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    kos = commands.add_parser("import-kingofsat",
+                              help="import KingOfSat pages saved to a directory")
+    kos.add_argument("pages", help="directory with the saved .html package pages")
+    kos.add_argument("--sdx", nargs="+", default=[], metavar="FILE",
+                     help="SDX files to write the channels into")
+    kos.add_argument("--fav", nargs="+", default=[], metavar="LIST",
+                     help="favourite lists to write, by number or name")
+    kos.add_argument("--mode", choices=IMPORT_MODES, default="diff",
+                     help="diff: apply only additions, removals and moves (default); "
+                          "append: add after the existing entries; overwrite: replace the list")
+    kos.add_argument("--keep-removed", action="store_true",
+                     help="diff mode: keep entries that are not in the pages")
+    kos.add_argument("--keep-order", action="store_true",
+                     help="diff mode: do not move existing entries")
+    kos.add_argument("--ambiguous", action="store_true",
+                     help="also import ambiguous channels (first candidate)")
+    kos.add_argument("--output-dir", metavar="DIR",
+                     help="write the modified SDX files here instead of in place")
+    kos.add_argument("--channels-json", metavar="FILE",
+                     help="also save the merged channel set as JSON")
+    kos.add_argument("--workers", type=int, metavar="N",
+                     help="parser processes (default: one per CPU)")
+    kos.set_defaults(func=cmd_import_kingofsat)
+
+    chl = commands.add_parser("convert-chl", help="convert a CHL file to SDX in bounded memory")
+    chl.add_argument("input", help="CHL file to read")
+    chl.add_argument("output", help="SDX file to write")
+    chl.set_defaults(func=cmd_convert_chl)
+
+    check = commands.add_parser("validate", help="check the integrity of SDX files")
+    check.add_argument("files", nargs="+", metavar="FILE", help="SDX files to check")
+    check.add_argument("--limit", type=int, default=20, metavar="N",
+                       help="issues listed per file, 0 for all (default: %(default)s)")
+    check.add_argument("--workers", type=int, metavar="N",
+                       help="checker processes (default: one per CPU)")
+    check.set_defaults(func=cmd_validate)
+
+    diff = commands.add_parser("diff", help="compare two SDX files")
+    diff.add_argument("old", help="SDX file before")
+    diff.add_argument("new", help="SDX file after, e.g. a rescan")
+    diff.add_argument("--limit", type=int, default=20, metavar="N",
+                      help="lines listed per kind of change, 0 for all (default: %(default)s)")
+    diff.set_defaults(func=cmd_diff)
+
+    merge = commands.add_parser("merge", help="carry favourite lists over to a rescanned SDX file")
+    merge.add_argument("ours", help="SDX file with our favourite lists")
+    merge.add_argument("rescanned", help="SDX file written by the receiver after a rescan")
+    merge.add_argument("output", help="SDX file to write")
+    merge.add_argument("--base", metavar="FILE",
+                       help="file both started from; list entries the rescan added are kept")
+    merge.add_argument("--limit", type=int, default=20, metavar="N",
+                       help="dropped entries listed per list, 0 for all (default: %(default)s)")
+    merge.set_defaults(func=cmd_merge)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "import-kingofsat" and bool(args.sdx) != bool(args.fav):
+        parser.error("--sdx and --fav must be given together")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Synthetic channel lists at realistic sizes.
+
+SyntheticList builds one consistent lineup from a seed and a set of counts.
+It renders the lineup as CHL data, as SDX objects in the layout the editor
+writes, and as a KingOfSat package page listing the same channels. Output is
+deterministic: the same seed and counts always give the same text.
+
+Text renderings can carry injected corruption. These are junk fragments
+between objects or rows, of the kind found in files cut or concatenated
+badly. Every original object or row survives, so a tolerant reader must
+recover all of them (and may additionally return non-dict values decoded
+from the junk):
+
+    lineup = SyntheticList(seed=7, channels=50000, fav_lists=4, fav_size=500)
+    text = lineup.sdx_text(corruption=20)
+"""
+
+import json
+import random
+
+from channel_processor import ChannelDataProcessor
+
+# Orbital positions in tenths of a degree, east positive
+SATELLITE_ANGLES = (192, 130, 282, -300, 235, 90, -50, 160, 70, -150)
+SATELLITE_NAMES = ('Astra 19.2E', 'Hotbird 13.0E', 'Astra 28.2E', 'Hispasat 30.0W', 'Astra 23.5E',
+                   'Eutelsat 9.0E', 'Eutelsat 5.0W', 'Eutelsat 16.0E', 'Eutelsat 7.0E', 'NSS 15.0W')
+NAME_WORDS = ('Canal', 'Sport', 'Cine', 'Noticias', 'Radio', 'Música', 'Niños', 'Docu', 'TV',
+              'Série', 'Info', 'Mundo')
+VIDEO_TYPES = ('MPEG2', 'H264', 'HEVC', 'H265')
+LANGS = ('spa', 'eng', 'por', 'fre', 'ger', 'ita', 'und')
+AUDIO_TYPES = ('MPEG', 'AAC', 'AC3')
+CA_SYSTEMS = ('Nagravision 3', 'Viaccess 5.0', 'Conax', 'Irdeto', 'Videoguard')
+
+# KingOfSat's video column for each CHL video type
+_KINGOFSAT_VIDEO = {'MPEG2': 'MPEG-2/SD', 'H264': 'MPEG-4/HD', 'HEVC': 'HEVC/UHD', 'H265': 'HEVC/UHD'}
+
+# Junk injected between SDX/CHL objects: binary noise, stray punctuation
+# and the start of an object that was cut off. Fragments never end inside
+# a string or after a key, so they cannot swallow the object that follows
+_JSON_JUNK = ('\x00\x00\x00', '}}', ']', '@@ garbage @@', '{"program_tv_object_7": {"ServiceName": "Cut"',
+              '{"Type": "ch", "Name": "Cut"', '\ufffd\ufffd', '12 34')
+# Junk injected between KingOfSat rows: broken markup and stray text that
+# does not open a channel row
+_HTML_JUNK = ('<td class="s">', '</a></td>', '<!-- cut -->', '&amp;&#', '<td class="bld">99', '\x00',
+              '<td><a class="A3">')
+
+
+def position_text(angle):
+    """Format a position in tenths of a degree as KingOfSat does ("30.0°W")."""
+    return f"{abs(angle) / 10:.1f}°{'W' if angle < 0 else 'E'}"
+
+
+class SyntheticList:
+    """
+    A deterministic synthetic lineup.
+
+    Attributes:
+        satellites (list): CHL "sat" records
+        transponders (list): CHL "tp" records
+        channels (list): CHL "ch" records
+        favorites (list): CHL "fav" records
+    """
+
+    def __init__(self, seed=1, satellites=4, transponders=None, channels=1000, fav_lists=8,
+                 fav_size=200):
+        """
+        Args:
+            seed (int): Random seed; equal seeds and counts give equal lineups
+            satellites (int): Number of satellites, at most len(SATELLITE_ANGLES)
+            transponders (int): Number of transponders, one per 10 channels by default
+            channels (int): Number of channels
+            fav_lists (int): Number of favourite lists
+            fav_size (int): Channels in each favourite list, at most channels
+        """
+        if not 1 <= satellites <= len(SATELLITE_ANGLES):
+            raise ValueError(f"satellites must be between 1 and {len(SATELLITE_ANGLES)}")
+        self.seed = seed
+        rng = random.Random(seed)
+        if transponders is None:
+            transponders = max(1, channels // 10)
+
+        self.satellites = [{'Type': 'sat', 'Index': i, 'Name': SATELLITE_NAMES[i],
+                            'Angle': str(SATELLITE_ANGLES[i])}
+                           for i in range(satellites)]
+
+        # Frequencies are unique per satellite and polarisation while the
+        # band has room, as on a real satellite
+        self.transponders = []
+        for i in range(transponders):
+            sat_idx = i % satellites
+            slot = i // satellites
+            self.transponders.append({
+                'Type': 'tp', 'Index': i, 'SatIndex': sat_idx,
+                'Freq': str(10700 + (slot // 4 * 19) % 2050), 'Pol': 'HVLR'[slot % 4],
+                'SR': str(rng.choice((22000, 27500, 29700, 30000))),
+            })
+
+        self.channels = []
+        for i in range(channels):
+            video = rng.choice(VIDEO_TYPES)
+            name = f"{rng.choice(NAME_WORDS)} {i}" + (' HD' if video != 'MPEG2' and rng.random() < 0.5 else '')
+            audio = [{'PID': 100 + a, 'Type': rng.choice(AUDIO_TYPES), 'Lang': rng.choice(LANGS)}
+                     for a in range(rng.randint(1, 3))]
+            self.channels.append({
+                'Type': 'ch', 'Index': i, 'Name': name, 'SID': str(1 + (i * 37) % 65000),
+                'TPIndex': i % transponders, 'VideoType': video, 'CA': rng.choice((0, 0, 2)),
+                'Audio': audio, 'VideoPID': 200 + i % 300, 'PmtPID': 1000 + i % 300,
+            })
+
+        self.favorites = [{'Type': 'fav', 'Index': f, 'Name': f'Favoritos {f}',
+                           'TVChs': rng.sample(range(channels), min(channels, fav_size)), 'RadioChs': []}
+                          for f in range(fav_lists)]
+
+    def chl(self):
+        """Return the lineup as parse_chl_file returns it."""
+        index = {'Type': 'index', 'Ver': 1, 'Sat': len(self.satellites), 'TP': len(self.transponders),
+                 'ChTV': len(self.channels), 'CHRadio': 0, 'FAV': len(self.favorites)}
+        return {'index': index, 'favorites': self.favorites, 'satellites': self.satellites,
+                'transponders': self.transponders, 'channels': self.channels}
+
+    def chl_records(self):
+        """Return the CHL records in file order: index, fav, sat, tp, ch."""
+        data = self.chl()
+        return [data['index']] + self.favorites + self.satellites + self.transponders + self.channels
+
+    def sdx(self):
+        """
+        Return the lineup as SDX objects, in the layout the editor writes.
+
+        Programs get an LCN, a signal quality and their FavBit on top of
+        what the CHL conversion fills in.
+        """
+        objects = ChannelDataProcessor.convert_chl_to_sdx(self.chl())
+        rng = random.Random(self.seed)
+        for obj in objects:
+            key = next(iter(obj))
+            if key.startswith("program_tv_object_"):
+                program = obj[key]
+                program["iLCN"] = int(key.rsplit("_", 1)[1]) + 1
+                program["signal_quality"] = rng.randint(30, 100)
+        ChannelDataProcessor.update_fav_bits(objects)
+        return objects
+
+    def chl_text(self, corruption=0):
+        """Return a CHL file as the editor saves it, with corruption junk fragments."""
+        return self._render([json.dumps(obj, indent=2) + '\n'
+                             for obj in self.chl_records()], _JSON_JUNK, corruption)
+
+    def sdx_text(self, corruption=0):
+        """Return an SDX file as the editor saves it, with corruption junk fragments."""
+        return self._render([json.dumps(obj, separators=(',', ':')) for obj in self.sdx()],
+                            _JSON_JUNK, corruption)
+
+    def kingofsat_channels(self):
+        """Return the channels of kingofsat_html() as the KingOfSat parser reports them."""
+        channels = []
+        for tp, rows in self._kingofsat_transponders():
+            for ch in rows:
+                channels.append({'name': ch['Name'], 'sid': int(ch['SID']), 'freq': int(tp['Freq']),
+                                 'pol': tp['Pol'],
+                                 'position': int(self.satellites[tp['SatIndex']]['Angle'])})
+        return channels
+
+    def kingofsat_html(self, corruption=0):
+        """Return a KingOfSat package page listing every channel, grouped by transponder."""
+        rng = random.Random(self.seed)
+        parts = []
+        for tp, rows in self._kingofsat_transponders():
+            angle = int(self.satellites[tp['SatIndex']]['Angle'])
+            parts.append(
+                '<table class="frq"><tr>\n'
+                f'<td width="5%" class="pos">{position_text(angle)}</td>\n'
+                f'<td width="15%" class="bld">{tp["Freq"]}.{rng.choice(("00", "25", "50", "75"))}</td>\n'
+                f'<td width="2%" class="bld">{tp["Pol"]}</td>\n'
+                '<td>DVB-S2</td><td>8PSK</td>\n'
+                f'<td width="10%"><a class="bld" href="#">{tp["SR"]} 3/4</a></td>\n'
+                '</tr></table>\n<table class="fl">\n')
+            for ch in rows:
+                ca = 'Clear' if not ch['CA'] else '<br>'.join(rng.sample(CA_SYSTEMS, rng.randint(1, 2)))
+                parts.append(
+                    f'<tr data-channel-id="{ch["Index"]}">\n'
+                    f'<td><a class="A3">{ch["Name"].replace("&", "&amp;")}</a></td>\n'
+                    f'<td class="v">{_KINGOFSAT_VIDEO[ch["VideoType"]]}</td>\n'
+                    f'<td class="s">{ch["SID"]}</td>\n'
+                    f'<td class="cr">{ca}</td>\n'
+                    '</tr>\n')
+            parts.append('</table>\n')
+        return '<html>\n<body>\n' + self._render(parts, _HTML_JUNK, corruption) + '</body>\n</html>\n'
+
+    def _kingofsat_transponders(self):
+        """(transponder, channels) pairs in transponder order, empty ones left out."""
+        rows = {}
+        for ch in self.channels:
+            rows.setdefault(ch['TPIndex'], []).append(ch)
+        return [(self.transponders[idx], rows[idx]) for idx in sorted(rows)]
+
+    def _render(self, parts, junk, corruption):
+        """
+        Join parts, inserting corruption junk fragments at distinct, seeded
+        part boundaries (at most one per boundary, so fragments never combine).
+        """
+        if corruption:
+            rng = random.Random(self.seed + corruption)
+            boundaries = set(rng.sample(range(len(parts) + 1), min(corruption, len(parts) + 1)))
+            rendered = []
+            for pos, part in enumerate(parts):
+                if pos in boundaries:
+                    rendered.append(rng.choice(junk))
+                rendered.append(part)
+            if len(parts) in boundaries:
+                rendered.append(rng.choice(junk))
+            parts = rendered
+        return ''.join(parts)
@@ -0,0 +1,90 @@
+"""
+Unit tests for background task execution.
+"""
+
+import threading
+
+import pytest
+from background import BackgroundTask, TaskCancelled
+
+
+def finish(task):
+    """Wait for the worker and return all messages it posted."""
+    task.join(5)
+    return task.poll()
+
+
+class TestBackgroundTask:
+    """Test the worker thread and its message queue."""
+
+    def test_result_is_posted(self):
+        """Test the return value arrives as a done message after progress."""
+        def job(task, value):
+            task.report("working", 0.5)
+            return value * 2
+
+        messages = finish(BackgroundTask(job, 21).start())
+        assert messages == [("progress", "working", 0.5), ("done", 42)]
+
+    def test_progress_messages_are_collapsed(self):
+        """Test consecutive progress updates are reduced to the latest one."""
+        def job(task):
+            for i in range(100):
+                task.report(f"step {i}", i / 100)
+            return None
+
+        messages = finish(BackgroundTask(job).start())
+        assert messages[0] == ("progress", "step 99", 0.99)
+        assert messages[-1] == ("done", None)
+
+    def test_error_is_posted_with_traceback(self):
+        """Test worker exceptions are reported instead of raised."""
+        def job(task):
+            raise ValueError("broken file")
+
+        task = BackgroundTask(job).start()
+        kind, error, details = finish(task)[0]
+        assert kind == "error"
+        assert isinstance(error, ValueError)
+        assert "broken file" in details
+        assert task.finished
+
+    def test_cancel_stops_at_next_report(self):
+        """Test cancellation unwinds the worker without a result."""
+        started = threading.Event()
+        resume = threading.Event()
+        steps = []
+
+        def job(task):
+            started.set()
+            resume.wait(5)
+            for i in range(10):
+                task.report("step")
+                steps.append(i)
+            return "result"
+
+        task = BackgroundTask(job).start()
+        started.wait(5)
+        task.cancel()
+        resume.set()
+        assert finish(task) == [("cancelled",)]
+        assert steps == []
+
+    def test_report_raises_when_cancelled(self):
+        """Test report() raises TaskCancelled once cancel() was requested."""
+        task = BackgroundTask(lambda task: None)
+        task.cancel()
+        with pytest.raises(TaskCancelled):
+            task.report("step")
+
+    def test_published_items_are_not_collapsed(self):
+        """Test every published item is delivered in order among progress updates."""
+        def job(task):
+            for i in range(3):
+                task.publish([i])
+                task.report("step", i / 3)
+            return "end"
+
+        messages = finish(BackgroundTask(job).start())
+        assert [m for m in messages if m[0] == "data"] == [("data", [0]), ("data", [1]), ("data", [2])]
+        assert messages[-1] == ("done", "end")
@@ -0,0 +1,242 @@
+"""
+Unit tests for SDX diff and favourite merge.
+"""
+
+import copy
+import random
+import time
+
+import sdx_cli
+from channel_diff import SdxIndex, diff_sdx, merge_sdx, pair_programs
+from channel_models import fav_entry_key
+from channel_processor import ChannelDataProcessor
+from channel_validation import validate_sdx
+from tests.fixtures.synthetic import SyntheticList
+
+
+def find(objects, name):
+    for obj in objects:
+        if name in obj:
+            return obj[name]
+
+
+def rescan(lineup, drop=(), rename=(), extra=0, shuffle=True, keep_favs=False):
+    """SDX objects of the lineup as a receiver writes them after a rescan."""
+    chl = copy.deepcopy(lineup.chl())
+    order = list(range(len(chl['transponders'])))
+    if shuffle:
+        random.Random(5).shuffle(order)
+    new_idx = {old: new for new, old in enumerate(order)}
+    chl['transponders'] = sorted(({**tp, 'Index': new_idx[tp['Index']]} for tp in chl['transponders']),
+                                 key=lambda tp: tp['Index'])
+    channels = []
+    for ch in chl['channels']:
+        if ch['Index'] in drop:
+            continue
+        ch = dict(ch, TPIndex=new_idx[ch['TPIndex']])
+        if ch['Index'] in rename:
+            ch['Name'] += ' Nuevo'
+        channels.append(ch)
+    for i in range(extra):
+        channels.append(dict(channels[0], Name=f'Extra {i}', SID=str(65100 + i)))
+    for i, ch in enumerate(channels):
+        ch['Index'] = i
+    chl['channels'] = channels
+    if not keep_favs:
+        chl['favorites'] = []
+    return ChannelDataProcessor.convert_chl_to_sdx(chl)
+
+
+def same_name_programs(count, first_sid):
+    """SDX objects of count programs called "Canal" on one transponder."""
+    return ChannelDataProcessor.convert_chl_to_sdx({'channels': [
+        {'Index': i, 'Name': 'Canal', 'SID': str(first_sid + i), 'TPIndex': 0} for i in range(count)]})
+
+
+def fav_names(objects, fav_idx):
+    """Channel names of a favourite list, in order."""
+    names = {}
+    for obj in objects:
+        for key, data in obj.items():
+            if key.startswith('program_tv_object_'):
+                names.setdefault(fav_entry_key(data['stProgNo']), data['ServiceName'])
+    return [names[fav_entry_key(entry)] for entry in find(objects, f'fav_list_object_{fav_idx}')['stProgNo']]
+
+
+class TestDiffSdx:
+    """Test programs are paired across a rescan and every change is reported."""
+
+    def test_identical(self):
+        """Test a file compared with itself has no differences."""
+        objects = SyntheticList(channels=200, fav_size=20).sdx()
+        diff = diff_sdx(objects, copy.deepcopy(objects))
+        assert not diff
+        assert list(diff.lines()) == []
+
+    def test_renumbered_transponders(self):
+        """Test a rescan that only renumbers transponders moves programs, not adds them."""
+        lineup = SyntheticList(channels=200, fav_size=20)
+        diff = diff_sdx(lineup.sdx(), rescan(lineup, keep_favs=True))
+        assert not diff.added and not diff.removed and not diff.renamed
+        assert not diff.transponders_added and not diff.transponders_removed
+        assert diff.moved and diff.transponders_changed
+        # The lists hold the same programs under their new keys
+        assert diff.favourites == {}
+
+    def test_added_removed_renamed(self):
+        """Test dropped, renamed and new channels are found."""
+        lineup = SyntheticList(channels=200, fav_size=20)
+        fav = lineup.favorites[0]['TVChs']
+        diff = diff_sdx(lineup.sdx(), rescan(lineup, drop={fav[0]}, rename={fav[1]}, extra=2))
+        assert len(diff.removed) == 1 and len(diff.added) == 2 and len(diff.renamed) == 1
+        old_key, new_key = diff.renamed[0]
+        assert diff.new.programs[new_key]['name'].endswith(' Nuevo')
+        # The rescan cleared the lists; the dropped entry is reported as gone
+        change = diff.favourites[0]
+        assert len(change.removed) == len(fav) and change.added == []
+        assert [change.current[pos][0] for pos in change.removed
+                if isinstance(change.current[pos], tuple)] == ["gone"]
+
+    def test_lines(self):
+        """Test each change gets a line and --limit style truncation."""
+        lineup = SyntheticList(channels=200, fav_size=20)
+        fav = lineup.favorites[0]['TVChs']
+        diff = diff_sdx(lineup.sdx(), rescan(lineup, rename={fav[0]}, extra=3, shuffle=False, keep_favs=True))
+        lines = list(diff.lines(limit=1))
+        assert lines[0].startswith('+ Extra 0 (SID 65100')
+        assert lines[1] == '  ... 2 more'
+        assert lines[2].startswith('~ ') and ' Nuevo (SID ' in lines[2]
+        assert len(lines) == 3
+
+    def test_transponder_changes(self):
+        """Test transponders added, removed and with a new symbol rate are reported."""
+        objects = SyntheticList(satellites=1, channels=50).sdx()
+        changed = copy.deepcopy(objects)
+        find(changed, 'transponder_object_0')['SR'] += 1000
+        find(changed, 'transponder_object_1')['Freq'] = 12999
+        diff = diff_sdx(objects, changed)
+        assert diff.transponders_added == [1] and diff.transponders_removed == [1]
+        assert diff.transponders_changed == [(0, 0)]
+
+
+class TestPairPrograms:
+    """Test programs without a SID match pair up by name."""
+
+    def test_same_name_in_file_order(self):
+        """Test programs sharing a name pair in file order, each new program once."""
+        old = SdxIndex(same_name_programs(5, 100))
+        new = SdxIndex(same_name_programs(3, 200))
+        assert pair_programs(old, new) == {0: 0, 1: 1, 2: 2}
+
+    def test_same_name_linear_time(self):
+        """Test pairing ten times more programs of one name takes far less than a hundred times longer."""
+        def best_time(count):
+            old, new = SdxIndex(same_name_programs(count, 100)), SdxIndex(same_name_programs(count, 30000))
+            times = []
+            for _ in range(3):
+                start = time.perf_counter()
+                pairs = pair_programs(old, new)
+                times.append(time.perf_counter() - start)
+            assert len(pairs) == count
+            return min(times)
+
+        # Linear is 10x; comparing every name with every other is 100x
+        assert best_time(5000) < 50 * best_time(500)
+
+
+class TestMergeSdx:
+    """Test favourite lists are carried over to a rescanned file."""
+
+    def test_keeps_order_and_drops_gone(self):
+        """Test our order survives, gone programs are dropped and the result validates."""
+        lineup = SyntheticList(channels=500, fav_lists=3, fav_size=40)
+        ours = lineup.sdx()
+        expected = fav_names(ours, 0)
+        fav = lineup.favorites[0]['TVChs']
+        merged, report = merge_sdx(ours, rescan(lineup, drop={fav[0], fav[5]}))
+        assert report.kept == {0: 38, 1: 40, 2: 40}
+        assert report.dropped[0] == [expected[0], expected[5]]
+        assert fav_names(merged, 0) == [name for n, name in enumerate(expected) if n not in (0, 5)]
+        assert fav_names(merged, 1) == fav_names(ours, 1)
+        assert validate_sdx(merged).ok
+
+    def test_rename_follows_program(self):
+        """Test an entry follows its program when the rescan renames it."""
+        lineup = SyntheticList(channels=200, fav_size=20)
+        ours = lineup.sdx()
+        fav = lineup.favorites[0]['TVChs']
+        merged, _ = merge_sdx(ours, rescan(lineup, rename={fav[3]}))
+        assert fav_names(merged, 0)[3] == fav_names(ours, 0)[3] + ' Nuevo'
+
+    def test_base_adds_rescan_entries(self):
+        """Test entries the rescan added to a list are appended only with a base."""
+        lineup = SyntheticList(channels=200, fav_size=20)
+        base = lineup.sdx()
+        theirs = rescan(lineup, keep_favs=True, extra=1)
+        entries = find(theirs, 'fav_list_object_0')['stProgNo']
+        entries.append(dict(find(theirs, f'program_tv_object_{200}')['stProgNo']))
+        _, report = merge_sdx(lineup.sdx(), copy.deepcopy(theirs))
+        assert report.added[0] == 0
+        merged, report = merge_sdx(lineup.sdx(), theirs, base)
+        assert report.added[0] == 1
+        assert fav_names(merged, 0)[-1] == 'Extra 0'
+        assert validate_sdx(merged).ok
+
+    def test_creates_lists_and_names(self):
+        """Test lists and names the rescanned file lacks are created, with FavBit set."""
+        lineup = SyntheticList(channels=200, fav_lists=2, fav_size=20)
+        ours = lineup.sdx()
+        find(ours, 'fav_list_info_in_box_object')['aucFavReName'][1] = 'Deportes'
+        theirs = [obj for obj in rescan(lineup) if not any(
+            key.startswith('fav_list') for key in obj)]
+        merged, _ = merge_sdx(ours, theirs)
+        assert fav_names(merged, 1) == fav_names(ours, 1)
+        assert find(merged, 'fav_list_info_in_box_object')['aucFavReName'][1] == 'Deportes'
+        assert validate_sdx(merged).ok
+
+    def test_linear_time(self):
+        """Test merging a rescan ten times larger takes far less than a hundred times longer."""
+        def best_time(channels):
+            lineup = SyntheticList(channels=channels, fav_lists=4, fav_size=channels // 30)
+            ours = lineup.sdx()
+            theirs = rescan(lineup, drop={lineup.favorites[0]['TVChs'][0]})
+            times = []
+            for _ in range(3):
+                # Merging into the same file again does the same work
+                start = time.perf_counter()
+                _, report = merge_sdx(ours, theirs)
+                times.append(time.perf_counter() - start)
+            assert report.kept[0] == channels // 30 - 1 and len(report.diff.removed) == 1
+            return min(times)
+
+        # Linear is 10x plus cache effects (up to about 18x measured); quadratic is 100x
+        assert best_time(10000) < 50 * best_time(1000)
+
+
+class TestCommands:
+    """Test the diff and merge commands."""
+
+    def test_diff_and_merge(self, tmp_path, capsys):
+        """Test diff prints the summary and merge writes a valid file."""
+        lineup = SyntheticList(channels=100, fav_size=10)
+        fav = lineup.favorites[0]['TVChs']
+        ours, theirs, out = (str(tmp_path / name) for name in ('ours.sdx', 'theirs.sdx', 'out.sdx'))
+        sdx_cli.save_sdx(ours, lineup.sdx())
+        sdx_cli.save_sdx(theirs, rescan(lineup, drop={fav[0]}))
+        assert sdx_cli.main(['diff', ours, theirs]) == 0
+        assert capsys.readouterr().out.startswith('0 added, 1 removed, 0 renamed, ')
+        assert sdx_cli.main(['merge', ours, theirs, out, '--base', ours]) == 0
+        assert f"{out}: list 0: 9 kept, 1 dropped" in capsys.readouterr().out
+        assert validate_sdx(sdx_cli.load_sdx(out)).ok
+
+    def test_missing_file(self, tmp_path, capsys):
+        """Test an unreadable file is an error."""
+        assert sdx_cli.main(['diff', str(tmp_path / 'a.sdx'), str(tmp_path / 'b.sdx')]) == 1
+        assert 'error:' in capsys.readouterr().err
+
+    def test_unwritable_output(self, tmp_path, capsys):
+        """Test an output file that cannot be written is an error."""
+        ours = str(tmp_path / 'ours.sdx')
+        sdx_cli.save_sdx(ours, SyntheticList(channels=20, fav_size=5).sdx())
+        assert sdx_cli.main(['merge', ours, ours, str(tmp_path / 'no' / 'out.sdx')]) == 1
+        assert 'error:' in capsys.readouterr().err
@@ -0,0 +1,91 @@
+"""
+Unit tests for matching imported channels against loaded programs.
+"""
+
+import pytest
+from channel_matching import (
+    AMBIGUOUS, MISSING, RESOLVED, ProgramMatcher, normalize_name, pack_key
+)
+from channel_models import TransponderIndex
+
+
+def program(name, sid, tp, freq):
+    return {'name': name, 'sid': sid, 'freq': freq,
+            'stProgNo': {'uiWord32': pack_key(sid, tp), 'unShort': {'sLo16': sid, 'sHi16': tp}}}
+
+
+@pytest.fixture
+def matcher():
+    index = TransponderIndex()
+    index.add(1, 10729, "V", 192)
+    index.add(2, 10730, "H", 192)
+    index.add(3, 11954, "H", 192)
+    programs = {
+        "100_1_1": program("La 1 HD", 100, 1, 10729),
+        "100_2_2": program("Otra", 100, 2, 10730),
+        "200_3_3": program("Cuatro", 200, 3, 11954),
+        "300_3_4": program("Canal Sur", 300, 3, 11954),
+        "300_3_5": program("Canal Sur", 300, 3, 11954),   # duplicate service
+        "400_1_6": program("Clan", 400, 1, 10729),
+        "401_3_7": program("Clan", 401, 3, 11954),
+    }
+    return ProgramMatcher(programs.items(), index)
+
+
+def channel(name, sid, freq, pol='', position=None):
+    return {'name': name, 'sid': sid, 'freq': freq, 'pol': pol, 'position': position}
+
+
+class TestNormalizeName:
+    """Test the loose name key."""
+
+    def test_ignores_case_accents_and_quality(self):
+        """Test cosmetic differences produce the same key."""
+        assert normalize_name("La 1 HD") == normalize_name("la-1") == "la1"
+        assert normalize_name("Telemadrid Internacional") == normalize_name("TELEMADRID  internacional")
+        assert normalize_name("Canal Andalucía") == normalize_name("Canal Andalucia")
+
+    def test_quality_only_name_kept(self):
+        """Test a name made only of quality words is not reduced to nothing."""
+        assert normalize_name("HD") == "hd"
+
+
+class TestProgramMatcher:
+    """Test the three matching steps and their outcome."""
+
+    def test_exact_packed_key(self, matcher):
+        """Test a channel with full transponder data resolves by (SID, TP)."""
+        assert matcher.match(channel("Whatever", 100, 10729, "V", 192)) == (RESOLVED, ["100_1_1"], "sid_tp")
+
+    def test_sid_and_frequency_within_tolerance(self, matcher):
+        """Test a channel without polarisation resolves by SID near its frequency."""
+        assert matcher.match(channel("Cuatro", 200, 11952)) == (RESOLVED, ["200_3_3"], "sid_freq")
+
+    def test_name_breaks_sid_frequency_tie(self, matcher):
+        """Test the name picks between two programs sharing SID and nearby frequencies."""
+        assert matcher.match(channel("La 1", 100, 10729)) == (RESOLVED, ["100_1_1"], "sid_freq_name")
+        status, keys, _ = matcher.match(channel("Nada", 100, 10729))
+        assert status == AMBIGUOUS and sorted(keys) == ["100_1_1", "100_2_2"]
+
+    def test_duplicate_service_counts_once(self, matcher):
+        """Test two programs with the same packed key are not ambiguous."""
+        assert matcher.match(channel("Canal Sur", 300, 11954))[0] == RESOLVED
+
+    def test_name_fallback(self, matcher):
+        """Test a channel whose SID changed is found by its name."""
+        assert matcher.match(channel("CUATRO", 999, 12000)) == (RESOLVED, ["200_3_3"], "name")
+        assert matcher.match(channel("Clan", 999, 12000))[0] == AMBIGUOUS
+
+    def test_missing(self, matcher):
+        """Test channels that match nothing are reported missing."""
+        assert matcher.match(channel("Desconocido", 999, 12000)) == (MISSING, [], None)
+
+    def test_match_all_splits_results(self, matcher):
+        """Test a page is split into resolved, ambiguous and missing channels."""
+        result = matcher.match_all([
+            channel("Cuatro", 200, 11954), channel("Clan", 999, 1), channel("X", 999, 1),
+        ])
+        assert [(ch['name'], key) for ch, key, _ in result.resolved] == [("Cuatro", "200_3_3")]
+        assert [ch['name'] for ch, _ in result.ambiguous] == ["Clan"]
+        assert [ch['name'] for ch in result.missing] == ["X"]
+        assert len(result) == 3
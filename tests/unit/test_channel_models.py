@@ -0,0 +1,302 @@
+"""
+Unit tests for the in-memory view models.
+"""
+
+import pytest
+from channel_models import (
+    ChannelData, ChannelListModel, FavListDiff, FavListModel, TransponderIndex, fav_entry_key
+)
+from channel_processor import ChannelDataProcessor
+from channel_validation import validate_sdx
+from tests.fixtures.synthetic import SyntheticList
+
+
+def make_programs(rows):
+    """Build programs_dict/program_list from (name, freq, sid, calidad) tuples."""
+    programs_dict = {}
+    program_list = []
+    for order, (name, freq, sid, calidad) in enumerate(rows, 1):
+        key = f"{sid}_0_{order}"
+        programs_dict[key] = {
+            'name': name, 'order': order, 'freq': freq, 'sid': sid, 'lcn': 0,
+            'hd': "", 'ca': "Libre", 'tipo': "TV SD", 'calidad': calidad
+        }
+        program_list.append((key, name))
+    return programs_dict, program_list
+
+
+@pytest.fixture
+def model():
+    return ChannelListModel(*make_programs([
+        ("Cuatro", 10979, 30, "9%"),
+        ("antena 3", 11170, 10, "85%"),
+        ("La 1", 10729, 20, "100%"),
+    ]))
+
+
+def names(model, positions):
+    return [model.rows[pos][1] for pos in positions]
+
+
+class TestChannelListModel:
+    """Test sorting and filtering of the general channel list model."""
+
+    def test_default_view_sorted_by_name(self, model):
+        """Test the default view matches the case-insensitive name order."""
+        assert names(model, model.view()) == ["antena 3", "Cuatro", "La 1"]
+
+    def test_sort_numeric_column(self, model):
+        """Test numeric columns sort numerically."""
+        assert names(model, model.view(column="freq")) == ["La 1", "Cuatro", "antena 3"]
+
+    def test_sort_quality_column_numerically(self, model):
+        """Test signal quality strings sort by their numeric value."""
+        assert names(model, model.view(column="calidad")) == ["Cuatro", "antena 3", "La 1"]
+
+    def test_descending_reverses_cached_permutation(self, model):
+        """Test descending order reuses the ascending permutation."""
+        ascending = model.view(column="sid")
+        perm = model.sort_permutation("sid")
+        assert model.view(column="sid", descending=True) == ascending[::-1]
+        assert model.sort_permutation("sid") is perm
+
+    def test_filter_combined_with_sort(self, model):
+        """Test the search filter is applied on top of the sort order."""
+        assert names(model, model.view("a", column="sid")) == ["antena 3", "La 1", "Cuatro"]
+        assert names(model, model.view("a", column="sid", descending=True)) == ["Cuatro", "La 1", "antena 3"]
+
+    def test_empty_model(self):
+        """Test an empty model produces an empty view."""
+        assert ChannelListModel().view("x", column="lcn") == []
+
+
+def make_fav_model(count):
+    """Build a favourite list model whose entries are their original positions."""
+    return FavListModel((i, (f"Canal {i}",)) for i in range(count))
+
+
+class TestFavListModel:
+    """Test reordering of favourite list models."""
+
+    def test_append_and_entries(self):
+        """Test rows keep insertion order and expose their entries."""
+        model = make_fav_model(3)
+        assert len(model) == 3
+        assert model.entries() == [0, 1, 2]
+        assert model.values(model.ids[1]) == ("Canal 1",)
+
+    def test_move_single_up_returns_range(self):
+        """Test moving one row reports only the two swapped positions."""
+        model = make_fav_model(10)
+        assert model.move([model.ids[5]], -1) == (4, 5)
+        assert model.entries()[3:7] == [3, 5, 4, 6]
+
+    def test_move_blocked_at_edge_keeps_selection_shape(self):
+        """Test rows stuck at the top do not swap with each other."""
+        model = make_fav_model(5)
+        ids = model.ids
+        assert model.move([ids[0], ids[1], ids[3]], -1) == (2, 3)
+        assert model.entries() == [0, 1, 3, 2, 4]
+
+    def test_move_down_at_bottom_is_noop(self):
+        """Test moving the last row down does nothing."""
+        model = make_fav_model(3)
+        assert model.move([model.ids[2]], 1) is None
+
+    def test_move_to_top_as_block(self):
+        """Test a multi-selection moves to the top in one operation."""
+        model = make_fav_model(6)
+        ids = model.ids
+        assert model.move_to([ids[4], ids[2]], 0) == (0, 4)
+        assert model.entries() == [2, 4, 0, 1, 3, 5]
+        assert [model.index(row_id) for row_id in model.ids] == list(range(6))
+
+    def test_move_to_bottom_is_clamped(self):
+        """Test positions past the end place the block last."""
+        model = make_fav_model(5)
+        ids = model.ids
+        assert model.move_to([ids[0], ids[1]], 99) == (0, 4)
+        assert model.entries() == [2, 3, 4, 0, 1]
+
+    def test_move_to_position_range_limited(self):
+        """Test the reported range spans only the rows that moved."""
+        model = make_fav_model(2000)
+        assert model.move_to([model.ids[10]], 12) == (10, 12)
+        assert model.entries()[9:14] == [9, 11, 12, 10, 13]
+
+    def test_move_to_same_place_is_noop(self):
+        """Test moving a block onto itself reports no change."""
+        model = make_fav_model(4)
+        assert model.move_to([model.ids[1], model.ids[2]], 1) is None
+
+    def test_move_before_gap(self):
+        """Test dropping rows into a gap accounts for rows removed above it."""
+        model = make_fav_model(6)
+        ids = model.ids
+        model.move_before([ids[0], ids[1]], 4)
+        assert model.entries() == [2, 3, 0, 1, 4, 5]
+
+    def test_remove_returns_first_index(self):
+        """Test removal reports the first changed index and reindexes."""
+        model = make_fav_model(5)
+        ids = list(model.ids)
+        assert model.remove([ids[3], ids[1]]) == 1
+        assert model.entries() == [0, 2, 4]
+        assert model.index(ids[4]) == 2
+        assert ids[1] not in model
+        assert model.remove(["missing"]) is None
+
+    def test_replace_keeps_existing_rows(self):
+        """Test a rebuild keeps the ids of listed rows and drops the rest."""
+        model = make_fav_model(3)
+        ids = list(model.ids)
+        model.replace([ids[2], (9, ("Nuevo",)), ids[0]])
+        assert model.entries() == [2, 9, 0]
+        assert model.ids[0] == ids[2] and model.ids[2] == ids[0]
+        assert ids[1] not in model
+        assert [model.index(row_id) for row_id in model.ids] == [0, 1, 2]
+
+    def test_snapshot_restore(self):
+        """Test restore undoes every change made after the snapshot."""
+        model = make_fav_model(4)
+        snapshot = model.snapshot()
+        ids = list(model.ids)
+        model.move_to([ids[3]], 0)
+        model.remove([ids[1]])
+        model.append(7, ("Otro",))
+        model.restore(snapshot)
+        assert model.entries() == [0, 1, 2, 3]
+        assert model.ids == ids
+        assert model.index(ids[3]) == 3
+
+
+def plan_keys(current, target, **kwargs):
+    return [key for _, key in FavListDiff(current, target).plan(**kwargs)]
+
+
+class TestFavListDiff:
+    """Test the package-to-list diff used by the KingOfSat import."""
+
+    def test_fav_entry_key(self):
+        """Test the key is packed from the unShort halves."""
+        assert fav_entry_key({"uiWord32": 0, "unShort": {"sLo16": 5, "sHi16": 2}}) == (2 << 16) | 5
+
+    def test_identical_lists_have_no_changes(self):
+        """Test a list that already matches the package reports nothing."""
+        diff = FavListDiff([1, 2, 3], [1, 2, 3])
+        assert not diff
+        assert diff.unchanged == 3
+
+    def test_added_removed_and_moved(self):
+        """Test each kind of change is reported once."""
+        diff = FavListDiff([1, 2, 3, 4, 9], [1, 3, 4, 2, 5])
+        assert diff.added == [5]
+        assert diff.removed == [4]            # position of key 9
+        assert diff.moved == [1]              # key 2 is now after 4
+        assert diff.unchanged == 3
+
+    def test_duplicates_are_removed(self):
+        """Test repeated entries from earlier appends count as removed."""
+        diff = FavListDiff([1, 2, 1, 2], [1, 2])
+        assert diff.removed == [2, 3]
+        assert plan_keys([1, 2, 1, 2], [1, 2]) == [1, 2]
+
+    def test_plan_keeps_custom_order_of_unchanged(self):
+        """Test entries not in the package keep their place when not removed."""
+        current = [7, 1, 8, 2, 3]
+        assert plan_keys(current, [1, 2, 4, 3], remove=False) == [7, 1, 8, 2, 4, 3]
+        assert plan_keys(current, [1, 2, 4, 3]) == [1, 2, 4, 3]
+
+    def test_plan_inserts_after_package_predecessor(self):
+        """Test new and moved entries land after the entry before them in the package."""
+        assert plan_keys([2, 3, 1], [0, 1, 2, 3]) == [0, 1, 2, 3]
+        assert plan_keys([2, 3, 1], [0, 1, 2, 3], reorder=False) == [0, 2, 3, 1]
+
+    def test_plan_positions_refer_to_current_list(self):
+        """Test kept and moved entries carry their old position, new ones None."""
+        plan = FavListDiff([10, 20], [20, 30, 10]).plan()
+        assert plan == [(1, 20), (None, 30), (0, 10)]
+
+    def test_linear_scale(self):
+        """Test large lists are compared quickly."""
+        current = list(range(100000))
+        target = current[::-1][:50000] + list(range(200000, 250000))
+        diff = FavListDiff(current, target)
+        assert len(diff.added) == 50000 and len(diff.removed) == 50000
+        assert len(plan_keys(current, target)) == 100000
+
+
+@pytest.fixture
+def tp_index():
+    index = TransponderIndex()
+    index.add(1, 10729, "V", 192)
+    index.add(2, 10729, "V", 3300)     # same frequency on 30.0W
+    index.add(3, 10730, "H", 192)      # 1 MHz away, other polarisation
+    index.add(4, 11093, "H", 192)
+    return index
+
+
+class TestTransponderIndex:
+    """Test exact transponder lookups and their fallbacks."""
+
+    def test_exact_key_separates_satellites(self, tp_index):
+        """Test the satellite position picks between identical frequencies."""
+        assert tp_index.find(10729, "V", 192) == 1
+        assert tp_index.find(10729, "V", -300) == 2
+
+    def test_polarisation_avoids_tolerance_collision(self, tp_index):
+        """Test a nearby transponder with another polarisation is not taken."""
+        assert tp_index.find(10730, "H", 192) == 3
+        assert tp_index.find(10730, "V", 192) == 1
+
+    def test_rounded_frequency(self, tp_index):
+        """Test a fractional frequency also matches the rounded value."""
+        assert tp_index.find(11092, "H", 192, freq_exact=11092.5) == 4
+
+    def test_other_satellite_not_taken(self, tp_index):
+        """Test the tolerance fallback stays on the requested satellite."""
+        assert tp_index.find(11092, "H", 3300) is None
+
+    def test_ambiguous_without_position(self, tp_index):
+        """Test (freq, pol) shared by two satellites does not resolve."""
+        assert tp_index.find(10729, "V") is None
+
+    def test_frequency_only_fallback(self, tp_index):
+        """Test lookups without polarisation use the nearest frequency within 3 MHz."""
+        assert tp_index.find(11095) == 4
+        assert tp_index.find(11100) is None
+
+
+class TestChannelData:
+    """Test list creation on the loaded state."""
+
+    def test_add_fav_list(self):
+        """Test a new list takes the first free index, its name and an empty model."""
+        data = ChannelDataProcessor.load_channel_data(SyntheticList(channels=20, fav_lists=3, fav_size=3).sdx())
+        del data.fav_lists_indices[1]
+        assert data.add_fav_list("Deportes") == 1
+        assert isinstance(data.fav_models[1], FavListModel) and len(data.fav_models[1]) == 0
+        assert data.all_data_objects[data.fav_lists_indices[1]] == {
+            "fav_list_object_1": {"sNoOfTVFavor": 0, "sNoOfRadioFavor": 0, "stProgNo": []}}
+        assert data.add_fav_list("Cine") == 3
+
+        names = data.all_data_objects[data.fav_names_obj_index]["fav_list_info_in_box_object"]
+        box = next(obj["box_object"] for obj in data.all_data_objects if "box_object" in obj)
+        assert names["aucFavReName"][3] == "Cine"
+        assert box["aucFavReName"] == names["aucFavReName"]
+        assert box["ucFavNameChangeMask"] & (1 << 3)
+
+    def test_add_fav_list_reloads(self):
+        """Test a new list survives a reload and keeps the file valid."""
+        data = ChannelDataProcessor.load_channel_data(SyntheticList(channels=20, fav_lists=2, fav_size=3).sdx())
+        fav_idx = data.add_fav_list("Nueva")
+        assert validate_sdx(data.all_data_objects).ok
+        reloaded = ChannelDataProcessor.load_channel_data(data.all_data_objects)
+        assert fav_idx in reloaded.fav_lists_indices and len(reloaded.fav_models[fav_idx]) == 0
+
+    def test_add_fav_list_without_names(self):
+        """Test an empty editor state gets list 0 and no names object."""
+        data = ChannelData()
+        assert data.add_fav_list("Nueva") == 0
+        assert data.all_data_objects == [
+            {"fav_list_object_0": {"sNoOfTVFavor": 0, "sNoOfRadioFavor": 0, "stProgNo": []}}]
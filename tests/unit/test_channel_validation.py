@@ -0,0 +1,135 @@
+"""
+Unit tests for the SDX integrity validator.
+"""
+
+import time
+
+import sdx_cli
+from channel_models import make_fav_entry
+from channel_processor import ChannelDataProcessor
+from channel_validation import (DUPLICATE_PROGRAM, FAV_BIT_MISMATCH, FAV_COUNT_MISMATCH,
+                                FAV_MISSING_PROGRAM, MISSING_SATELLITE, MISSING_TRANSPONDER,
+                                validate_sdx, validate_sdx_files)
+from tests.fixtures.synthetic import SyntheticList
+
+
+def find(objects, name):
+    for obj in objects:
+        if name in obj:
+            return obj[name]
+
+
+class TestValidateSdx:
+    """Test every kind of problem is found, and only those."""
+
+    def test_clean_file(self):
+        """Test a consistent lineup has no problems."""
+        report = validate_sdx(SyntheticList(channels=500, fav_size=50).sdx())
+        assert report.ok and report.programs == 500
+        assert report.summary() == "no problems in 500 programs"
+
+    def test_broken_references(self):
+        """Test missing programs, transponders and satellites are errors."""
+        objects = SyntheticList(satellites=2, channels=40, fav_lists=2, fav_size=5).sdx()
+        find(objects, 'fav_list_object_1')['stProgNo'].append(make_fav_entry(9999, 1))
+        find(objects, 'fav_list_object_1')['sNoOfTVFavor'] += 1
+        find(objects, 'program_tv_object_3')['stProgNo'] = make_fav_entry(77, 50)
+        find(objects, 'transponder_object_2')['stFlag']['SatIndex'] = 9
+        ChannelDataProcessor.update_fav_bits(objects)
+
+        report = validate_sdx(objects)
+        assert report.counts() == {FAV_MISSING_PROGRAM: 1, MISSING_TRANSPONDER: 1, MISSING_SATELLITE: 1}
+        assert len(report.errors) == 3
+        kind, obj_index, message = report.issues[0]
+        assert 'fav_list_object_1' in objects[obj_index]
+        assert message == ("fav_list_object_1 entry 6 points to SID 9999 on transponder 1, "
+                           "which has no program")
+
+    def test_duplicates_and_counts_are_warnings(self):
+        """Test duplicate (SID, TP) programs and wrong list counts are warnings."""
+        objects = SyntheticList(channels=40, fav_lists=1, fav_size=5).sdx()
+        find(objects, 'program_tv_object_7')['stProgNo'] = dict(find(objects, 'program_tv_object_2')['stProgNo'])
+        find(objects, 'fav_list_object_0')['stProgNo'] = [dict(find(objects, 'program_tv_object_2')['stProgNo'])]
+        find(objects, 'fav_list_object_0')['sNoOfTVFavor'] = 4
+        ChannelDataProcessor.update_fav_bits(objects)
+
+        report = validate_sdx(objects)
+        assert report.counts() == {DUPLICATE_PROGRAM: 1, FAV_COUNT_MISMATCH: 1}
+        assert report.errors == []
+        assert "like program_tv_object_2" in report.issues[0][2]
+
+    def test_fav_bit_mismatch(self):
+        """Test FavBit values that disagree with the lists are reported until recomputed."""
+        objects = SyntheticList(channels=40, fav_lists=2, fav_size=5).sdx()
+        for obj in objects:
+            for key, data in obj.items():
+                if key.startswith('program_tv_object_'):
+                    data['FavBit'] = 0
+        report = validate_sdx(objects)
+        assert set(report.counts()) == {FAV_BIT_MISMATCH}
+        ChannelDataProcessor.update_fav_bits(objects)
+        assert validate_sdx(objects).ok
+
+    def test_skips_junk(self):
+        """Test non-dict values and unknown objects are ignored."""
+        assert validate_sdx([3, "x", {}, {'box_object': {}}, {'transponder_object_x': {}}]).ok
+
+    def test_linear_time(self):
+        """Test validating a file ten times larger takes far less than a hundred times longer."""
+        def best_time(channels):
+            objects = SyntheticList(channels=channels, fav_lists=8, fav_size=channels // 5).sdx()
+            for obj in objects:
+                if 'fav_list_object_0' in obj:
+                    obj['fav_list_object_0']['stProgNo'] += [make_fav_entry(sid, 60000)
+                                                            for sid in range(channels // 5)]
+            times = []
+            for _ in range(3):
+                start = time.perf_counter()
+                report = validate_sdx(objects)
+                times.append(time.perf_counter() - start)
+            assert report.counts()[FAV_MISSING_PROGRAM] == channels // 5
+            return min(times)
+
+        # Linear is 10x plus cache effects (up to about 25x measured); quadratic is 100x
+        assert best_time(20000) < 50 * best_time(2000)
+
+
+class TestValidateFiles:
+    """Test batch validation and the validate command."""
+
+    def write(self, path, objects):
+        sdx_cli.save_sdx(str(path), objects)
+        return str(path)
+
+    def broken(self):
+        objects = SyntheticList(channels=30, fav_lists=1, fav_size=3).sdx()
+        find(objects, 'fav_list_object_0')['stProgNo'].append(make_fav_entry(9999, 0))
+        find(objects, 'fav_list_object_0')['sNoOfTVFavor'] += 1
+        return objects
+
+    def test_pool(self, tmp_path):
+        """Test every file gets its report and unreadable files are errors."""
+        good = self.write(tmp_path / 'good.sdx', SyntheticList(channels=30).sdx())
+        bad = self.write(tmp_path / 'bad.sdx', self.broken())
+        missing = str(tmp_path / 'missing.sdx')
+        reports, errors = validate_sdx_files([good, bad, missing], max_workers=2)
+        assert reports[good].ok and not reports[bad].ok
+        assert list(errors) == [missing]
+
+    def test_command(self, tmp_path, capsys):
+        """Test the command lists the issues and fails when a file has errors."""
+        good = self.write(tmp_path / 'good.sdx', SyntheticList(channels=30).sdx())
+        assert sdx_cli.main(['validate', good]) == 0
+        bad = self.write(tmp_path / 'bad.sdx', self.broken())
+        assert sdx_cli.main(['validate', good, bad, '--workers', '2']) == 1
+        out = capsys.readouterr().out
+        assert f"{bad}: 1 fav_missing_program\n" in out
+        assert "  [fav_missing_program] fav_list_object_0 entry 4 points to SID 9999" in out
+
+    def test_command_limit(self, tmp_path, capsys):
+        """Test --limit caps the issues listed per file."""
+        objects = SyntheticList(channels=30, fav_lists=1, fav_size=3).sdx()
+        find(objects, 'fav_list_object_0')['stProgNo'] += [make_fav_entry(sid, 9) for sid in range(5)]
+        path = self.write(tmp_path / 'bad.sdx', objects)
+        sdx_cli.main(['validate', path, '--limit', '2'])
+        assert "  ... " in capsys.readouterr().out
@@ -2,8 +2,14 @@
 Unit tests for CHL to SDX conversion functionality.
 """
 
+import gc
+import io
+import json
+import tracemalloc
+
 import pytest
-from channel_processor import ChannelDataProcessor
+from channel_processor import ChannelDataProcessor, paused_gc
+from channel_validation import validate_sdx
 
 
 class TestCHLToSDXConversion:
@@ -138,7 +144,7 @@ class TestCHLToSDXConversion:
             
             result = ChannelDataProcessor.convert_chl_to_sdx(chl_data)
             ch = result[0]['program_tv_object_0']
-            assert ch['ucVideoCodec'] == expected_codec
+            assert ch['uiSet']['uiBit']['VideoCodec'] == expected_codec
         
     def test_convert_chl_to_sdx_hd_detection(self):
         """Test HD flag detection based on video type."""
@@ -191,6 +197,26 @@ class TestCHLToSDXConversion:
             assert ch['uiSet']['uiBit']['HD'] == 0
             assert ch['SDTServiceType'] == 1  # SD service type
         
+    def test_convert_chl_to_sdx_hd_from_name(self):
+        """Test a channel named HD is flagged HD whatever its codec."""
+        result = ChannelDataProcessor.convert_chl_to_sdx(
+            {'channels': [{'Index': 0, 'Name': 'La 1 HD', 'SID': '1', 'VideoType': 'H264'}]})
+        ch = result[0]['program_tv_object_0']
+        assert ch['uiSet']['uiBit']['HD'] == 1
+        assert ch['SDTServiceType'] == 25
+
+    def test_convert_chl_to_sdx_audio_tracks(self):
+        """Test Audio records become the AudioArray, with codec and language codes."""
+        audio = [{'PID': 101, 'Type': 'AAC', 'Lang': 'eng'},
+                 {'PID': 102, 'Type': 'MPEG', 'Lang': 'xyz', 'DolbyAC3': 1}]
+        result = ChannelDataProcessor.convert_chl_to_sdx(
+            {'channels': [{'Index': 0, 'SID': '1', 'Audio': audio, 'VideoPID': 300}]})
+        ch = result[0]['program_tv_object_0']
+        assert ch['AudioArray'] == [{'PID': 101, 'Mode': 0, 'Lang': 69, 'Codec': 1},
+                                    {'PID': 102, 'Mode': 0, 'Lang': 0, 'Codec': 2}]
+        assert ch['ucAudioPID'] == 2
+        assert ch['PCRPID'] == 300
+
     def test_convert_chl_to_sdx_audio_language_mapping(self):
         """Test audio language code mapping."""
         test_cases = [
@@ -223,7 +249,7 @@ class TestCHLToSDXConversion:
             
             result = ChannelDataProcessor.convert_chl_to_sdx(chl_data)
             ch = result[0]['program_tv_object_0']
-            assert ch['language_code'] == expected_code
+            assert ch['AudioArray'][0]['Lang'] == expected_code
         
     def test_convert_chl_to_sdx_ca_flag(self):
         """Test CA (encryption) flag conversion."""
@@ -250,11 +276,11 @@ class TestCHLToSDXConversion:
             assert ch['uiSet']['uiBit']['CA'] == ca_value
         
     def test_convert_chl_to_sdx_favorites(self):
-        """Test favorites list conversion."""
+        """Test favourite entries resolve to the SID and transponder of their channels."""
         chl_data = {
             'satellites': [],
             'transponders': [],
-            'channels': [],
+            'channels': [{'Index': i, 'SID': str(200 + i), 'TPIndex': i % 3} for i in range(7)],
             'favorites': [
                 {'Index': 0, 'Name': 'News', 'Channels': [0, 1, 2]},
                 {'Index': 1, 'Name': 'Sports', 'Channels': [5, 6]}
@@ -267,12 +293,47 @@ class TestCHLToSDXConversion:
         assert len(fav_objects) == 2
         
         fav0 = fav_objects[0]['fav_list_object_0']
-        assert fav0['usTotalNO'] == 3
-        assert len(fav0['entries']) == 3
+        assert fav0['sNoOfTVFavor'] == 3
+        assert [entry['unShort'] for entry in fav0['stProgNo']] == [
+            {'sLo16': 200, 'sHi16': 0}, {'sLo16': 201, 'sHi16': 1}, {'sLo16': 202, 'sHi16': 2}]
         
         fav1 = fav_objects[1]['fav_list_object_1']
-        assert fav1['usTotalNO'] == 2
-        assert len(fav1['entries']) == 2
+        assert fav1['sNoOfTVFavor'] == 2
+        assert [entry['unShort'] for entry in fav1['stProgNo']] == [
+            {'sLo16': 205, 'sHi16': 2}, {'sLo16': 206, 'sHi16': 0}]
+        assert [entry['uiWord32'] for entry in fav1['stProgNo']] == [(2 << 16) | 205, 206]
+
+    def test_convert_chl_to_sdx_favorites_tv_and_radio(self):
+        """Test TVChs and RadioChs lists are read like Channels, unknown indices skipped."""
+        chl_data = {
+            'channels': [{'Index': 10, 'SID': '1', 'TPIndex': 4}, {'Index': 11, 'SID': '2', 'TPIndex': 4}],
+            'favorites': [{'Index': 0, 'Name': 'Mix', 'TVChs': [11, 12], 'RadioChs': [10]}]
+        }
+        
+        result = ChannelDataProcessor.convert_chl_to_sdx(chl_data)
+        
+        fav0 = next(obj['fav_list_object_0'] for obj in result if 'fav_list_object_0' in obj)
+        assert [entry['unShort'] for entry in fav0['stProgNo']] == [
+            {'sLo16': 2, 'sHi16': 4}, {'sLo16': 1, 'sHi16': 4}]
+        assert fav0['sNoOfTVFavor'] == 2
+
+    def test_convert_chl_to_sdx_favorites_large_input(self):
+        """Test every entry of large favourite lists points at its own channel."""
+        count = 60000
+        chl_data = {
+            'channels': [{'Index': i, 'SID': str(i % 65536), 'TPIndex': i // 1000} for i in range(count)],
+            'favorites': [{'Index': f, 'Name': f'Lista {f}', 'TVChs': list(range(f, count, 7))}
+                          for f in range(7)]
+        }
+        
+        result = ChannelDataProcessor.convert_chl_to_sdx(chl_data)
+        
+        for fav in chl_data['favorites']:
+            fav_obj = next(obj for obj in result if f"fav_list_object_{fav['Index']}" in obj)[
+                f"fav_list_object_{fav['Index']}"]
+            assert [(e['unShort']['sHi16'] << 16) | e['unShort']['sLo16']
+                    for e in fav_obj['stProgNo']] == [((i // 1000) << 16) | i for i in fav['TVChs']]
+            assert fav_obj['sNoOfTVFavor'] == len(fav['TVChs'])
         
     def test_convert_chl_to_sdx_favorite_names_box(self):
         """Test creation of fav_list_info_in_box_object with favorite names."""
@@ -292,12 +353,11 @@ class TestCHLToSDXConversion:
         assert len(box_objects) == 1
         
         box = box_objects[0]['fav_list_info_in_box_object']
-        assert box['ucTotalFavList'] == 2
-        assert len(box['FavListName']) == 2
-        
-        # Names should be padded/truncated to 16 chars
-        assert len(box['FavListName'][0]) == 16
-        assert len(box['FavListName'][1]) == 16
+        # One name per list index, at least 8, with the unnamed ones filled in
+        assert box['aucFavReName'] == ['News', 'VeryLongNameThatExceeds16Chars'] + [
+            f'Lista {i}' for i in range(2, 8)]
+        assert box['ucFavNameChangeMask'] == 0xFF
+        assert result[-1] == {'box_object': box}
         
     def test_convert_chl_to_sdx_empty_data(self):
         """Test conversion with empty CHL data."""
@@ -312,3 +372,153 @@ class TestCHLToSDXConversion:
         
         # Should return empty list
         assert result == []
+
+    def test_convert_chl_to_sdx_objects_do_not_share_state(self):
+        """Test objects cloned from the same template can be edited independently."""
+        chl_data = {
+            'satellites': [{'Index': 0, 'Angle': '192'}, {'Index': 1, 'Angle': '130'}],
+            'transponders': [{'Index': 0}, {'Index': 1}],
+            'channels': [{'Index': 0, 'SID': '1'}, {'Index': 1, 'SID': '2'}],
+        }
+        result = ChannelDataProcessor.convert_chl_to_sdx(chl_data)
+        sat0, sat1 = result[0]['satellite_object_0'], result[1]['satellite_object_1']
+        sat0['tuner2_antena']['uiSet']['uiBit']['Motor'] = 1
+        assert sat1['tuner2_antena']['uiSet']['uiBit']['Motor'] == 0
+        tp0, tp1 = result[2]['transponder_object_0'], result[3]['transponder_object_1']
+        assert tp0['stFlag'] is not tp1['stFlag']
+        ch0, ch1 = result[4]['program_tv_object_0'], result[5]['program_tv_object_1']
+        ch0['uiSet']['uiBit']['Skip'] = 1
+        assert ch1['uiSet']['uiBit']['Skip'] == 0
+        assert list(ch0) == list(ch1)
+
+    def test_convert_chl_to_sdx_field_order(self):
+        """Test template cloning keeps the field order the receiver expects."""
+        result = ChannelDataProcessor.convert_chl_to_sdx({'channels': [{'Index': 0}]})
+        assert list(result[0]['program_tv_object_0'])[:4] == [
+            'uiStartCode', 'ucNameLen', 'ucAudioPID', 'ucSubPID']
+
+    def test_convert_sdx_to_chl_round_trip(self):
+        """Test CHL -> SDX -> CHL keeps channels, transponders and favourites."""
+        chl_data = {
+            'satellites': [{'Index': 0, 'Name': 'Astra', 'Angle': '192'}],
+            'transponders': [{'Index': 0, 'Freq': '10729', 'SR': '22000', 'Pol': 'V', 'SatIndex': 0}],
+            'channels': [{'Index': i, 'Name': f'Canal {i}', 'SID': str(100 + i), 'TPIndex': 0,
+                          'VideoType': 'HEVC', 'CA': 2,
+                          'Audio': [{'PID': 50, 'Type': 'AC3', 'Lang': 'ger', 'DolbyAC3': 1}]}
+                         for i in range(3)],
+            'favorites': [{'Index': 1, 'Name': 'Cine', 'TVChs': [2, 0]}],
+        }
+        chl = ChannelDataProcessor.convert_sdx_to_chl(ChannelDataProcessor.convert_chl_to_sdx(chl_data))
+        assert chl[0] == {'Type': 'index', 'Ver': 1, 'Sat': 1, 'TP': 1, 'ChTV': 3, 'CHRadio': 0, 'FAV': 1}
+        assert chl[1] == {'Type': 'fav', 'Index': 1, 'Name': 'Cine', 'TVChs': [2, 0], 'RadioChs': []}
+        assert (chl[3]['Freq'], chl[3]['Pol']) == ('10729', 'V')
+        ch = chl[4]
+        assert (ch['Index'], ch['SID'], ch['TPIndex'], ch['VideoType'], ch['CA']) == (0, '100', 0, 'HEVC', 2)
+        assert ch['Audio'] == [{'PID': 50, 'Type': 'AC3', 'Lang': 'ger', 'DolbyAC3': 1}]
+
+    def test_paused_gc_restores_state(self):
+        """Test the collector is re-enabled only if it was enabled before."""
+        assert gc.isenabled()
+        with paused_gc():
+            assert not gc.isenabled()
+        assert gc.isenabled()
+        gc.disable()
+        try:
+            with paused_gc():
+                pass
+            assert not gc.isenabled()
+        finally:
+            gc.enable()
+
+
+def write_chl(path, channels, favourites_first=True):
+    """Write a CHL file with up to 10 transponders and two favourite lists."""
+    objects = [{'Type': 'sat', 'Index': 0, 'Name': 'Astra', 'Angle': '192'}]
+    objects += [{'Type': 'tp', 'Index': i, 'Freq': str(10700 + i), 'SR': '22000', 'Pol': 'V', 'SatIndex': 0}
+                for i in range(min(10, max(1, channels // 10)))]
+    favs = [{'Type': 'fav', 'Index': 0, 'Name': 'Todos', 'Channels': [2, 0, 99999]},
+            {'Type': 'fav', 'Index': 1, 'Name': 'Vacía', 'Channels': []}]
+    chs = [{'Type': 'ch', 'Index': i, 'Name': f'Canal {i}', 'SID': str(100 + i), 'TPIndex': i // 10 % 10,
+            'VideoType': 'H264', 'AudioLang': 'spa', 'CA': i % 2} for i in range(channels)]
+    objects = favs + objects + chs if favourites_first else objects + chs + favs
+    with open(path, 'w', encoding='utf-8') as f:
+        for obj in objects:
+            f.write(json.dumps(obj, indent=2) + '\n')
+
+
+class TestStreamingConversion:
+    """Test the bounded-memory CHL to SDX pipeline."""
+
+    @pytest.mark.parametrize('chunk_size', [1, 3, 7, 64, 4096])
+    def test_iter_objects_matches_decode_objects(self, chunk_size):
+        """Test objects cut by chunk boundaries decode as in one piece, garbage included."""
+        text = 'x{"a": 1} junk [1, 2] 12 34 {"b": "}\\u00e9", "c": true, "d": -1.5e3}zz{"e": []}'
+        expected = ChannelDataProcessor.decode_objects(text)
+        assert list(ChannelDataProcessor.iter_objects(io.StringIO(text), chunk_size)) == expected
+
+    @pytest.mark.parametrize('favourites_first', [True, False])
+    def test_convert_chl_file_matches_in_memory(self, tmp_path, favourites_first):
+        """Test the streamed file holds the in-memory objects, in the same order."""
+        chl = tmp_path / 'in.chl'
+        write_chl(chl, 50, favourites_first)
+        counts = ChannelDataProcessor.convert_chl_file(str(chl), str(tmp_path / 'out.sdx'), chunk_size=256)
+        assert counts == {'satellites': 1, 'transponders': 5, 'channels': 50, 'favorites': 2}
+
+        streamed = ChannelDataProcessor.decode_objects((tmp_path / 'out.sdx').read_text(encoding='utf-8'))
+        in_memory = ChannelDataProcessor.convert_chl_to_sdx(ChannelDataProcessor.parse_chl_file(str(chl)))
+        assert streamed == in_memory
+        assert [next(iter(obj)) for obj in streamed[56:]] == [
+            'fav_list_object_0', 'fav_list_object_1', 'fav_list_info_in_box_object', 'box_object']
+        assert not (tmp_path / 'out.sdx.tmp').exists()
+
+    def test_convert_chl_file_resolves_favourites(self, tmp_path):
+        """Test favourite entries carry the SID and transponder of their channels."""
+        chl = tmp_path / 'in.chl'
+        write_chl(chl, 30)
+        ChannelDataProcessor.convert_chl_file(str(chl), str(tmp_path / 'out.sdx'))
+        objects = ChannelDataProcessor.decode_objects((tmp_path / 'out.sdx').read_text(encoding='utf-8'))
+        fav = next(obj['fav_list_object_0'] for obj in objects if 'fav_list_object_0' in obj)
+        assert [entry['unShort'] for entry in fav['stProgNo']] == [
+            {'sLo16': 102, 'sHi16': 0}, {'sLo16': 100, 'sHi16': 0}]
+        assert fav['sNoOfTVFavor'] == 2
+
+    @pytest.mark.parametrize('favourites_first', [True, False])
+    def test_converted_file_validates(self, tmp_path, favourites_first):
+        """Test both converters set FavBit, so their output validates without errors."""
+        chl = tmp_path / 'in.chl'
+        write_chl(chl, 30, favourites_first)
+        ChannelDataProcessor.convert_chl_file(str(chl), str(tmp_path / 'out.sdx'), chunk_size=256)
+        streamed = ChannelDataProcessor.decode_objects((tmp_path / 'out.sdx').read_text(encoding='utf-8'))
+        in_memory = ChannelDataProcessor.convert_chl_to_sdx(ChannelDataProcessor.parse_chl_file(str(chl)))
+        for objects in (streamed, in_memory):
+            assert validate_sdx(objects).errors == []
+            bits = {key: data['FavBit'] for obj in objects for key, data in obj.items()
+                    if key.startswith('program_tv_object_') and data['FavBit']}
+            assert bits == {'program_tv_object_0': 1, 'program_tv_object_2': 1}
+
+    def test_fav_bits_follow_packed_key(self):
+        """Test every program with a listed (SID, transponder) gets the list's bit."""
+        chl_data = {
+            'satellites': [], 'transponders': [],
+            'channels': [{'Index': i, 'Name': f'Canal {i}', 'SID': '100', 'TPIndex': 0} for i in range(2)]
+                        + [{'Index': 2, 'Name': 'Canal 2', 'SID': '101', 'TPIndex': 0}],
+            'favorites': [{'Index': 0, 'Name': 'Todos', 'Channels': [1, 2]},
+                          {'Index': 3, 'Name': 'Cine', 'Channels': [2]}]
+        }
+        objects = ChannelDataProcessor.convert_chl_to_sdx(chl_data)
+        assert [obj[f'program_tv_object_{i}']['FavBit'] for i, obj in enumerate(objects[:3])] == [1, 1, 9]
+
+    def test_convert_chl_file_memory_is_bounded(self, tmp_path):
+        """Test peak memory does not grow with the number of channels."""
+        peaks = []
+        for channels in (1000, 4000):
+            chl = tmp_path / f'{channels}.chl'
+            write_chl(chl, channels)
+            tracemalloc.start()
+            try:
+                ChannelDataProcessor.convert_chl_file(str(chl), str(tmp_path / 'out.sdx'), chunk_size=4096)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+        assert peaks[1] < peaks[0] * 1.5
+        assert peaks[1] < chl.stat().st_size / 4
@@ -0,0 +1,42 @@
+"""
+Unit tests for the editor's deferred imports.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Only needed by --profile or by rarely used operations
+DEFERRED = ("cProfile", "pstats", "tracemalloc", "latency", "channel_validation",
+            "channel_diff")
+
+
+def loaded_modules(code):
+    """Modules loaded by a fresh interpreter after running code in the repository root."""
+    script = f"import json, sys\n{code}\nprint(json.dumps(sorted(sys.modules)))"
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    for name in ("EDITOR_CANALES_PROFILE", "EDITOR_CANALES_STARTUP_PROFILE"):
+        env.pop(name, None)
+    out = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return set(json.loads(out))
+
+
+class TestDeferredImports:
+    """Test starting the editor does not load modules it only needs on use."""
+
+    def test_editor_import(self):
+        """Test importing the editor leaves the deferred modules unloaded."""
+        assert loaded_modules("import editor_canales").isdisjoint(DEFERRED)
+
+    def test_disabled_profiler(self):
+        """Test a disabled profiler records phases without loading cProfile or tracemalloc."""
+        modules = loaded_modules(
+            "from profiling import PhaseProfiler\n"
+            "profiler = PhaseProfiler.from_environment([])\n"
+            "with profiler.phase('leer'):\n    pass\n"
+            "profiler.finish('Cargar')")
+        assert modules.isdisjoint(DEFERRED)
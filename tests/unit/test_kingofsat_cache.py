@@ -0,0 +1,157 @@
+"""
+Unit tests for the on-disk KingOfSat page cache.
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import URLError
+
+import pytest
+import kingofsat
+from kingofsat import fetch_kingofsat_packages
+from kingofsat_cache import KingOfSatCache
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    """Test server that ignores clients closing keep-alive connections."""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def page(*rows):
+    """Build a page with one transponder and (name, sid) channel rows."""
+    return '<td class="bld">10758.50</td>' + ''.join(
+        f'<tr data-channel-id="{sid}"><td><a class="A3">{name}</a></td><td class="s">{sid}</td></tr>'
+        for name, sid in rows)
+
+
+@pytest.fixture
+def server():
+    """
+    Serve state['body'] with an ETag and Last-Modified.
+
+    Conditional requests that match the current ETag get a 304. Every
+    request's If-None-Match header is appended to state['requests'].
+    """
+    state = {'body': page(('Uno', 1), ('Dos', 2)), 'etag': '"v1"', 'requests': []}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            state['requests'].append(self.headers.get('If-None-Match'))
+            if self.headers.get('If-None-Match') == state['etag']:
+                self.send_response(304)
+                self.send_header('ETag', state['etag'])
+                self.end_headers()
+                return
+            body = state['body'].encode('utf-8')
+            self.send_response(200)
+            self.send_header('ETag', state['etag'])
+            self.send_header('Last-Modified', 'Mon, 05 Oct 2026 10:00:00 GMT')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = QuietHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True).start()
+    state['url'] = f'http://127.0.0.1:{httpd.server_address[1]}/pack-test'
+    yield state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def names(cache, url):
+    return [ch['name'] for batch in cache.stream(url) for ch in batch]
+
+
+class TestKingOfSatCache:
+    """Test cache hits, revalidation, offline mode and eviction."""
+
+    def test_miss_then_fresh_hit_skips_network(self, server, tmp_path):
+        """Test a fresh entry is served without any request."""
+        cache = KingOfSatCache(str(tmp_path))
+        assert names(cache, server['url']) == ['Uno', 'Dos']
+        assert cache.status[server['url']] == 'downloaded'
+        assert names(cache, server['url']) == ['Uno', 'Dos']
+        assert cache.status[server['url']] == 'hit'
+        assert len(server['requests']) == 1
+
+    def test_stale_entry_revalidated_with_304(self, server, tmp_path):
+        """Test a stale entry sends If-None-Match and reuses the stored channels."""
+        cache = KingOfSatCache(str(tmp_path), ttl=0)
+        names(cache, server['url'])
+        server['body'] = page(('Cambiada', 9))
+        assert names(cache, server['url']) == ['Uno', 'Dos']
+        assert server['requests'] == [None, '"v1"']
+        assert cache.status[server['url']] == 'revalidated'
+
+    def test_changed_page_is_downloaded_again(self, server, tmp_path):
+        """Test a new ETag replaces the stored page and channels."""
+        cache = KingOfSatCache(str(tmp_path), ttl=0)
+        names(cache, server['url'])
+        server['body'] = page(('Nueva', 3))
+        server['etag'] = '"v2"'
+        assert names(cache, server['url']) == ['Nueva']
+        assert cache.lookup(server['url'])['etag'] == '"v2"'
+
+    def test_offline_serves_stale_entries(self, server, tmp_path):
+        """Test offline mode serves old entries and fails on misses."""
+        names(KingOfSatCache(str(tmp_path)), server['url'])
+        offline = KingOfSatCache(str(tmp_path), ttl=0, offline=True)
+        assert names(offline, server['url']) == ['Uno', 'Dos']
+        with pytest.raises(URLError):
+            names(offline, server['url'] + '-otro')
+        assert len(server['requests']) == 1
+
+    def test_parser_version_change_reparses_stored_page(self, server, tmp_path, monkeypatch):
+        """Test entries from an older parser are re-parsed from disk, not downloaded."""
+        cache = KingOfSatCache(str(tmp_path))
+        names(cache, server['url'])
+        monkeypatch.setattr(kingofsat, 'PARSER_VERSION', kingofsat.PARSER_VERSION + 1)
+        assert names(cache, server['url']) == ['Uno', 'Dos']
+        assert cache.lookup(server['url'])['parser_version'] == kingofsat.PARSER_VERSION
+        assert len(server['requests']) == 1
+
+    def test_lru_eviction_keeps_recent_entries(self, server, tmp_path):
+        """Test the least recently used entry is evicted when over the size cap."""
+        cache = KingOfSatCache(str(tmp_path))
+        urls = [server['url'] + suffix for suffix in ('-a', '-b', '-c')]
+        for i, url in enumerate(urls):
+            names(cache, url)
+            meta_path, _ = cache._paths(url)
+            os.utime(meta_path, (1000 + i, 1000 + i))
+        names(cache, urls[0])          # hit: urls[0] becomes the most recent
+        cache.max_bytes = sum(os.path.getsize(path) for url in (urls[0], urls[2])
+                              for path in cache._paths(url))
+        cache.evict()
+        assert cache.lookup(urls[0]) is not None
+        assert cache.lookup(urls[1]) is None
+        assert cache.lookup(urls[2]) is not None
+
+    def test_interrupted_download_is_not_stored(self, server, tmp_path):
+        """Test closing the stream mid-page leaves no entry or temporary file."""
+        server['body'] = page(*[(f'Canal {i}', i) for i in range(1, 2000)])
+        cache = KingOfSatCache(str(tmp_path))
+        batches = cache.stream(server['url'], chunk_size=1024)
+        next(batches)
+        batches.close()
+        assert cache.lookup(server['url']) is None
+        assert os.listdir(tmp_path) == []
+
+    def test_fetch_packages_through_cache(self, server, tmp_path):
+        """Test the multi-package fetcher uses the cache when given one."""
+        cache = KingOfSatCache(str(tmp_path))
+        for _ in range(2):
+            channels, errors = fetch_kingofsat_packages([server['url']], min_interval=0, cache=cache)
+            assert [ch['name'] for ch in channels] == ['Uno', 'Dos']
+        assert len(server['requests']) == 1
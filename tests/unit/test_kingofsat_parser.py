@@ -0,0 +1,373 @@
+"""
+Unit tests for the single-pass KingOfSat parser.
+"""
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from urllib.error import HTTPError
+from kingofsat import (
+    DEBUG_DUMP_ENV, HostRateLimiter, KingOfSatParser, fetch_kingofsat_packages,
+    find_kingofsat_pages, iter_kingofsat_channels, merge_kingofsat_channels,
+    parse_kingofsat_files, parse_kingofsat_html, stream_kingofsat_channels
+)
+
+
+def get_fixture_path(filename):
+    """Get the full path to a test fixture file."""
+    return os.path.join(os.path.dirname(__file__), '..', 'fixtures', filename)
+
+
+def read_fixture(filename):
+    with open(get_fixture_path(filename), encoding='utf-8') as f:
+        return f.read()
+
+
+def basic(ch):
+    """Keep only the name, SID and integer frequency of a parsed channel."""
+    return {'name': ch['name'], 'sid': ch['sid'], 'freq': ch['freq']}
+
+
+def make_page(transponders, channels_per_tp):
+    """Build a synthetic package page."""
+    parts = ['<html><table>']
+    sid = 1
+    for t in range(transponders):
+        parts.append(f'<tr><td class="bld">{10700 + t}.25</td></tr>')
+        for _ in range(channels_per_tp):
+            parts.append(f'<tr data-channel-id="{sid}"><td><a class="A3">Canal {sid}</a></td>'
+                         f'<td class="s">{sid}</td></tr>')
+            sid += 1
+    parts.append('</table></html>')
+    return ''.join(parts)
+
+
+class TestKingOfSatParser:
+    """Test the incremental single-pass KingOfSat parser."""
+
+    def test_parse_fixture(self):
+        """Test the sample page yields every channel with its frequency."""
+        result = parse_kingofsat_html(read_fixture('sample_kingofsat.html'))
+        assert [(ch['name'], ch['sid'], ch['freq']) for ch in result] == [
+            ('BBC World News', 28654, 10758),
+            ('CNN International', 28655, 10758),
+            ('Euronews', 29850, 11954),
+        ]
+
+    @pytest.mark.parametrize("step", [1, 7, 64])
+    def test_incremental_feed_matches_whole_page(self, step):
+        """Test feeding the page in small pieces gives the same result."""
+        html = read_fixture('sample_kingofsat.html')
+        parser = KingOfSatParser()
+        channels = []
+        for start in range(0, len(html), step):
+            parser.feed(html[start:start + step])
+            channels.extend(parser.pop_channels())
+        parser.close()
+        channels.extend(parser.pop_channels())
+        assert channels == parse_kingofsat_html(html)
+
+    @pytest.mark.parametrize("html", [
+        '<tr data-channel-id="1">MPEG-4/HD<a class="A3">X</a><td class="s">5</td>Conax</tr>',
+        read_fixture('sample_kingofsat_full.html'),
+    ], ids=["row", "full"])
+    def test_every_chunk_size(self, html):
+        """Test text tokens right after a tag survive a chunk boundary at any position."""
+        expected = parse_kingofsat_html(html)
+        assert any(ch['video'] and ch['ca'] for ch in expected)
+        for step in range(1, len(html) + 1):
+            parser = KingOfSatParser()
+            for start in range(0, len(html), step):
+                parser.feed(html[start:start + step])
+            parser.close()
+            assert parser.pop_channels() == expected, step
+
+    def test_generator_is_lazy(self):
+        """Test channels are produced before the whole page is consumed."""
+        channels = iter_kingofsat_channels(make_page(10, 10000))
+        first = next(channels)
+        assert basic(first) == {'name': 'Canal 1', 'sid': 1, 'freq': 10700}
+
+    def test_extra_attributes_and_entities(self):
+        """Test cells with extra attributes and character references."""
+        html = ('<td width="5%" class="bld">11538.00</td>'
+                '<tr class="x" data-channel-id="9"><td><a href="#" class="A3">M6 &amp; W9</a></td>'
+                '<td class="s">1024</td></tr>')
+        assert [basic(ch) for ch in parse_kingofsat_html(html)] == [{'name': 'M6 & W9', 'sid': 1024, 'freq': 11538}]
+
+    def test_non_numeric_sid_skipped(self):
+        """Test rows whose SID cell is not a plain number are ignored."""
+        html = '<tr data-channel-id="1"><a class="A3">X</a><td class="s">12a</td></tr>'
+        assert parse_kingofsat_html(html) == []
+
+    def test_frequency_in_other_bold_cells_ignored(self):
+        """Test bold cells that are not frequencies keep the current frequency."""
+        html = ('<td class="bld">10758.50</td><td class="bld">H</td><td class="bld">22000</td>'
+                '<tr data-channel-id="1"><a class="A3">X</a><td class="s">5</td></tr>')
+        assert parse_kingofsat_html(html)[0]['freq'] == 10758
+
+    def test_transponder_details(self):
+        """Test position, exact frequency, polarisation and symbol rate per block."""
+        result = parse_kingofsat_html(read_fixture('sample_kingofsat_full.html'))
+        assert [(ch['position'], ch['freq'], ch['freq_exact'], ch['pol'], ch['sr']) for ch in result] == [
+            (192, 10729, 10729.0, 'V', 22000),
+            (192, 10729, 10729.0, 'V', 22000),
+            (-300, 11092, 11092.5, 'H', 30000),
+        ]
+
+    def test_channel_video_and_ca(self):
+        """Test video format, HD flag and CA systems per channel."""
+        result = parse_kingofsat_html(read_fixture('sample_kingofsat_full.html'))
+        assert [(ch['name'], ch['video'], ch['hd'], ch['ca']) for ch in result] == [
+            ('Canal+ Foot', 'MPEG-4 HD', True, ['Nagravision 3', 'Viaccess 5']),
+            ('Radio Uno', '', False, []),
+            ('Conax & Co', 'HEVC UHD', True, ['Conax']),
+        ]
+
+    def test_missing_details_default_empty(self):
+        """Test pages without header details still parse with empty fields."""
+        channel = parse_kingofsat_html(read_fixture('sample_kingofsat.html'))[0]
+        assert (channel['pol'], channel['sr'], channel['position'], channel['ca']) == ('', 0, None, [])
+
+    def test_large_page_parses(self):
+        """Test a page with many transponders and channels parses completely."""
+        result = parse_kingofsat_html(make_page(500, 40))
+        assert len(result) == 20000
+        assert result[-1]['freq'] == 10700 + 499
+
+
+@pytest.fixture
+def kos_server():
+    """
+    Serve the sample page in throttled 16-byte chunks.
+
+    The server stops after the first channel row until the test sets the
+    returned event, so a test can check what was parsed mid-download.
+    """
+    body = read_fixture('sample_kingofsat.html').encode('utf-8')
+    pause_at = body.index(b'</tr>', body.index(b'BBC')) + len(b'</tr>')
+    release = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            for start in range(0, len(body), 16):
+                end = min(start + 16, len(body))
+                if start < pause_at <= end:
+                    self.wfile.write(body[start:pause_at])
+                    self.wfile.flush()
+                    release.wait(5)
+                    self.wfile.write(body[pause_at:end])
+                else:
+                    self.wfile.write(body[start:end])
+                self.wfile.flush()
+                time.sleep(0.001)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/pack-test', release
+    release.set()
+    server.shutdown()
+    server.server_close()
+
+
+class TestStreamKingOfSat:
+    """Test downloading and parsing a page at the same time."""
+
+    def test_first_channel_before_download_ends(self, kos_server):
+        """Test channels are yielded while the server is still sending."""
+        url, release = kos_server
+        batches = stream_kingofsat_channels(url)
+        first = next(batches)
+        assert not release.is_set()
+        assert basic(first[0]) == {'name': 'BBC World News', 'sid': 28654, 'freq': 10758}
+        release.set()
+        channels = first + [ch for batch in batches for ch in batch]
+        assert channels == parse_kingofsat_html(read_fixture('sample_kingofsat.html'))
+
+    def test_progress_reports_bytes(self, kos_server):
+        """Test progress receives the running byte count and Content-Length."""
+        url, release = kos_server
+        release.set()
+        calls = []
+        list(stream_kingofsat_channels(url, progress=lambda received, total: calls.append((received, total))))
+        size = os.path.getsize(get_fixture_path('sample_kingofsat.html'))
+        assert calls[-1] == (size, size)
+        assert [received for received, _ in calls] == sorted(received for received, _ in calls)
+
+    def test_debug_dump_is_opt_in(self, kos_server, tmp_path, monkeypatch):
+        """Test the raw page is saved only when the environment variable is set."""
+        url, release = kos_server
+        release.set()
+        dump = tmp_path / 'page.html'
+        monkeypatch.setenv(DEBUG_DUMP_ENV, str(dump))
+        list(stream_kingofsat_channels(url))
+        assert dump.read_bytes() == open(get_fixture_path('sample_kingofsat.html'), 'rb').read()
+
+
+def channel_row(name, sid):
+    return f'<tr data-channel-id="{sid}"><td><a class="A3">{name}</a></td><td class="s">{sid}</td></tr>'
+
+
+PACKS = {
+    '/pack-a': '<td class="bld">10758.50</td>' + channel_row('A1', 1) + channel_row('Shared', 5),
+    '/pack-b': '<td class="bld">10758.50</td>' + channel_row('Shared again', 5) + channel_row('B1', 2),
+    '/pack-c': '<td class="bld">11954.00</td>' + channel_row('Shared', 5) + channel_row('C1', 3),
+}
+
+
+@pytest.fixture
+def packs_server():
+    """
+    Serve several package pages over HTTP/1.1 keep-alive.
+
+    Returns the base URL and a state dict: set state['barrier'] to make every
+    page request wait for the others; state['ports'] collects the client
+    ports that made requests.
+    """
+    state = {'barrier': None, 'ports': []}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            state['ports'].append(self.client_address[1])
+            if self.path == '/moved':
+                self.send_response(302)
+                self.send_header('Location', '/pack-a')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if self.path not in PACKS:
+                self.send_error(404)
+                return
+            if state['barrier'] is not None:
+                state['barrier'].wait()
+            body = PACKS[self.path].encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}', state
+    server.shutdown()
+    server.server_close()
+
+
+class TestFetchKingOfSatPackages:
+    """Test concurrent multi-package downloads."""
+
+    def test_merge_in_url_order_dedup_by_sid_and_freq(self, packs_server):
+        """Test results follow the URL order and repeat (sid, freq) pairs are dropped."""
+        base, _ = packs_server
+        urls = [f'{base}/pack-a', f'{base}/pack-b', f'{base}/pack-c']
+        channels, errors = fetch_kingofsat_packages(urls, min_interval=0)
+        assert errors == {}
+        assert [(ch['name'], ch['sid'], ch['freq']) for ch in channels] == [
+            ('A1', 1, 10758), ('Shared', 5, 10758), ('B1', 2, 10758),
+            ('Shared', 5, 11954), ('C1', 3, 11954),
+        ]
+
+    def test_pages_are_fetched_concurrently(self, packs_server):
+        """Test all pages are in flight at once (the server waits for all three)."""
+        base, state = packs_server
+        state['barrier'] = threading.Barrier(3, timeout=5)
+        urls = [f'{base}/pack-a', f'{base}/pack-b', f'{base}/pack-c']
+        channels, errors = fetch_kingofsat_packages(urls, max_workers=3, min_interval=0)
+        assert errors == {}
+        assert len(channels) == 5
+
+    def test_connection_is_reused(self, packs_server):
+        """Test one worker fetches every page over a single keep-alive connection."""
+        base, state = packs_server
+        urls = [f'{base}/pack-a', f'{base}/pack-b', f'{base}/moved']
+        fetch_kingofsat_packages(urls, max_workers=1, min_interval=0)
+        assert len(state['ports']) == 4
+        assert len(set(state['ports'])) == 1
+
+    def test_failed_page_reported_others_kept(self, packs_server):
+        """Test an HTTP error on one page does not lose the other pages."""
+        base, _ = packs_server
+        channels, errors = fetch_kingofsat_packages([f'{base}/missing', f'{base}/pack-a'], min_interval=0)
+        assert [ch['name'] for ch in channels] == ['A1', 'Shared']
+        assert isinstance(errors[f'{base}/missing'], HTTPError)
+        assert errors[f'{base}/missing'].code == 404
+
+    def test_callback_receives_batches(self, packs_server):
+        """Test on_channels receives each page's channels with its URL."""
+        base, _ = packs_server
+        seen = []
+        fetch_kingofsat_packages([f'{base}/pack-c'], on_channels=lambda url, batch: seen.extend(
+            (url, ch['name']) for ch in batch))
+        assert seen == [(f'{base}/pack-c', 'Shared'), (f'{base}/pack-c', 'C1')]
+
+    def test_merge_without_network(self):
+        """Test merging keeps the first channel of each (sid, freq)."""
+        a = [{'name': 'X', 'sid': 1, 'freq': 1}]
+        b = [{'name': 'Y', 'sid': 1, 'freq': 1}, {'name': 'Z', 'sid': 1, 'freq': 2}]
+        assert [ch['name'] for ch in merge_kingofsat_channels([a, b])] == ['X', 'Z']
+
+
+class TestHostRateLimiter:
+    """Test per-host request spacing."""
+
+    def test_same_host_is_spaced(self):
+        """Test consecutive requests to one host wait for the interval."""
+        limiter = HostRateLimiter(0.05)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.wait('example.org')
+        assert time.monotonic() - start >= 0.1
+
+    def test_other_hosts_do_not_wait(self):
+        """Test a different host gets its first slot immediately."""
+        limiter = HostRateLimiter(10)
+        limiter.wait('a.example.org')
+        start = time.monotonic()
+        limiter.wait('b.example.org')
+        assert time.monotonic() - start < 1
+
+
+class TestParseKingOfSatFiles:
+    """Test parsing saved pages offline in a process pool."""
+
+    def test_find_pages_sorted(self, tmp_path):
+        """Test only .html/.htm files are picked up, in name order."""
+        for name in ('b.htm', 'a.HTML', 'notes.txt'):
+            (tmp_path / name).write_text('')
+        (tmp_path / 'dir.html').mkdir()
+        assert [os.path.basename(p) for p in find_kingofsat_pages(str(tmp_path))] == ['a.HTML', 'b.htm']
+
+    def test_pages_merged_in_order(self, tmp_path):
+        """Test several pages are parsed and merged without duplicates."""
+        (tmp_path / '1.html').write_text(read_fixture('sample_kingofsat.html'), encoding='utf-8')
+        (tmp_path / '2.html').write_text(read_fixture('sample_kingofsat_full.html'), encoding='utf-8')
+        (tmp_path / '3.html').write_text(read_fixture('sample_kingofsat.html'), encoding='utf-8')
+        channels, errors = parse_kingofsat_files(find_kingofsat_pages(str(tmp_path)), max_workers=2)
+        assert errors == {}
+        assert [ch['name'] for ch in channels] == [
+            'BBC World News', 'CNN International', 'Euronews', 'Canal+ Foot', 'Radio Uno', 'Conax & Co']
+
+    def test_unreadable_page_reported(self, tmp_path):
+        """Test a missing file is reported and the others still parsed."""
+        good = get_fixture_path('sample_kingofsat.html')
+        missing = str(tmp_path / 'missing.html')
+        channels, errors = parse_kingofsat_files([missing, good])
+        assert list(errors) == [missing]
+        assert len(channels) == 3
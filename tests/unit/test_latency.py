@@ -0,0 +1,128 @@
+"""
+Unit tests for the Tk event-handler latency monitor.
+"""
+
+import io
+import tkinter
+import types
+
+import pytest
+from latency import THRESHOLD_ENV, HandlerStats, LatencyMonitor, handler_name
+
+
+class FakeWidget:
+    """Enough of a Tk widget for CallWrapper and Misc.after, without a display."""
+
+    def __init__(self):
+        self.registered = None
+        self.errors = 0
+        self.tk = types.SimpleNamespace(call=lambda *args: None)
+
+    def _register(self, func):
+        self.registered = func
+        return "job"
+
+    def deletecommand(self, name):
+        pass
+
+    def _report_exception(self):
+        self.errors += 1
+
+    def on_search(self):
+        pass
+
+
+@pytest.fixture
+def monitor():
+    monitor = LatencyMonitor(threshold=0.05, out=io.StringIO())
+    yield monitor
+    monitor.uninstall()
+
+
+class TestHandlerName:
+    """Test the names given to Tk callbacks."""
+
+    def test_bound_method(self):
+        """Test a bound method is named by its qualified name."""
+        assert handler_name(FakeWidget().on_search) == "FakeWidget.on_search"
+
+    def test_lambda(self):
+        """Test a lambda is named after the method it calls."""
+        widget = FakeWidget()
+        assert handler_name(lambda *args: widget.on_search()) == \
+            "TestHandlerName.test_lambda.<lambda on_search>"
+
+    def test_after_job(self):
+        """Test an after job is named after the function it schedules."""
+        widget = FakeWidget()
+        tkinter.Misc.after(widget, 10, widget.on_search)
+        assert handler_name(widget.registered) == "after FakeWidget.on_search"
+
+
+class TestHandlerStats:
+    """Test the latency histogram."""
+
+    def test_buckets_and_percentile(self):
+        """Test calls land in their bucket and p95 is the bound of the slow tail."""
+        stats = HandlerStats("h")
+        for _ in range(95):
+            stats.add(0.0005)
+        for _ in range(5):
+            stats.add(0.2)
+        assert stats.calls == 100 and stats.max == 0.2
+        assert stats.buckets[0] == 95 and sum(stats.buckets) == 100
+        assert stats.percentile(0.5) == 0.001
+        assert stats.percentile(0.99) == 0.2
+
+    def test_overflow_bucket(self):
+        """Test calls above the last bound use the real maximum."""
+        stats = HandlerStats("h")
+        stats.add(3.0)
+        assert stats.buckets[-1] == 1 and stats.percentile(0.95) == 3.0
+
+
+class TestLatencyMonitor:
+    """Test recording, slow-call logging and the CallWrapper hook."""
+
+    def test_slow_calls_are_logged_with_size(self, monitor):
+        """Test only calls over the threshold are logged, with the model size."""
+        monitor.size = lambda: "5000 canales"
+        monitor.record("fast", 0.001)
+        monitor.record("slow", 0.3)
+        assert monitor.slow == [("slow", 0.3, "5000 canales")]
+        assert monitor.out.getvalue() == "slow handler: slow 300 ms (5000 canales)\n"
+        assert [row[0] for row in monitor.rows()] == ["slow", "fast"]
+
+    def test_failing_size(self, monitor):
+        """Test an error computing the size does not break the handler."""
+        monitor.size = lambda: 1 / 0
+        monitor.record("slow", 0.3)
+        assert monitor.slow == [("slow", 0.3, None)]
+
+    def test_wrap(self, monitor):
+        """Test a wrapped function returns its result and is recorded."""
+        timed = monitor.wrap(lambda x: x * 2, name="double")
+        assert timed(4) == 8
+        assert monitor.rows()[0][:2] == ("double", 1)
+        monitor.reset()
+        assert monitor.rows() == []
+
+    def test_install_times_tk_callbacks(self, monitor):
+        """Test callbacks registered after install() are timed, errors included."""
+        original = tkinter.CallWrapper
+        monitor.install()
+        widget = FakeWidget()
+        tkinter.CallWrapper(widget.on_search, None, widget)()
+        tkinter.CallWrapper(lambda: 1 / 0, None, widget)()
+        assert widget.errors == 1
+        assert sorted(row[0] for row in monitor.rows()) == \
+            ["FakeWidget.on_search", "TestLatencyMonitor.test_install_times_tk_callbacks.<lambda>"]
+        monitor.uninstall()
+        assert tkinter.CallWrapper is original
+
+    def test_from_environment(self, monkeypatch):
+        """Test the threshold can be set in milliseconds from the environment."""
+        monkeypatch.setenv(THRESHOLD_ENV, "250")
+        assert LatencyMonitor.from_environment().threshold == 0.25
+        monkeypatch.setenv(THRESHOLD_ENV, "x")
+        assert LatencyMonitor.from_environment().threshold == 0.1
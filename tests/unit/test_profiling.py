@@ -0,0 +1,101 @@
+"""
+Unit tests for the per-phase profiler.
+"""
+
+import threading
+import tracemalloc
+
+import pytest
+from profiling import PROFILE_ENV, PhaseProfiler
+
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    """Stop the tracemalloc an enabled profiler starts, so other tests run at full speed."""
+    yield
+    tracemalloc.stop()
+
+
+@pytest.fixture
+def profiler():
+    return PhaseProfiler(enabled=True, trace_memory=False)
+
+
+class TestPhaseProfiler:
+    """Test phase recording, operation summaries and report dumps."""
+
+    def test_records_phases_of_an_operation(self, profiler):
+        """Test finish() groups the phases recorded since the last operation."""
+        with profiler.phase("read", 10, "chars"):
+            busy(1000)
+        with profiler.phase("decode", unit="objects") as phase:
+            phase.count = 3
+        summary = profiler.finish("Load")
+        operation, total, phases = profiler.history[-1]
+        assert operation == "Load"
+        assert [(p.name, p.count) for p in phases] == [("read", 10), ("decode", 3)]
+        assert total == pytest.approx(sum(p.seconds for p in phases))
+        assert summary.startswith("Load: ") and "decode" in summary and "(3 objects)" in summary
+
+        profiler.finish("Empty")
+        assert profiler.history[-1][2] == []
+
+    def test_disabled_records_nothing(self):
+        """Test a disabled profiler yields a phase but keeps no history."""
+        profiler = PhaseProfiler()
+        with profiler.phase("read") as phase:
+            phase.count = 5
+        assert profiler.finish("Load") is None
+        assert profiler.history == [] and profiler.summary() == ""
+
+    def test_phases_from_threads(self, profiler):
+        """Test phases timed in worker threads belong to the current operation."""
+        def work(name):
+            with profiler.phase(name):
+                busy(20000)
+        threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        profiler.finish("Parallel")
+        assert sorted(p.name for p in profiler.history[-1][2]) == ["w0", "w1", "w2", "w3"]
+
+    def test_nested_phases(self, profiler):
+        """Test nested phases are both timed and the exception still propagates."""
+        with pytest.raises(KeyError):
+            with profiler.phase("outer"):
+                with profiler.phase("inner"):
+                    raise KeyError("x")
+        profiler.finish("Nested")
+        assert [p.name for p in profiler.history[-1][2]] == ["inner", "outer"]
+
+    def test_dump(self, tmp_path):
+        """Test the report has the history, the profiled functions and allocations."""
+        profiler = PhaseProfiler(enabled=True)
+        with profiler.phase("compute"):
+            busy(5000)
+        profiler.finish("Compute")
+        written = profiler.dump(str(tmp_path / "profile.txt"), top=5)
+        assert written == [str(tmp_path / "profile.txt"), str(tmp_path / "profile.pstats")]
+        report = (tmp_path / "profile.txt").read_text(encoding="utf-8")
+        assert "Compute: " in report and "    compute " in report
+        assert "busy" in report
+        assert "tracemalloc, top 5" in report and "peak" in report
+
+    def test_dump_without_phases(self, profiler, tmp_path):
+        """Test a report can be written before anything was measured."""
+        assert profiler.dump(str(tmp_path / "p.txt")) == [str(tmp_path / "p.txt")]
+        assert "no phases profiled" in (tmp_path / "p.txt").read_text(encoding="utf-8")
+
+    def test_from_environment(self, monkeypatch):
+        """Test the flag or the environment variable enable profiling."""
+        monkeypatch.delenv(PROFILE_ENV, raising=False)
+        assert not PhaseProfiler.from_environment(["file.sdx"]).enabled
+        assert PhaseProfiler.from_environment(["--profile"]).enabled
+        monkeypatch.setenv(PROFILE_ENV, "1")
+        assert PhaseProfiler.from_environment([]).enabled
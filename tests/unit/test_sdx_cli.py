@@ -0,0 +1,130 @@
+"""
+Unit tests for the headless command line tools.
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+import sdx_cli
+from channel_models import FavListDiff, make_fav_entry
+from kingofsat import parse_kingofsat_files
+
+
+def get_fixture_path(filename):
+    """Get the full path to a test fixture file."""
+    return os.path.join(os.path.dirname(__file__), '..', 'fixtures', filename)
+
+
+def program(idx, name, sid, tp):
+    return {f'program_tv_object_{idx}': {
+        'ServiceName': name, 'stProgNo': make_fav_entry(sid, tp), 'FavBit': 0,
+        'iLCN': 0, 'SDTServiceType': 1, 'uiSet': {'uiBit': {'HD': 0, 'CA': 0}},
+    }}
+
+
+def make_sdx():
+    """SDX objects with the transponders of sample_kingofsat_full.html and two lists."""
+    return [
+        {'satellite_object_0': {'SatAngle': 192}},
+        {'satellite_object_1': {'SatAngle': -300}},
+        {'transponder_object_0': {'Freq': 10729, 'stFlag': {'POL': 1, 'SatIndex': 0}}},
+        {'transponder_object_1': {'Freq': 11092, 'stFlag': {'POL': 0, 'SatIndex': 1}}},
+        program(0, 'Otro', 50, 0),
+        program(1, 'Canal+ Foot', 8801, 0),
+        program(2, 'Radio Uno', 8802, 0),
+        program(3, 'Conax & Co', 1201, 1),
+        {'fav_list_object_0': {'sNoOfTVFavor': 2, 'sNoOfRadioFavor': 0,
+                               'stProgNo': [make_fav_entry(8802, 0), make_fav_entry(50, 0)]}},
+        {'fav_list_object_1': {'sNoOfTVFavor': 0, 'sNoOfRadioFavor': 0, 'stProgNo': []}},
+        {'fav_list_info_in_box_object': {'aucFavReName': ['Deportes', 'Extra']}},
+    ]
+
+
+def channels():
+    return parse_kingofsat_files([get_fixture_path('sample_kingofsat_full.html')])[0]
+
+
+def fav_sids(objects, idx):
+    for obj in objects:
+        if f'fav_list_object_{idx}' in obj:
+            return [entry['unShort']['sLo16'] for entry in obj[f'fav_list_object_{idx}']['stProgNo']]
+
+
+class TestImportIntoSdx:
+    """Test writing imported channels into favourite lists."""
+
+    def test_diff_mode(self):
+        """Test only missing channels are added and existing ones keep their place."""
+        objects = make_sdx()
+        counts, changes = sdx_cli.import_into_sdx(objects, channels(), ['0'], remove=False)
+        assert counts == {'resolved': 3}
+        assert fav_sids(objects, 0) == [8801, 8802, 1201, 50]
+        assert isinstance(changes[0], FavListDiff) and changes[0].added
+
+    def test_lists_by_name_and_fav_bits(self):
+        """Test lists can be chosen by name and FavBit follows the lists."""
+        objects = make_sdx()
+        sdx_cli.import_into_sdx(objects, channels(), ['extra'], mode='overwrite')
+        assert fav_sids(objects, 1) == [8801, 8802, 1201]
+        fav_bits = {obj[key]['ServiceName']: obj[key]['FavBit']
+                    for obj in objects for key in obj if key.startswith('program_tv_object')}
+        assert fav_bits == {'Otro': 1, 'Canal+ Foot': 2, 'Radio Uno': 3, 'Conax & Co': 2}
+
+    def test_unknown_list(self):
+        """Test a list that is not in the file is an error."""
+        with pytest.raises(ValueError):
+            sdx_cli.import_into_sdx(make_sdx(), channels(), ['7'])
+
+
+class TestMain:
+    """Test the import-kingofsat command end to end."""
+
+    @pytest.fixture
+    def pages(self, tmp_path):
+        pages = tmp_path / 'pages'
+        pages.mkdir()
+        shutil.copy(get_fixture_path('sample_kingofsat.html'), pages / 'a.html')
+        shutil.copy(get_fixture_path('sample_kingofsat_full.html'), pages / 'b.html')
+        return pages
+
+    def test_writes_several_sdx_files(self, pages, tmp_path, capsys):
+        """Test every SDX file is updated into the output directory."""
+        paths = []
+        for name in ('one.sdx', 'two.sdx'):
+            path = tmp_path / name
+            sdx_cli.save_sdx(str(path), make_sdx())
+            paths.append(str(path))
+        out = tmp_path / 'out'
+        assert sdx_cli.main(['import-kingofsat', str(pages), '--sdx', *paths, '--fav', '1',
+                             '--output-dir', str(out), '--channels-json', str(tmp_path / 'ch.json'),
+                             '--workers', '2']) == 0
+        for name in ('one.sdx', 'two.sdx'):
+            assert fav_sids(sdx_cli.load_sdx(str(out / name)), 1) == [8801, 8802, 1201]
+        assert fav_sids(sdx_cli.load_sdx(paths[0]), 1) == []
+        assert len(json.loads((tmp_path / 'ch.json').read_text(encoding='utf-8'))) == 6
+        assert '6 channels from 2 of 2 pages' in capsys.readouterr().out
+
+    def test_sdx_needs_fav(self, pages):
+        """Test --sdx without --fav is rejected."""
+        with pytest.raises(SystemExit):
+            sdx_cli.main(['import-kingofsat', str(pages), '--sdx', 'x.sdx'])
+
+    def test_empty_directory_fails(self, tmp_path):
+        """Test a directory without pages exits with an error."""
+        assert sdx_cli.main(['import-kingofsat', str(tmp_path)]) == 1
+
+    def test_convert_chl(self, tmp_path, capsys):
+        """Test convert-chl writes the SDX file and reports what it wrote."""
+        out = tmp_path / 'out.sdx'
+        assert sdx_cli.main(['convert-chl', get_fixture_path('sample.chl'), str(out)]) == 0
+        names = [next(iter(obj)) for obj in sdx_cli.load_sdx(str(out))]
+        assert names[:4] == ['satellite_object_0', 'transponder_object_0',
+                             'program_tv_object_0', 'program_tv_object_1']
+        assert '2 channels' in capsys.readouterr().out
+        assert sdx_cli.main(['validate', str(out)]) == 0
+
+    def test_convert_chl_missing_input(self, tmp_path):
+        """Test a missing input file exits with an error."""
+        assert sdx_cli.main(['convert-chl', str(tmp_path / 'no.chl'), str(tmp_path / 'out.sdx')]) == 1
@@ -292,3 +292,109 @@ class TestSDXDataProcessing:
             
             channel = list(programs_dict.values())[0]
             assert channel['tipo'] == expected_type
+
+
+class TestDecodeObjects:
+    """Test decoding of concatenated JSON objects."""
+
+    def test_decode_concatenated_objects(self):
+        """Test objects with and without separators are all decoded."""
+        content = '{"a":1}{"b":2}\n  {"c":3}\n'
+        assert ChannelDataProcessor.decode_objects(content) == [{'a': 1}, {'b': 2}, {'c': 3}]
+
+    def test_decode_skips_garbage(self):
+        """Test invalid characters between objects are skipped."""
+        content = 'xx{"a":1}#!{"b":2}'
+        assert ChannelDataProcessor.decode_objects(content) == [{'a': 1}, {'b': 2}]
+
+    def test_decode_empty(self):
+        """Test empty and whitespace-only content."""
+        assert ChannelDataProcessor.decode_objects('') == []
+        assert ChannelDataProcessor.decode_objects('  \n ') == []
+
+    def test_decode_reports_progress(self):
+        """Test the progress callback receives positions and object counts."""
+        content = '{"a":1}' * 5
+        calls = []
+        ChannelDataProcessor.decode_objects(content, lambda *args: calls.append(args), progress_every=2)
+        assert calls[0] == (14, 35, 2)
+        assert calls[-1] == (35, 35, 5)
+
+    def test_decode_large_input_is_linear(self):
+        """Test a large input decodes in one pass."""
+        content = '{"program_tv_object_0":{"ServiceName":"x"}}' * 50000
+        assert len(ChannelDataProcessor.decode_objects(content)) == 50000
+
+
+class TestSDXFavouritesAndTransponders:
+    """Test the FavBit recalculation and the transponder index."""
+
+    def test_update_fav_bits(self):
+        """Test each program gets one bit per list that contains it."""
+        entry = lambda sid, tp: {'uiWord32': (tp << 16) | sid, 'unShort': {'sLo16': sid, 'sHi16': tp}}
+        sdx_objects = [
+            {'program_tv_object_0': {'stProgNo': entry(1, 0), 'FavBit': 8}},
+            {'program_tv_object_1': {'stProgNo': entry(2, 3)}},
+            {'program_tv_object_2': {'stProgNo': entry(1, 3)}},
+            {'fav_list_object_0': {'stProgNo': [entry(1, 0), entry(2, 3)]}},
+            {'fav_list_object_2': {'stProgNo': [entry(2, 3)]}},
+        ]
+        ChannelDataProcessor.update_fav_bits(sdx_objects)
+        assert [next(iter(obj.values()))['FavBit'] for obj in sdx_objects[:3]] == [1, 5, 0]
+
+    def test_build_transponder_index(self):
+        """Test transponders are indexed with their polarisation and satellite."""
+        sdx_objects = [
+            {'satellite_object_4': {'SatAngle': 130}},
+            {'transponder_object_7': {'Freq': 11034, 'stFlag': {'POL': 1, 'SatIndex': 4}}},
+        ]
+        index = ChannelDataProcessor.build_transponder_index(sdx_objects)
+        assert index.find(11034, 'V', 130) == 7
+        assert index.find(11034, 'H', 130) is None
+
+
+class TestLoadChannelData:
+    """Test the models built for the editor from SDX data."""
+
+    def sdx_objects(self):
+        entry = lambda sid, tp: {'uiWord32': (tp << 16) | sid, 'unShort': {'sLo16': sid, 'sHi16': tp}}
+        return [
+            {'satellite_object_0': {'SatAngle': 192}},
+            {'transponder_object_0': {'Freq': 10729, 'stFlag': {'POL': 1, 'SatIndex': 0}}},
+            {'program_tv_object_0': {'ServiceName': ' La 1 HD ', 'stProgNo': entry(100, 0), 'iLCN': 1,
+                                     'SDTServiceType': 25, 'uiSet': {'uiBit': {'HD': 1, 'CA': 0}}}},
+            {'program_tv_object_1': {'ServiceName': 'Cuatro', 'stProgNo': entry(200, 0),
+                                     'SDTServiceType': 1, 'uiSet': {'uiBit': {'HD': 0, 'CA': 1}}}},
+            {'fav_list_object_0': {'sNoOfTVFavor': 2, 'stProgNo': [entry(200, 0), entry(999, 0)]}},
+            {'fav_list_info_in_box_object': {'aucFavReName': ['Mis canales']}},
+        ]
+
+    def test_programs_and_models(self):
+        """Test programs, the channel list model and the matcher come from one load."""
+        objects = self.sdx_objects()
+        progress = []
+        data = ChannelDataProcessor.load_channel_data(objects, lambda done, total: progress.append(done))
+        assert data.all_data_objects is objects
+        assert data.program_list == [('100_0_0', 'La 1 HD'), ('200_0_1', 'Cuatro')]
+        assert data.channel_model.keys == ['100_0_0', '200_0_1']
+        assert data.transponders == {0: 10729}
+        assert data.transponder_index.find(10729, 'V', 192) == 0
+        assert data.program_matcher.match({'name': 'Cuatro', 'sid': 200, 'freq': 10729})[1] == ['200_0_1']
+        assert (data.fav_lists_indices, data.fav_names_obj_index) == ({0: 4}, 5)
+        assert progress == [0, len(objects)]
+
+    def test_fav_models(self):
+        """Test favourite rows show their program, or a placeholder when it is missing."""
+        data = ChannelDataProcessor.load_channel_data(self.sdx_objects())
+        model = data.fav_models[0]
+        assert [model.values(row_id) for row_id in model.ids] == [
+            ('Cuatro', 10729, 200, 0, '', 'Cifrado', 'TV SD'),
+            ('Desconocido (999_0)', '', 999, '', '', '', ''),
+        ]
+        assert model.entries() == self.sdx_objects()[4]['fav_list_object_0']['stProgNo']
+
+    def test_empty_state(self):
+        """Test an empty file loads into empty models."""
+        data = ChannelDataProcessor.load_channel_data([])
+        assert (data.programs_dict, data.program_list, data.fav_models) == ({}, [], {})
+        assert data.fav_names_obj_index == -1
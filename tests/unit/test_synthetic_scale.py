@@ -0,0 +1,98 @@
+"""
+Scale tests on synthetic lineups of realistic size.
+"""
+
+import io
+import os
+
+import pytest
+from channel_processor import ChannelDataProcessor
+from kingofsat import parse_kingofsat_html
+from tests.fixtures.synthetic import SyntheticList
+
+# Lineup size; the default keeps the unit run fast, SCALE_CHANNELS=20000 runs
+# the tests at the size of a real multi-satellite list
+SCALE_ENV = "SCALE_CHANNELS"
+CHANNELS = int(os.environ.get(SCALE_ENV) or 2000)
+
+
+@pytest.fixture(scope="module")
+def lineup():
+    return SyntheticList(seed=3, satellites=6, channels=CHANNELS, fav_lists=4, fav_size=CHANNELS // 10)
+
+
+def dicts(objects):
+    return [obj for obj in objects if isinstance(obj, dict)]
+
+
+class TestSyntheticList:
+    """Test the generator itself."""
+
+    def test_deterministic(self):
+        """Test equal seeds give equal files and different seeds different ones."""
+        a = SyntheticList(seed=5, channels=300)
+        assert a.sdx_text(corruption=4) == SyntheticList(seed=5, channels=300).sdx_text(corruption=4)
+        assert a.chl_text() != SyntheticList(seed=6, channels=300).chl_text()
+
+    def test_counts(self):
+        """Test the lineup has the requested number of each record."""
+        lineup = SyntheticList(satellites=2, transponders=7, channels=50, fav_lists=3, fav_size=9)
+        assert [len(lineup.satellites), len(lineup.transponders), len(lineup.channels)] == [2, 7, 50]
+        assert [len(fav['TVChs']) for fav in lineup.favorites] == [9, 9, 9]
+
+    def test_too_many_satellites(self):
+        """Test asking for more satellites than known positions is an error."""
+        with pytest.raises(ValueError):
+            SyntheticList(satellites=99)
+
+
+class TestScale:
+    """Test the engine on a large lineup, clean and corrupted."""
+
+    def test_sdx_loads_every_favourite(self, lineup):
+        """Test every favourite entry resolves to its program after loading."""
+        data = ChannelDataProcessor.load_channel_data(
+            ChannelDataProcessor.decode_objects(lineup.sdx_text()))
+        assert len(data.program_list) == CHANNELS
+        for fav in lineup.favorites:
+            model = data.fav_models[fav['Index']]
+            names = [model.values(row_id)[0] for row_id in model.ids]
+            assert names == [lineup.channels[idx]['Name'] for idx in fav['TVChs']]
+
+    @pytest.mark.parametrize('corruption', [0, 25])
+    def test_sdx_decode_recovers_objects(self, lineup, corruption):
+        """Test whole and streamed decoding recover every object despite junk."""
+        text = lineup.sdx_text(corruption)
+        assert dicts(ChannelDataProcessor.decode_objects(text)) == lineup.sdx()
+        assert dicts(ChannelDataProcessor.iter_objects(io.StringIO(text), 4096)) == lineup.sdx()
+
+    def test_chl_file_round_trip(self, lineup, tmp_path):
+        """Test a corrupted CHL file streams to the SDX the generator builds."""
+        chl = tmp_path / 'big.chl'
+        chl.write_text(lineup.chl_text(corruption=25), encoding='utf-8')
+        counts = ChannelDataProcessor.convert_chl_file(str(chl), str(tmp_path / 'big.sdx'))
+        assert counts['channels'] == CHANNELS
+        converted = ChannelDataProcessor.decode_objects((tmp_path / 'big.sdx').read_text(encoding='utf-8'))
+        assert converted == ChannelDataProcessor.convert_chl_to_sdx(lineup.chl())
+
+    def test_sdx_to_chl_keeps_favourites(self, lineup):
+        """Test SDX -> CHL writes each favourite list back as its channel indices."""
+        chl = ChannelDataProcessor.convert_sdx_to_chl(lineup.sdx())
+        favs = [record for record in chl if record['Type'] == 'fav']
+        assert [fav['TVChs'] for fav in favs] == [fav['TVChs'] for fav in lineup.favorites]
+
+    @pytest.mark.parametrize('corruption', [0, 25])
+    def test_kingofsat_page_matches_programs(self, lineup, corruption):
+        """Test every channel of the generated page is parsed and resolves to its program."""
+        channels = parse_kingofsat_html(lineup.kingofsat_html(corruption))
+        assert [(ch['name'], ch['sid'], ch['freq'], ch['pol'], ch['position']) for ch in channels] == [
+            (ch['name'], ch['sid'], ch['freq'], ch['pol'], ch['position'])
+            for ch in lineup.kingofsat_channels()]
+
+        if corruption:
+            return
+        data = ChannelDataProcessor.load_channel_data(lineup.sdx())
+        result = data.program_matcher.match_all(channels)
+        assert len(result.resolved) == CHANNELS
+        assert all(data.programs_dict[key]['sid'] == ch['sid'] for ch, key, _ in result.resolved)
+        assert {method for _, _, method in result.resolved} == {'sid_tp'}